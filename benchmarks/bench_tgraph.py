@@ -0,0 +1,56 @@
+"""
+Benchmarks for the TGraph draw methods (rplot, rerrorbar)
+"""
+from .common import makeTGraphAsymErrors, _DrawTimings, _RenderTimings
+
+from mplbplot.decorators import points
+
+GRAPH_SIZES = [ 10, 100, 1000, 10000, 100000 ]
+
+class _Plot(object):
+    """ rplot """
+    params = GRAPH_SIZES
+    param_names = ["nPoints"]
+    def makeObject(self, nPoints):
+        return makeTGraphAsymErrors(nPoints)
+    def extract(self, g, nPoints):
+        return zip(*[ (p.x, p.y) for p in points(g) ])
+    def construct(self, ax, extracted, nPoints):
+        x, y = extracted
+        ax.plot(x, y, "k-")
+    def draw(self, ax, g, nPoints):
+        ax.rplot(g, "k-")
+
+class TGraphPlot(_Plot, _DrawTimings):
+    pass
+class TGraphPlotRender(_Plot, _RenderTimings):
+    pass
+
+class _Errorbar(object):
+    """ rerrorbar (bars and bands) """
+    params = ([ "bar", "band" ], GRAPH_SIZES)
+    param_names = ["kind", "nPoints"]
+    def makeObject(self, kind, nPoints):
+        return makeTGraphAsymErrors(nPoints)
+    def extract(self, g, kind, nPoints):
+        if kind == "bar":
+            return zip(*[ (p.x, p.xLowError, p.xHighError, p.y, p.yLowError, p.yHighError) for p in points(g) ])
+        elif kind == "band":
+            return zip(*[ (p.x, p.y-p.yLowError, p.y+p.yHighError) for p in points(g) ])
+    def construct(self, ax, extracted, kind, nPoints):
+        if kind == "bar":
+            x, xle, xue, y, yle, yue = extracted
+            ax.errorbar(x, y, yerr=(yle, yue), xerr=(xle, xue), fmt="ko")
+        elif kind == "band":
+            x, yLow, yHigh = extracted
+            ax.fill_between(x, yLow, y2=yHigh)
+    def draw(self, ax, g, kind, nPoints):
+        if kind == "bar":
+            ax.rerrorbar(g, kind=kind, fmt="ko")
+        elif kind == "band":
+            ax.rerrorbar(g, kind=kind)
+
+class TGraphErrorbar(_Errorbar, _DrawTimings):
+    pass
+class TGraphErrorbarRender(_Errorbar, _RenderTimings):
+    pass
@@ -0,0 +1,174 @@
+"""
+Benchmarks for the TH1 draw methods (rhist, rerrorbar, rtext), bins() iteration and histo_utils.divide
+"""
+from io import BytesIO
+
+from .common import BIN_COUNTS, makeTH1, makeSparseTH1, makeTH1Stack, newAxes, _DrawTimings, _RenderTimings
+
+from mplbplot.decorators import bins
+from mplbplot.draw_th1 import xBinEdges, _barCorners
+from mplbplot.datalim import patchLimitsFrom, addBoxes
+
+class TH1Bins(object):
+    """ bins() iteration: the per-bin accessors used by all TH1 draw methods """
+    params = BIN_COUNTS
+    param_names = ["nBins"]
+    timeout = 1200.
+
+    def setup(self, nBins):
+        self.h = makeTH1(nBins)
+
+    def time_iterate_content(self, nBins):
+        for b in bins(self.h):
+            b.content
+
+    def time_iterate_center_content_error(self, nBins):
+        for b in bins(self.h):
+            b.xCenter, b.content, b.error
+
+    def time_xBinEdges(self, nBins):
+        xBinEdges(self.h)
+
+class _Hist(object):
+    """ rhist for a single histogram (bars are individual patches, with the data limits updated once: limited number of bins) """
+    params = (BIN_COUNTS, ["step", "stepfilled", "bar"])
+    param_names = ["nBins", "histtype"]
+    def setup(self, nBins, histtype):
+        if histtype == "bar" and nBins > 10000:
+            raise NotImplementedError()
+        super(_Hist, self).setup(nBins, histtype)
+    def makeObject(self, nBins, histtype):
+        return makeTH1(nBins)
+    def extract(self, h, nBins, histtype):
+        return [ b.xCenter for b in bins(h) ], [ b.content for b in bins(h) ], xBinEdges(h)
+    def construct(self, ax, extracted, nBins, histtype):
+        x, w, edges = extracted
+        if histtype.startswith("bar"):
+            with patchLimitsFrom(ax) as (xs, ys):
+                n, edges, patches = ax.hist(x, weights=w, bins=edges, histtype=histtype)
+                xs.append(_barCorners(patches, "get_x", "get_width"))
+                ys.append(_barCorners(patches, "get_y", "get_height"))
+        else:
+            ax.hist(x, weights=w, bins=edges, histtype=histtype)
+    def draw(self, ax, h, nBins, histtype):
+        ax.rhist(h, histtype=histtype)
+
+class TH1Hist(_Hist, _DrawTimings):
+    pass
+class TH1HistRender(_Hist, _RenderTimings):
+    pass
+
+class TH1HistSimplifyPDF(object):
+    """ PDF output of rhist (stepfilled) for a sparse histogram (1% of the bins filled), with and without simplify """
+    params = ([ 1000, 100000, 1000000 ], [ False, True, 0.5 ])
+    param_names = ["nBins", "simplify"]
+    number = 1
+    repeat = (2, 10, 60.)
+    timeout = 1200.
+
+    def setup(self, nBins, simplify):
+        self.fig, self.ax = newAxes()
+        self.ax.rhist(makeSparseTH1(nBins, nBins//100), histtype="stepfilled", simplify=simplify)
+
+    def time_savefig(self, nBins, simplify):
+        self.fig.savefig(BytesIO(), format="pdf")
+
+    def track_size(self, nBins, simplify):
+        buf = BytesIO()
+        self.fig.savefig(buf, format="pdf")
+        return len(buf.getvalue())
+    track_size.unit = "bytes"
+
+class _HistStack(object):
+    """ rhist for a stack of histograms """
+    params = ([ 1, 5, 20, 50 ], [ 10, 1000, 100000 ])
+    param_names = ["nHistos", "nBins"]
+    def makeObject(self, nHistos, nBins):
+        return makeTH1Stack(nHistos, nBins)
+    def extract(self, hs, nHistos, nBins):
+        firstEdges = xBinEdges(hs[0])
+        all(xBinEdges(ih) == firstEdges for ih in hs)
+        firstCenters = [ b.xCenter for b in bins(hs[0]) ]
+        return [ firstCenters for ih in hs ], [ [ b.content for b in bins(ih) ] for ih in hs ], firstEdges
+    def construct(self, ax, extracted, nHistos, nBins):
+        x, w, edges = extracted
+        ax.hist(x, weights=w, bins=edges, histtype="stepfilled", stacked=True)
+    def draw(self, ax, hs, nHistos, nBins):
+        ax.rhist(hs, histtype="stepfilled", stacked=True)
+
+class TH1HistStack(_HistStack, _DrawTimings):
+    pass
+class TH1HistStackRender(_HistStack, _RenderTimings):
+    pass
+
+class _Errorbar(object):
+    """ rerrorbar, for all kinds of error visualisation (boxes are individual patches, added with addBoxes: limited number of bins) """
+    params = ([ "bar", "band", "box" ], BIN_COUNTS)
+    param_names = ["kind", "nBins"]
+    def setup(self, kind, nBins):
+        if kind == "box" and nBins > 10000:
+            raise NotImplementedError()
+        super(_Errorbar, self).setup(kind, nBins)
+    def makeObject(self, kind, nBins):
+        return makeTH1(nBins)
+    def extract(self, h, kind, nBins):
+        if kind == "bar":
+            return zip(*[ (b.xCenter, .5*b.xWidth, b.content, b.lowError, b.upError) for b in bins(h) if b.content != 0. ])
+        elif kind == "box":
+            return [ (b.xLowEdge, b.xWidth, b.content-b.lowError, b.lowError+b.upError) for b in bins(h) if b.content != 0. ]
+        elif kind == "band":
+            return zip(*[ (b.xCenter, b.content-b.lowError, b.content+b.upError) for b in bins(h) if b.content != 0. ])
+    def construct(self, ax, extracted, kind, nBins):
+        if kind == "bar":
+            x, xe, y, yle, yue = extracted
+            ax.errorbar(x, y, yerr=(yle, yue), xerr=xe, fmt="ko")
+        elif kind == "box":
+            addBoxes(ax, extracted, fc="none", hatch="//")
+        elif kind == "band":
+            x, yLow, yHigh = extracted
+            ax.fill_between(x, yLow, y2=yHigh)
+    def draw(self, ax, h, kind, nBins):
+        if kind == "bar":
+            ax.rerrorbar(h, kind=kind, fmt="ko")
+        elif kind == "box":
+            ax.rerrorbar(h, kind=kind, fc="none", hatch="//")
+        elif kind == "band":
+            ax.rerrorbar(h, kind=kind)
+
+class TH1Errorbar(_Errorbar, _DrawTimings):
+    pass
+class TH1ErrorbarRender(_Errorbar, _RenderTimings):
+    pass
+
+class _Text(object):
+    """ rtext (one text artist per bin: limited number of bins) """
+    params = [ 10, 100, 1000, 10000 ]
+    param_names = ["nBins"]
+    def makeObject(self, nBins):
+        return makeTH1(nBins)
+    def extract(self, h, nBins):
+        return [ (b.xCenter, b.content, "{0:.0f}".format(b.content)) for b in bins(h) if b.content != 0. ]
+    def construct(self, ax, extracted, nBins):
+        for x, y, txt in extracted:
+            ax.text(x, y, txt, ha="center", va="center", rotation="vertical")
+    def draw(self, ax, h, nBins):
+        ax.rtext(h, formatFun=lambda b : "{0:.0f}".format(b.content))
+
+class TH1Text(_Text, _DrawTimings):
+    pass
+class TH1TextRender(_Text, _RenderTimings):
+    pass
+
+class Divide(object):
+    """ histo_utils.divide (ratio and its uncertainties, as in the ratio plots of cms_stacks) """
+    params = BIN_COUNTS
+    param_names = ["nBins"]
+    timeout = 1200.
+
+    def setup(self, nBins):
+        self.num = makeTH1(nBins, seed=1)
+        self.denom = makeTH1(nBins, seed=2)
+
+    def time_divide(self, nBins):
+        import histo_utils
+        histo_utils.divide(self.num, self.denom)
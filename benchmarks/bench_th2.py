@@ -0,0 +1,72 @@
+"""
+Benchmarks for the TH2 draw methods (rpcolor, rtext)
+"""
+import numpy as np
+
+from .common import makeTH2, makeSparseTH2, _DrawTimings, _RenderTimings
+
+from mplbplot.decorators import bins
+
+class _Pcolor(object):
+    """ rpcolor, for square histograms from 10x10 to 1000x1000 bins """
+    params = [ 10, 30, 100, 300, 1000 ]
+    param_names = ["nBinsXY"]
+    def makeObject(self, nBinsXY):
+        return makeTH2(nBinsXY, nBinsXY)
+    def extract(self, h, nBinsXY):
+        xEdges = np.array( [ bins(h.GetXaxis())[1].lowEdge ] + [ b.upEdge for b in bins(h.GetXaxis()) ] )
+        yEdges = np.array( [ bins(h.GetYaxis())[1].lowEdge ] + [ b.upEdge for b in bins(h.GetYaxis()) ] )
+        z = np.array([ b.content for b in bins(h) ]).reshape((h.GetNbinsX(), h.GetNbinsY())).T
+        return xEdges, yEdges, z
+    def construct(self, ax, extracted, nBinsXY):
+        xEdges, yEdges, z = extracted
+        ax.pcolormesh(xEdges, yEdges, z)
+    def draw(self, ax, h, nBinsXY):
+        ax.rpcolor(h)
+
+class TH2Pcolor(_Pcolor, _DrawTimings):
+    pass
+class TH2PcolorRender(_Pcolor, _RenderTimings):
+    pass
+
+class _SparsePcolor(object):
+    """ rpcolor with sparse=True, for 1000x1000 bins of which a fraction is filled """
+    params = [ 0.001, 0.01, 0.1 ]
+    param_names = ["fillFraction"]
+    def makeObject(self, fillFraction):
+        return makeSparseTH2(1000, 1000, int(fillFraction*1000*1000))
+    def extract(self, h, fillFraction):
+        from mplbplot.draw_th2 import _filledTH2Bins
+        return _filledTH2Bins(h)
+    def construct(self, ax, extracted, fillFraction):
+        from matplotlib.collections import PolyCollection
+        i, j, values = extracted
+        xLow, yLow = -5.+.01*(i-1), -5.+.01*(j-1)
+        verts = np.stack([ np.column_stack(corner) for corner in ((xLow, yLow), (xLow, yLow+.01), (xLow+.01, yLow+.01), (xLow+.01, yLow)) ], axis=1)
+        ax.add_collection(PolyCollection(verts, array=values, edgecolors="none"), autolim=False)
+    def draw(self, ax, h, fillFraction):
+        ax.rpcolor(h, sparse=True)
+
+class TH2SparsePcolor(_SparsePcolor, _DrawTimings):
+    pass
+class TH2SparsePcolorRender(_SparsePcolor, _RenderTimings):
+    pass
+
+class _Text(object):
+    """ rtext (one text artist per bin: limited number of bins) """
+    params = [ 5, 10, 30, 100 ]
+    param_names = ["nBinsXY"]
+    def makeObject(self, nBinsXY):
+        return makeTH2(nBinsXY, nBinsXY)
+    def extract(self, h, nBinsXY):
+        return [ (b.xCenter, b.yCenter, "{0:.0f}".format(b.content)) for b in bins(h) if b.content != 0. ]
+    def construct(self, ax, extracted, nBinsXY):
+        for x, y, txt in extracted:
+            ax.text(x, y, txt, ha="center", va="center", rotation="horizontal")
+    def draw(self, ax, h, nBinsXY):
+        ax.rtext(h, formatFun=lambda b : "{0:.0f}".format(b.content))
+
+class TH2Text(_Text, _DrawTimings):
+    pass
+class TH2TextRender(_Text, _RenderTimings):
+    pass
@@ -0,0 +1,164 @@
+"""
+Synthetic inputs and base classes for the mplbplot benchmarks
+
+All histograms and graphs are generated in memory with numpy from a fixed seed,
+such that the benchmarks are reproducible and do not need any input files.
+
+The draw benchmarks time three stages separately:
+ - extraction: the accessor calls the mplbplot method makes to retrieve the bin or point data
+ - construction: the matplotlib call that builds the artists, on pre-extracted data
+ - rendering: drawing the figure with the Agg backend
+and, for reference, the full mplbplot method (extraction and construction).
+The base classes are prefixed with an underscore to hide them from benchmark discovery.
+"""
+__all__ = ( "BIN_COUNTS", "makeTH1", "makeSparseTH1", "makeTH1Stack", "makeTH2", "makeSparseTH2", "makeTGraphAsymErrors"
+          , "newAxes"
+          )
+
+import itertools
+import os.path
+import sys
+
+import numpy as np
+
+from cppyy import gbl
+gbl.TH1.AddDirectory(False)
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+import mplbplot.decorateAxes ## rhist, rerrorbar etc.
+
+## the cms_stacks helpers are not installed as a package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cms_stacks"))
+
+BIN_COUNTS = [ 10, 100, 1000, 10000, 100000, 1000000 ]
+
+_uniqueIds = itertools.count()
+def _uniqueName(prefix):
+    return "{0}_{1:d}".format(prefix, next(_uniqueIds))
+
+def _gaussContents(x, seed):
+    """ Gaussian-shaped random contents and sumw2 (as for weighted events) """
+    rng = np.random.RandomState(seed)
+    contents = rng.poisson(1000.*np.exp(-.5*x**2)).astype(np.float64) + rng.uniform(.1, 1., size=x.shape)
+    sumw2 = contents*rng.uniform(.5, 1.5, size=x.shape)
+    return contents, sumw2
+
+def makeTH1(nBins, seed=42):
+    """ TH1D with nBins bins between -5 and 5, a gaussian shape and no empty bins """
+    h = gbl.TH1D(_uniqueName("h1"), "Synthetic TH1", nBins, -5., 5.)
+    contents, sumw2 = _gaussContents(np.linspace(-5., 5., nBins+2), seed)
+    h.Sumw2()
+    h.SetContent(contents)
+    h.SetError(np.sqrt(sumw2))
+    h.SetEntries(np.sum(contents))
+    return h
+
+def makeSparseTH1(nBins, nFilled, seed=42):
+    """ TH1D with nBins bins between -5 and 5, of which nFilled (random ones) are non-empty """
+    h = gbl.TH1D(_uniqueName("h1s"), "Synthetic sparse TH1", nBins, -5., 5.)
+    rng = np.random.RandomState(seed)
+    contents = np.zeros((nBins+2,))
+    contents[rng.randint(1, nBins+1, size=nFilled)] = rng.uniform(1., 100., size=nFilled)
+    h.SetContent(contents)
+    h.SetEntries(nFilled)
+    return h
+
+def makeTH1Stack(nHistos, nBins):
+    """ list of nHistos compatible TH1D (see makeTH1) """
+    return [ makeTH1(nBins, seed=42+i) for i in xrange(nHistos) ]
+
+def makeTH2(nBinsX, nBinsY, seed=42):
+    """ TH2D with nBinsX x nBinsY bins in [-5,5]x[-5,5] and a two-dimensional gaussian shape """
+    h = gbl.TH2D(_uniqueName("h2"), "Synthetic TH2", nBinsX, -5., 5., nBinsY, -5., 5.)
+    ## global bin number is i+(nBinsX+2)*j
+    x, y = np.meshgrid(np.linspace(-5., 5., nBinsX+2), np.linspace(-5., 5., nBinsY+2))
+    contents, sumw2 = _gaussContents(np.sqrt(x**2+y**2).ravel(), seed)
+    h.Sumw2()
+    h.SetContent(contents)
+    h.SetError(np.sqrt(sumw2))
+    h.SetEntries(np.sum(contents))
+    return h
+
+def makeSparseTH2(nBinsX, nBinsY, nFilled, seed=42):
+    """ TH2D with nBinsX x nBinsY bins in [-5,5]x[-5,5], of which nFilled (random ones) are non-empty (as an occupancy map) """
+    h = gbl.TH2D(_uniqueName("h2s"), "Synthetic sparse TH2", nBinsX, -5., 5., nBinsY, -5., 5.)
+    rng = np.random.RandomState(seed)
+    i = rng.randint(1, nBinsX+1, size=nFilled)
+    j = rng.randint(1, nBinsY+1, size=nFilled)
+    contents = np.zeros(((nBinsY+2)*(nBinsX+2),))
+    contents[i+(nBinsX+2)*j] = rng.uniform(1., 100., size=nFilled)
+    h.SetContent(contents)
+    h.SetEntries(nFilled)
+    return h
+
+def makeTGraphAsymErrors(nPoints, seed=42):
+    """ TGraphAsymErrors with nPoints points on a gaussian shape """
+    rng = np.random.RandomState(seed)
+    x = np.linspace(-5., 5., nPoints)
+    y, _ = _gaussContents(x, seed)
+    exl = exh = np.full(nPoints, 5./nPoints)
+    eyl = np.sqrt(y)*rng.uniform(.8, 1., size=nPoints)
+    eyh = np.sqrt(y)*rng.uniform(1., 1.2, size=nPoints)
+    return gbl.TGraphAsymErrors(nPoints, x, y, exl, exh, eyl, eyh)
+
+def newAxes():
+    """ Figure (outside of the pyplot registry, with an Agg canvas) and axes """
+    fig = matplotlib.figure.Figure(figsize=(6.4, 4.8))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    return fig, ax
+
+class _DrawTimings(object):
+    """
+    Base for timing the extraction, artist construction and full draw of an mplbplot method
+
+    Subclasses should define params and param_names, and implement
+     - makeObject(*params): construct the (synthetic) ROOT object to draw
+     - extract(obj, *params): the accessor calls made by the mplbplot method,
+       returning the arguments for the matplotlib call
+     - construct(ax, extracted, *params): the matplotlib call, on the extracted arguments
+     - draw(ax, obj, *params): the mplbplot method
+    A new figure is made for every measurement, such that the artists do not accumulate.
+    """
+    number = 1
+    repeat = (2, 10, 60.)
+    timeout = 1200.
+
+    def setup(self, *params):
+        self.obj = self.makeObject(*params)
+        self.fig, self.ax = newAxes()
+        self.extracted = self.extract(self.obj, *params)
+
+    def time_extract(self, *params):
+        self.extract(self.obj, *params)
+
+    def time_construct(self, *params):
+        self.construct(self.ax, self.extracted, *params)
+
+    def time_draw(self, *params):
+        self.draw(self.ax, self.obj, *params)
+
+class _RenderTimings(object):
+    """
+    Base for timing the rendering (with the Agg backend) of a figure drawn with an mplbplot method
+
+    Subclasses should define params and param_names, and implement makeObject and draw
+    (see _DrawTimings); the artists are constructed in the setup, the first render is
+    done there as well (to exclude one-time costs like font loading and text layout caching).
+    """
+    number = 1
+    repeat = (2, 10, 60.)
+    timeout = 1200.
+
+    def setup(self, *params):
+        self.obj = self.makeObject(*params)
+        self.fig, self.ax = newAxes()
+        self.draw(self.ax, self.obj, *params)
+        self.fig.canvas.draw()
+
+    def time_render(self, *params):
+        self.fig.canvas.draw()
@@ -0,0 +1,242 @@
+"""
+Synthetic end-to-end workload for cms_stacks/plotit.py
+
+The generate command writes a plotIt configuration with
+ - nFiles simulated samples (and one data file), each with nHistos histograms
+ - nSysts shape systematics: the even-numbered ones as histograms with the
+   "__<syst>up" and "__<syst>down" suffixes in the same file, the odd-numbered
+   ones as histograms with the same name in sibling files
+   ("<sample>__<syst>up.root" and "<sample>__<syst>down.root")
+ - the main YAML file, which includes the files and plots sections from separate files
+and the run command times the different stages of plotIt for it
+(loading the configuration, loading the histograms, evaluating the systematics,
+drawing, and saving), and reports the growth of the resident memory in each stage,
+and the peak resident memory of the process.
+
+Usage:
+  python -m benchmarks.plotit_workload generate --nFiles=20 --nHistos=50 --nSysts=4 /tmp/synthplotit
+  python -m benchmarks.plotit_workload run --output=timings.json /tmp/synthplotit/plots.yml
+"""
+__all__ = ("writeSyntheticPlotIt", "runPlotIt", "STAGES")
+
+import os
+import os.path
+import resource
+from collections import OrderedDict as odict
+from contextlib import contextmanager
+from timeit import default_timer as _clock
+
+import numpy as np
+
+from . import common ## sets the Agg backend and makes the cms_stacks modules importable
+
+STAGES = ("config", "load", "systematics", "draw", "save")
+
+_colors = ( "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd"
+          , "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf" )
+
+def _writeHistos(path, histos):
+    """ Write (name, edges, contents, sumw2) tuples to a new ROOT file """
+    from cppyy import gbl
+    tf = gbl.TFile.Open(path, "RECREATE")
+    for name, (lo, hi), contents, sumw2 in histos:
+        h = gbl.TH1D(name, name, len(contents)-2, lo, hi)
+        h.Sumw2()
+        h.SetContent(contents)
+        h.SetError(np.sqrt(sumw2))
+        h.SetEntries(np.sum(contents))
+        tf.WriteTObject(h, name)
+    tf.Close()
+
+def writeSyntheticPlotIt(outDir, nFiles=10, nHistos=20, nSysts=2, nBins=50, extensions=("pdf", "png"), seed=42):
+    """
+    Write a synthetic plotIt configuration and histogram files to outDir (see the module documentation)
+
+    Returns the path of the main YAML file
+    """
+    import yaml
+    if not os.path.isdir(outDir):
+        os.makedirs(outDir)
+    outDir = os.path.abspath(outDir)
+    rng = np.random.RandomState(seed)
+    lumi = 1000.
+    xRange = (0., 200.)
+    x = np.linspace(xRange[0], xRange[1], nBins+2)
+    systNames = [ "syst{0:d}".format(k) for k in xrange(nSysts) ]
+
+    files = odict()
+    totalExpected = [ np.zeros(nBins+2) for j in xrange(nHistos) ]
+    for i in xrange(nFiles):
+        fName = "sample{0:d}.root".format(i)
+        xsec = float(rng.uniform(1., 100.))
+        ## the scale factor lumi*xsec/generated-events is one
+        files[fName] = odict((("type", "mc"), ("legend", "Sample {0:d}".format(i)), ("fill-color", _colors[i % len(_colors)])
+                            , ("cross-section", xsec), ("generated-events", xsec*lumi), ("order", i)))
+        nominal = []
+        variations = dict(((systN, vari), []) for systN in systNames for vari in ("up", "down"))
+        for j in xrange(nHistos):
+            hName = "hist{0:d}".format(j)
+            contents = rng.poisson(xsec*np.exp(-x/rng.uniform(20., 100.))).astype(np.float64)
+            sumw2 = contents*rng.uniform(.5, 1.5)
+            nominal.append((hName, xRange, contents, sumw2))
+            totalExpected[j] += contents
+            for k, systN in enumerate(systNames):
+                shift = rng.uniform(-.1, .1)*(x-x[0])/(x[-1]-x[0])
+                for vari, sign in (("up", 1.), ("down", -1.)):
+                    varContents = contents*(1.+sign*shift)
+                    if k % 2 == 0:
+                        nominal.append(("{0}__{1}{2}".format(hName, systN, vari), xRange, varContents, sumw2))
+                    else:
+                        variations[(systN, vari)].append((hName, xRange, varContents, sumw2))
+        _writeHistos(os.path.join(outDir, fName), nominal)
+        for (systN, vari), varHistos in variations.iteritems():
+            if varHistos:
+                _writeHistos(os.path.join(outDir, "sample{0:d}__{1}{2}.root".format(i, systN, vari)), varHistos)
+    files["data.root"] = odict((("type", "data"), ("legend", "Data"), ("order", nFiles)))
+    dataContents = [ rng.poisson(expected).astype(np.float64) for expected in totalExpected ]
+    _writeHistos(os.path.join(outDir, "data.root"), [ ("hist{0:d}".format(j), xRange, contents, contents) for j, contents in enumerate(dataContents) ])
+
+    plots = odict()
+    for j in xrange(nHistos):
+        plots["hist{0:d}".format(j)] = dict((k, v) for k, v in (
+              ("x-axis", "Variable {0:d}".format(j))
+            , ("y-axis", "Events")
+            , ("save-extensions", list(extensions))
+            , ("show-ratio", True)
+            , ("log-y", ( j % 4 == 3 ))
+            , ("x-axis-range", ( [ 20., 180. ] if j % 2 == 1 else None ))
+            ) if v is not None)
+
+    def dumpYAML(name, content):
+        with open(os.path.join(outDir, name), "w") as yFile:
+            yaml.safe_dump(content, yFile, default_flow_style=False)
+    dumpYAML("files.yml", dict((k, dict(v)) for k, v in files.iteritems()))
+    dumpYAML("plots_def.yml", dict(plots))
+    mainPath = os.path.join(outDir, "plots.yml")
+    dumpYAML("plots.yml", {
+          "configuration" : { "width" : 800, "height" : 800, "luminosity" : lumi, "root" : outDir, "show-overflow" : True }
+        , "files"         : { "include" : [ "files.yml" ] }
+        , "plots"         : { "include" : [ "plots_def.yml" ] }
+        , "systematics"   : systNames
+        })
+    return mainPath
+
+def _peakRSS():
+    """ peak resident set size of this process so far (it never decreases), in MB """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024.
+
+_pageMB = resource.getpagesize()/(1024.*1024.)
+
+def _currentRSS():
+    """ current resident set size of this process, in MB (None if /proc/self/statm is not available) """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1])*_pageMB
+    except (IOError, OSError, IndexError, ValueError):
+        return None
+
+@contextmanager
+def _timed(timings, stage, rssDelta=None):
+    """ add the time spent in the with-block to timings[stage], and the change of the current RSS to rssDelta[stage] (if given) """
+    rssStart = _currentRSS() if rssDelta is not None else None
+    start = _clock()
+    try:
+        yield
+    finally:
+        timings[stage] += _clock()-start
+        if rssStart is not None:
+            rssDelta[stage] += _currentRSS()-rssStart
+
+def runPlotIt(yamlPath, histoBaseDir=None, outDir=".", maxPlots=None, saveThreads=0, configCache=True, prefetchDepth=0, histoCache=None):
+    """
+    Run plotIt for yamlPath, timing the different stages separately
+
+    Returns a dictionary with the time spent in each stage (in seconds), the number of plots,
+    the total change of the current resident memory during each stage (in MB; None if it
+    cannot be measured, see _currentRSS), and the peak resident memory of the process (in MB)
+
+    With saveThreads > 0 the plots are saved in the background, alternating between two
+    figures (as in plotit.plotIt); the save stage is then the time spent waiting for that.
+    With configCache=False the resolved configuration is not cached (see plotit.plotIt_loadConfig).
+    With prefetchDepth > 0 the histograms for the next plots are loaded in the background
+    (see plotit.plotIt_iterStacks); the load stage is then the time spent waiting for that.
+    histoCache is a directory for the histogram array cache (see histocache.HistoArrayCache), if any.
+    """
+    import plotit
+    from histstacksandratioplot import RatioPlotTemplate
+    from figsaver import FigureSaver
+    if histoBaseDir is None:
+        histoBaseDir = os.path.dirname(os.path.abspath(yamlPath))
+    if not os.path.isdir(outDir):
+        os.makedirs(outDir)
+
+    timings = odict((stage, 0.) for stage in STAGES)
+    rssDelta = odict((stage, 0.) for stage in STAGES) if _currentRSS() is not None else None
+    with _timed(timings, "config", rssDelta):
+        cfg, files, plots, systematics = plotit.plotIt_load(yamlPath, histoBaseDir, cache=configCache, histoCache=histoCache)
+        scaleAndSystematicsPerFile = plotit.plotIt_scalesAndSystematics(files, systematics, cfg["configuration"])
+    pNames = sorted(plots.iterkeys())
+    if maxPlots is not None:
+        pNames = pNames[:maxPlots]
+    ## as in plotit.plotIt
+    templates = [ RatioPlotTemplate(useRegistry=False) for i in xrange(2 if saveThreads > 0 else 1) ]
+    pending = [ None for tmpl in templates ]
+    saver = FigureSaver(nThreads=saveThreads)
+    itStacks = plotit.plotIt_iterStacks(((pName, plots[pName]) for pName in pNames), scaleAndSystematicsPerFile, prefetchDepth=prefetchDepth)
+    for i in xrange(len(pNames)):
+        iTmpl = i % len(templates)
+        with _timed(timings, "load", rssDelta):
+            pName, aPlot, obsStack, expStack = next(itStacks)
+        with _timed(timings, "systematics", rssDelta):
+            expStack.getTotalSystematics()
+        if pending[iTmpl] is not None:
+            with _timed(timings, "save", rssDelta):
+                pending[iTmpl].wait()
+        with _timed(timings, "draw", rssDelta):
+            theplot = plotit.plotIt_draw(aPlot, obsStack, expStack, template=templates[iTmpl])
+        with _timed(timings, "save", rssDelta):
+            pending[iTmpl] = plotit.plotIt_save(theplot, pName, aPlot.save_extensions, outDir=outDir, saver=saver)
+    with _timed(timings, "save", rssDelta):
+        saver.close()
+    for tmpl in templates:
+        tmpl.close()
+
+    return odict((("timings", timings), ("nPlots", len(pNames)), ("rssDelta", rssDelta), ("peakRSS", _peakRSS())))
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Synthetic plotIt workload: generate the inputs, or run plotIt on them and time the stages")
+    subparsers = parser.add_subparsers(dest="command")
+    genParser = subparsers.add_parser("generate", help="Write a synthetic plotIt configuration and input files")
+    genParser.add_argument("outDir", help="Output directory")
+    genParser.add_argument("--nFiles", type=int, default=10, help="Number of simulated samples")
+    genParser.add_argument("--nHistos", type=int, default=20, help="Number of histograms (plots) per sample")
+    genParser.add_argument("--nSysts", type=int, default=2, help="Number of shape systematics")
+    genParser.add_argument("--nBins", type=int, default=50, help="Number of bins per histogram")
+    genParser.add_argument("--extensions", default="pdf,png", help="Comma-separated list of output formats")
+    genParser.add_argument("--seed", type=int, default=42, help="Random seed")
+    runParser = subparsers.add_parser("run", help="Run plotIt on a configuration and time the different stages")
+    runParser.add_argument("yamlPath", help="Main plotIt YAML file")
+    runParser.add_argument("--histoBaseDir", help="Base directory for the input files (default: that of the YAML file)")
+    runParser.add_argument("--outDir", default="plotit_output", help="Directory for the plots")
+    runParser.add_argument("--maxPlots", type=int, help="Maximal number of plots to make")
+    runParser.add_argument("--noConfigCache", action="store_true", help="Do not use (or write) the resolved configuration cache")
+    runParser.add_argument("--histoCache", help="Directory for the on-disk cache of histogram arrays")
+    runParser.add_argument("--prefetchDepth", type=int, default=0, help="Number of plots to load the histograms for in the background (0: synchronously)")
+    runParser.add_argument("--saveThreads", type=int, default=0, help="Number of threads to save the plots in the background (0: synchronously)")
+    runParser.add_argument("--output", help="JSON file to save the timings to")
+    args = parser.parse_args()
+    if args.command == "generate":
+        print writeSyntheticPlotIt(args.outDir, nFiles=args.nFiles, nHistos=args.nHistos, nSysts=args.nSysts,
+                nBins=args.nBins, extensions=args.extensions.split(","), seed=args.seed)
+    elif args.command == "run":
+        res = runPlotIt(args.yamlPath, histoBaseDir=args.histoBaseDir, outDir=args.outDir, maxPlots=args.maxPlots, saveThreads=args.saveThreads, configCache=(not args.noConfigCache), prefetchDepth=args.prefetchDepth, histoCache=args.histoCache)
+        print "{0:d} plots".format(res["nPlots"])
+        for stage in STAGES:
+            print "{0:<12} {1:10.3f} s   (RSS change {2:>10} MB)".format(stage, res["timings"][stage],
+                    ( "{0:+.1f}".format(res["rssDelta"][stage]) if res["rssDelta"] is not None else "n/a" ))
+        print "peak RSS of the process: {0:.1f} MB".format(res["peakRSS"])
+        if args.output:
+            with open(args.output, "w") as jsonFile:
+                json.dump(res, jsonFile, indent=2)
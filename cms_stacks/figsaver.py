@@ -0,0 +1,257 @@
+"""
+Save figures in several formats, on a thread pool
+
+Every format is written with fig.savefig, such that the files are the same as
+when saving synchronously. With worker threads (nThreads > 0; by default
+everything is done in the calling thread) this happens in the background,
+such that the next figure can be prepared while the previous one is being saved.
+
+Rendering itself is serialized (matplotlib's font cache is shared between all
+renderers and not thread-safe), but writing the files overlaps with the
+rendering of other formats and figures, and with whatever the main thread is doing.
+
+With a mplbplot.rasterize.RasterizationPolicy, the heavy artists (e.g. large
+color maps) are rasterized in the vector formats, at the resolution of the policy.
+
+Instead of one file per figure, all figures can also be written to a bundle:
+the pages of one PDF document (PdfDocument; the fonts are embedded only once),
+or the entries of one zip or tar file with images (ImageArchive).
+With a mplbplot.rendercache.RenderCache, the files of figures that were rendered
+before (with the same fingerprint) are written from the cache instead.
+"""
+__all__ = ("FigureSaver", "SaveHandle", "PdfDocument", "ImageArchive")
+
+import tarfile
+import threading
+import time
+import zipfile
+from io import BytesIO
+
+## one figure at a time (see above)
+_renderLock = threading.Lock()
+
+class SaveHandle(object):
+    """ Pending save operations for one figure """
+    __slots__ = ("_results",)
+    def __init__(self, results):
+        self._results = results
+    def ready(self):
+        """ True if all files have been written """
+        return all(res.ready() for res in self._results)
+    def wait(self):
+        """ Wait until all files have been written (exceptions are raised here) """
+        for res in self._results:
+            res.get()
+
+class _DoneResult(object):
+    """ AsyncResult-like wrapper for a result that was computed synchronously """
+    __slots__ = ("_value",)
+    def __init__(self, value):
+        self._value = value
+    def ready(self):
+        return True
+    def get(self):
+        return self._value
+
+class PdfDocument(object):
+    """
+    Bundle: every figure is added as a page of one PDF document (with matplotlib's PdfPages)
+
+    Pages are added in the order the figures are saved; the document is complete after close.
+    """
+    extensions = frozenset(("pdf",))
+    suffixes = (".pdf",)
+
+    def __init__(self, path, metadata=None):
+        from matplotlib.backends.backend_pdf import PdfPages
+        self.path = path
+        self._pages = PdfPages(path, metadata=metadata)
+
+    def add(self, fig, name, extensions, dpi, rasterization=None):
+        """ Add fig as a page (name and extensions are not used: there is only one format, and no page names) """
+        with _renderLock:
+            if rasterization is not None:
+                with rasterization.applied(fig):
+                    self._pages.savefig(fig, dpi=rasterization.dpi)
+            else:
+                self._pages.savefig(fig, dpi=dpi)
+
+    def close(self):
+        self._pages.close()
+
+class ImageArchive(object):
+    """
+    Bundle: every figure is added to one zip or tar file (depending on the extension of path:
+    .zip, .tar, .tar.gz or .tgz) as name.ext, for each of the raster formats it is saved in
+
+    The entries are written when the figures are saved (with fig.savefig, as the files would be);
+    the archive is complete after close.
+    """
+    extensions = frozenset(("png", "jpg", "jpeg", "tif", "tiff"))
+    suffixes = (".zip", ".tar", ".tar.gz", ".tgz")
+
+    def __init__(self, path):
+        self.path = path
+        if path.endswith(".zip"):
+            self._zip, self._tar = zipfile.ZipFile(path, "w", zipfile.ZIP_STORED, allowZip64=True), None ## images are compressed already
+        elif path.endswith(".tar"):
+            self._zip, self._tar = None, tarfile.open(path, "w")
+        elif path.endswith(".tar.gz") or path.endswith(".tgz"):
+            self._zip, self._tar = None, tarfile.open(path, "w:gz")
+        else:
+            raise ValueError("Unknown archive type for {0} (should be .zip, .tar, .tar.gz or .tgz)".format(path))
+
+    def _write(self, entryName, data):
+        if self._zip is not None:
+            self._zip.writestr(zipfile.ZipInfo(entryName, date_time=time.localtime()[:6]), data)
+        else:
+            info = tarfile.TarInfo(entryName)
+            info.size = len(data)
+            info.mtime = time.time()
+            self._tar.addfile(info, BytesIO(data))
+
+    def add(self, fig, name, extensions, dpi, rasterization=None):
+        """ Render fig in each of extensions, and add it as name.ext (rasterization does not apply to the raster formats) """
+        for ext in extensions:
+            buf = BytesIO()
+            with _renderLock:
+                fig.savefig(buf, format=ext, dpi=dpi)
+            self._write("{0}.{1}".format(name, ext), buf.getvalue())
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+        else:
+            self._tar.close()
+
+class FigureSaver(object):
+    """
+    Save figures in several formats, concurrently
+
+    >>> with FigureSaver(nThreads=1) as saver:
+    >>>     handle = saver.save(fig, "plots/myplot", ("pdf", "png"))
+    >>>     ...
+    >>>     handle.wait() ## before modifying fig again
+
+    The figure should not be modified until the handle returned by save is ready.
+    With nThreads=0 everything is done synchronously in save.
+    If a rasterization policy (mplbplot.rasterize.RasterizationPolicy) is passed,
+    it is applied when saving in the vector formats it applies to.
+    bundles maps extensions to a bundle (PdfDocument or ImageArchive) that the figures
+    are added to instead of writing basePath.ext, e.g.
+
+    >>> with FigureSaver(bundles={ "pdf" : PdfDocument("plots.pdf"), "png" : ImageArchive("plots.zip") }) as saver:
+
+    They are added (as name, or basePath if no name is passed to save) in order (by one worker thread),
+    and closed by close.
+    If a render cache (mplbplot.rendercache.RenderCache) is passed, the files (not the bundles)
+    are written from there if the fingerprint of the figure is found, and stored there otherwise.
+    """
+    def __init__(self, nThreads=0, dpi=None, rasterization=None, bundles=None, cache=None):
+        self.dpi = dpi
+        self.rasterization = rasterization
+        self.cache = cache
+        self.bundles = dict((ext.lower(), bundle) for ext, bundle in bundles.iteritems()) if bundles is not None else dict()
+        for ext, bundle in self.bundles.iteritems():
+            if ext not in bundle.extensions:
+                raise ValueError("Cannot write {0} to a {1}".format(ext, type(bundle).__name__))
+        self._pending = []
+        if nThreads > 0:
+            from multiprocessing.pool import ThreadPool
+            self._pool = ThreadPool(nThreads)
+            self._bundlePool = ThreadPool(1) if self.bundles else None ## keep the order
+        else:
+            self._pool = None
+            self._bundlePool = None
+
+    def _submit(self, fun, *args):
+        if self._pool is not None:
+            return self._pool.apply_async(fun, args)
+        else:
+            return _DoneResult(fun(*args))
+
+    def _submitToBundle(self, fun, *args):
+        if self._bundlePool is not None:
+            return self._bundlePool.apply_async(fun, args)
+        else:
+            return _DoneResult(fun(*args))
+
+    def _getDPI(self, fig):
+        from matplotlib import rcParams
+        dpi = self.dpi if self.dpi is not None else rcParams["savefig.dpi"]
+        return fig.dpi if dpi == "figure" else dpi
+
+    @staticmethod
+    def _saveFormat(fig, dpi, path, ext, rasterization=None, cache=None, key=None):
+        """ Render fig in format ext (with the rasterization policy, if given and it applies), and write it to path (and store it in cache for key, if given) """
+        buf = BytesIO()
+        with _renderLock:
+            if rasterization is not None and rasterization.appliesTo(ext):
+                with rasterization.applied(fig):
+                    fig.savefig(buf, format=ext, dpi=rasterization.dpi)
+            else:
+                fig.savefig(buf, format=ext, dpi=dpi)
+        FigureSaver._write(path, buf.getvalue(), cache, ext, key)
+
+    @staticmethod
+    def _write(path, data, cache=None, ext=None, key=None):
+        if cache is not None and key is not None:
+            cache.put(key, ext, data)
+        with open(path, "wb") as outFile:
+            outFile.write(data)
+
+    def _cacheKey(self, fig, dpi, ext):
+        """ render cache key for fig in format ext (None if there is no cache, or the figure cannot be fingerprinted) """
+        if self.cache is None:
+            return None
+        rasterization = self.rasterization if self.rasterization is not None and self.rasterization.appliesTo(ext) else None
+        return self.cache.key(fig, format=ext, dpi=( rasterization.dpi if rasterization is not None else dpi ), rasterization=repr(rasterization))
+
+    def save(self, fig, basePath, extensions, name=None):
+        """ Save fig as basePath.ext for all extensions (or add it to the bundle for ext, as name or basePath); returns a SaveHandle """
+        dpi = self._getDPI(fig)
+        bundleExts = dict()
+        for ext in extensions:
+            if ext.lower() in self.bundles:
+                bundleExts.setdefault(id(self.bundles[ext.lower()]), (self.bundles[ext.lower()], []))[1].append(ext)
+        paths = [ ("{0}.{1}".format(basePath, ext), ext) for ext in extensions if ext.lower() not in self.bundles ]
+        keys = dict((ext, self._cacheKey(fig, dpi, ext)) for path, ext in paths)
+        results = []
+        for path, ext in list(paths):
+            data = self.cache.get(keys[ext], ext) if keys[ext] is not None else None
+            if data is not None:
+                results.append(self._submit(FigureSaver._write, path, data))
+                paths.remove((path, ext))
+        results += [ self._submit(FigureSaver._saveFormat, fig, dpi, path, ext, self.rasterization, self.cache, keys[ext]) for path, ext in paths ]
+        for bundle, bExts in bundleExts.itervalues():
+            rasterization = self.rasterization if self.rasterization is not None and all(self.rasterization.appliesTo(ext) for ext in bExts) else None
+            results.append(self._submitToBundle(bundle.add, fig, ( name if name is not None else basePath ), bExts, dpi, rasterization))
+        handle = SaveHandle(results)
+        self._pending.append(handle)
+        return handle
+
+    def wait(self):
+        """ Wait until all figures have been saved """
+        pending, self._pending = self._pending, []
+        for handle in pending:
+            handle.wait()
+
+    def close(self):
+        """ Wait for all pending operations, stop the worker threads, and close the bundles """
+        try:
+            self.wait()
+        finally:
+            for pool in (self._pool, self._bundlePool):
+                if pool is not None:
+                    pool.close()
+                    pool.join()
+            self._pool = None
+            self._bundlePool = None
+            for bundle in dict((id(bundle), bundle) for bundle in self.bundles.itervalues()).itervalues():
+                bundle.close()
+            self.bundles = dict()
+
+    def __enter__(self):
+        return self
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -3,7 +3,7 @@ Utility functions to manipulate ROOT histograms (for overflow display and system
 """
 __all__ = ("cloneHist", "addOverflow",
            "histoWithErrors", "histoWithErrorsQuadAdded", "histoDivByValues",
-           "divide")
+           "divide", "histoToArrays", "histoFromArrays", "histo2DFromArrays")
 
 from itertools import izip, count, chain
 import numpy as np
@@ -85,3 +85,35 @@ def divide(num, denom):
                       ] if db.content != 0. else [ nb.xCenter, 1., 1., 1. ] )
                       for nb, db in izip(bins(num), bins(denom)) ])
     return vals[:,0], vals[:,1], vals[:,2:].T
+
+def histoToArrays(hist):
+    """ bin edges (N+1), contents and sumw2 (N+2, including underflow and overflow) of a TH1, as numpy arrays """
+    from mplbplot.archive import histoArrays
+    return histoArrays(hist)
+
+def histoFromArrays(edges, contents, sumw2, name="h", title="", entries=None):
+    """ make a TH1D from bin edges, contents and sumw2 (see histoToArrays; uniform binning is detected) """
+    nBins = len(edges)-1
+    widths = np.diff(edges)
+    if np.allclose(widths, widths[0], rtol=1.e-9, atol=0.):
+        hist = gbl.TH1D(name, title, nBins, edges[0], edges[-1])
+    else:
+        hist = gbl.TH1D(name, title, nBins, np.ascontiguousarray(edges, dtype=np.float64))
+    hist.Sumw2()
+    hist.SetContent(np.ascontiguousarray(contents, dtype=np.float64))
+    hist.SetError(np.sqrt(sumw2))
+    hist.SetEntries(entries if entries is not None else np.sum(contents))
+    return hist
+
+def histo2DFromArrays(xEdges, yEdges, contents, sumw2, name="h", title="", entries=None):
+    """ make a TH2D from bin edges, and contents and sumw2 for all cells (in the ROOT order, see histoFromArrays) """
+    xWidths, yWidths = np.diff(xEdges), np.diff(yEdges)
+    if np.allclose(xWidths, xWidths[0], rtol=1.e-9, atol=0.) and np.allclose(yWidths, yWidths[0], rtol=1.e-9, atol=0.):
+        hist = gbl.TH2D(name, title, len(xEdges)-1, xEdges[0], xEdges[-1], len(yEdges)-1, yEdges[0], yEdges[-1])
+    else:
+        hist = gbl.TH2D(name, title, len(xEdges)-1, np.ascontiguousarray(xEdges, dtype=np.float64), len(yEdges)-1, np.ascontiguousarray(yEdges, dtype=np.float64))
+    hist.Sumw2()
+    hist.SetContent(np.ascontiguousarray(contents, dtype=np.float64))
+    hist.SetError(np.sqrt(sumw2))
+    hist.SetEntries(entries if entries is not None else np.sum(contents))
+    return hist
@@ -0,0 +1,278 @@
+"""
+Lazily opened ROOT files, merged files, histogram archives as files, and an on-disk cache of histogram arrays
+
+With a HistoArrayCache, the histograms that HistoKey loads (after scaling,
+rebinning and adding the overflow) are also stored as numpy arrays, and
+on the next run they are read back from there (memory-mapped), such that
+the ROOT files do not need to be opened, as long as they are unchanged.
+ArchiveTFile makes the histograms in an mplbplot.archive.HistoArchive
+available to HistoKey in the same way as those in a TFile, and MergedTFile
+the sum of the histograms with the same name in a set of files (like hadd).
+"""
+__all__ = ("TFileRef", "openFile", "MergedTFile", "ArchiveTFile", "siblingFile", "HistoArrayCache")
+
+import os
+import os.path
+import hashlib
+import tempfile
+import threading
+
+import numpy as np
+
+_openLock = threading.Lock()
+
+class TFileRef(object):
+    """
+    TFile that is only opened when its contents are needed
+
+    Get, GetName, GetPath, IsZombie and IsOpen behave as for TFile
+    (the name is the path); all other attributes are taken from the TFile.
+    """
+    __slots__ = ("path", "_tfile", "_fingerprint")
+    def __init__(self, path):
+        self.path = path
+        self._tfile = None
+        self._fingerprint = None
+    def __repr__(self):
+        return "TFileRef({0!r})".format(self.path)
+    @property
+    def tfile(self):
+        """ the TFile (opened when first accessed) """
+        if self._tfile is None:
+            with _openLock:
+                if self._tfile is None:
+                    from cppyy import gbl
+                    self._tfile = gbl.TFile.Open(self.path)
+        return self._tfile
+    @property
+    def fingerprint(self):
+        """ (absolute path, modification time, size) """
+        if self._fingerprint is None:
+            st = os.stat(self.path)
+            self._fingerprint = (os.path.abspath(self.path), st.st_mtime, st.st_size)
+        return self._fingerprint
+    def GetName(self):
+        return self.path
+    def GetPath(self):
+        return "{0}:/".format(self.path)
+    def Get(self, name):
+        return self.tfile.Get(name)
+    def IsZombie(self):
+        return ( not self.tfile ) or self.tfile.IsZombie()
+    def IsOpen(self):
+        return bool(self.tfile) and self.tfile.IsOpen()
+    def __getattr__(self, name):
+        return getattr(self.tfile, name)
+
+_fileRefs = dict()
+def openFile(path):
+    """ TFileRef for path (the same one for all calls with the same path) """
+    absPath = os.path.abspath(path)
+    with _openLock:
+        if absPath not in _fileRefs:
+            _fileRefs[absPath] = TFileRef(path)
+        return _fileRefs[absPath]
+
+def _readArrays(tfile, name):
+    """ (edges, contents, sumw2, entries) for name in tfile, or None if not found """
+    hist = tfile.Get(name)
+    if not hist:
+        return None
+    from mplbplot.archive import histoArrays
+    return histoArrays(hist)+(hist.GetEntries(),)
+
+class MergedTFile(object):
+    """
+    TFile-like view of a set of files, where Get returns the sum of the histograms with that name (as hadd)
+
+    The files are read one after the other, and the contents and sumw2 are added as they
+    come in, so only one of the inputs is in memory at a time.
+    The files are opened when first needed (see openFile), and kept open.
+    If the files were found with a glob pattern, that should be passed as name:
+    the variations of shape systematics are then found with the same pattern (see siblingFile).
+    """
+    __slots__ = ("paths", "name", "_files", "_fingerprint")
+    def __init__(self, paths, name=None):
+        self.paths = list(paths)
+        self.name = name if name is not None else "+".join(self.paths)
+        self._files = [ openFile(pth) for pth in self.paths ]
+        self._fingerprint = None
+    def __repr__(self):
+        return "MergedTFile({0!r}, name={1!r})".format(self.paths, self.name)
+    @property
+    def fingerprint(self):
+        """ (hash of the fingerprints of all files, latest modification time, total size) """
+        if self._fingerprint is None:
+            fps = [ tf.fingerprint for tf in self._files ]
+            self._fingerprint = ("merged:{0}".format(hashlib.sha1(repr(fps)).hexdigest()), max(fp[1] for fp in fps), sum(fp[2] for fp in fps))
+        return self._fingerprint
+    def GetName(self):
+        return self.name
+    def GetPath(self):
+        return "{0}:/".format(self.name)
+    def IsZombie(self):
+        return len(self._files) == 0 or any(tf.IsZombie() for tf in self._files)
+    def IsOpen(self):
+        return len(self._files) != 0 and all(tf.IsOpen() for tf in self._files)
+    def Get(self, name):
+        """ sum of the histograms name in all files (those where it is not found are skipped), or None if not found in any """
+        edges, contents, sumw2, entries = None, None, None, 0.
+        for tf in self._files:
+            res = _readArrays(tf, name)
+            if res is None:
+                continue
+            iEdges, iContents, iSumw2, iEntries = res
+            if edges is None:
+                edges, contents, sumw2 = iEdges, iContents, iSumw2
+            else:
+                if not np.array_equal(edges, iEdges):
+                    raise ValueError("Histograms '{0}' in {1} have different binnings".format(name, self))
+                contents += iContents
+                sumw2 += iSumw2
+            entries += iEntries
+        if edges is None:
+            return None
+        from histo_utils import histoFromArrays
+        return histoFromArrays(edges, contents, sumw2, name=name, entries=entries)
+
+class ArchiveTFile(object):
+    """
+    TFile-like view of the histograms for one file label in a histogram archive
+
+    Get returns a new TH1D (or None if there is no such histogram),
+    the name is the label (see mplbplot.archive)
+    """
+    __slots__ = ("archive", "label", "_fingerprint")
+    def __init__(self, archive, label):
+        self.archive = archive
+        self.label = label
+        self._fingerprint = None
+    def __repr__(self):
+        return "ArchiveTFile({0!r}, {1!r})".format(self.archive, self.label)
+    @property
+    def fingerprint(self):
+        """ (absolute path of the archive and label, modification time, size) """
+        if self._fingerprint is None:
+            st = os.stat(self.archive.path)
+            self._fingerprint = ("{0}#{1}".format(os.path.abspath(self.archive.path), self.label), st.st_mtime, st.st_size)
+        return self._fingerprint
+    def GetName(self):
+        return self.label
+    def GetPath(self):
+        return "{0}:/".format(self.label)
+    def IsZombie(self):
+        return self.label not in self.archive
+    def IsOpen(self):
+        return self.label in self.archive
+    def Get(self, name):
+        aHist = self.archive.get(self.label, name)
+        if aHist is None:
+            return None
+        from histo_utils import histoFromArrays
+        return histoFromArrays(aHist.edges, aHist.contents, aHist.sumw2, name=name, title=aHist.title, entries=aHist.entries)
+
+def siblingFile(tfile, path):
+    """ The file at path (in the same archive for an ArchiveTFile, the files matching it for a MergedTFile,
+    the same histograms from the tree in it for a treefill.TreeFile, with openFile otherwise), or None if it does not exist """
+    if isinstance(tfile, ArchiveTFile):
+        return ArchiveTFile(tfile.archive, path) if path in tfile.archive else None
+    elif isinstance(tfile, MergedTFile):
+        import glob
+        paths = sorted(glob.glob(path))
+        return MergedTFile(paths, name=path) if paths else None
+    from treefill import TreeFile, openTreeFile
+    if isinstance(tfile, TreeFile):
+        return openTreeFile(path, tfile.treeName, tfile.specs, chunkSize=tfile.chunkSize) if os.path.exists(path) else None
+    return openFile(path) if os.path.exists(path) else None
+
+class HistoArrayCache(object):
+    """
+    On-disk cache of the histograms loaded by HistoKey
+
+    Every histogram is stored as a .npy file, named after a hash of the file path,
+    modification time and size, the key name (with cycle, if given), and the
+    transformation (scale, rebin and overflow range), with layout
+    [ nBins, entries, edges (nBins+1), contents (nBins+2), sumw2 (nBins+2) ].
+    Keys that are not found are recorded as well (with an empty file),
+    such that looking for systematic variations does not need the ROOT files either.
+    Only one-dimensional histograms are cached.
+    """
+    VERSION = 1
+    def __init__(self, cacheDir):
+        self.cacheDir = cacheDir
+        self._fingerprints = dict() ## for TFile objects (TFileRef and ArchiveTFile have their own)
+        if not os.path.isdir(cacheDir):
+            os.makedirs(cacheDir)
+
+    def _fileFingerprint(self, tfile):
+        if hasattr(tfile, "fingerprint"):
+            return tfile.fingerprint
+        path = tfile.GetName()
+        if path not in self._fingerprints:
+            st = os.stat(path)
+            self._fingerprints[path] = (os.path.abspath(path), st.st_mtime, st.st_size)
+        return self._fingerprints[path]
+
+    def _entryPath(self, histoKey, suffix=".npy"):
+        ky = repr((HistoArrayCache.VERSION, self._fileFingerprint(histoKey.tfile), histoKey.name,
+                   float(histoKey.scale), int(histoKey.rebin),
+                   ( tuple(float(x) for x in histoKey.xOverflowRange) if histoKey.xOverflowRange is not None else None )))
+        digest = hashlib.sha1(ky).hexdigest()
+        return os.path.join(self.cacheDir, digest[:2], digest[2:]+suffix)
+
+    def contains(self, histoKey):
+        """ True if the histogram is cached, False if it is known to be missing, None otherwise """
+        if os.path.exists(self._entryPath(histoKey)):
+            return True
+        elif os.path.exists(self._entryPath(histoKey, suffix=".missing")):
+            return False
+        return None
+
+    def loadArrays(self, histoKey):
+        """ (edges, contents, sumw2, entries) for histoKey (memory-mapped), or None if not cached """
+        try:
+            arr = np.load(self._entryPath(histoKey), mmap_mode="r")
+        except IOError:
+            return None
+        nBins = int(arr[0])
+        return arr[2:nBins+3], arr[nBins+3:2*nBins+5], arr[2*nBins+5:3*nBins+7], float(arr[1])
+
+    def load(self, histoKey):
+        """ TH1D for histoKey from the cache, or None if not cached """
+        arrays = self.loadArrays(histoKey)
+        if arrays is None:
+            return None
+        from histo_utils import histoFromArrays
+        edges, contents, sumw2, entries = arrays
+        return histoFromArrays(edges, contents, sumw2, name=histoKey.name.split(";")[0], entries=entries)
+
+    def _write(self, path, arr):
+        """ write atomically (concurrent runs may fill the same cache) """
+        dirName = os.path.dirname(path)
+        if not os.path.isdir(dirName):
+            try:
+                os.makedirs(dirName)
+            except OSError: ## created in the meantime
+                pass
+        fd, tmpPath = tempfile.mkstemp(suffix=".tmp", dir=dirName)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if arr is not None:
+                    np.save(f, arr)
+            os.rename(tmpPath, path)
+        except Exception:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+            raise
+
+    def store(self, histoKey, hist):
+        """ Store the (transformed) histogram for histoKey """
+        if hist.GetDimension() != 1:
+            return
+        from histo_utils import histoToArrays
+        edges, contents, sumw2 = histoToArrays(hist)
+        self._write(self._entryPath(histoKey), np.concatenate(([ len(edges)-1, hist.GetEntries() ], edges, contents, sumw2)))
+
+    def storeMissing(self, histoKey):
+        """ Record that histoKey is not found in its file """
+        self._write(self._entryPath(histoKey, suffix=".missing"), None)
@@ -29,10 +29,24 @@ class THistogramStack(collections.Sequence):
     def __init__(self):
         self._entries = []
         self._stack = None ## sum histograms (lazy, constructed when accessed and cached)
+        self._systematics = dict() ## getTotalSystematics results, per set of variation names (cached)
 
     def add(self, hist, **kwargs):
         """ Main method: add a histogram on top of the stack """
         self._entries.append(THistogramStack.Entry(hist, **kwargs))
+        self._systematics = dict()
+
+    def sort(self, key):
+        """ Reorder the entries (from bottom to top) by key(entry) """
+        self._entries.sort(key=key)
+        self._stack = None
+
+    def load(self):
+        """ Load all histograms (nominal and systematic variations) now, rather than when they are first used """
+        for contrib in self._entries:
+            contrib.hist.obj
+            for systVar in contrib.systVars.itervalues():
+                systVar.load()
 
     @property
     def entries(self):
@@ -75,25 +89,30 @@ class THistogramStack(collections.Sequence):
         """ Get the combined systematics
 
         systVarNames: systematic variations to consider (if None, all that are present are used for each histogram)
+        The result is cached, until a histogram is added to the stack.
         """
-        nBins = self.stackTotal.GetNbinsX()
-        binRange = xrange(1,nBins+1) ## no overflow or underflow
-
         if systVarNames is None:
             systVarNames = self._defaultSystVarNames()
+        systVarNames = frozenset(systVarNames)
+        if systVarNames not in self._systematics:
+            self._systematics[systVarNames] = self._computeTotalSystematics(systVarNames)
+        return self._systematics[systVarNames]
 
+    def _computeTotalSystematics(self, systVarNames):
+        nBins = self.stackTotal.GetNbinsX()
+
+        systInteg = 0.
         systPerBin = dict((vn, np.zeros((nBins,))) for vn in systVarNames) ## including overflows
         for systN, systInBins in systPerBin.iteritems():
             for contrib in self._entries:
                 if systN == "lumi": ## TODO like this ?
                     pass
-                else:
-                    syst = contrib.systVars[systN]
-                    maxVarPerBin = np.array([ max(abs(syst.up(i)-syst.nom(i)), abs(syst.down(i)-syst.nom(i))) for i in iter(binRange) ])
+                elif systN in contrib.systVars:
+                    maxVarPerBin = contrib.systVars[systN].maxVariation()[1:nBins+1] ## no overflow or underflow
                     systInBins += maxVarPerBin
                     systInteg = np.sum(maxVarPerBin)
 
-        totalSystInBins = np.sqrt(sum( binSysts**2 for binSysts in systPerBin.itervalues() ))
+        totalSystInBins = np.sqrt(sum(( binSysts**2 for binSysts in systPerBin.itervalues() ), np.zeros((nBins,))))
 
         return systInteg, totalSystInBins
 
@@ -112,20 +131,41 @@ class THistogramStack(collections.Sequence):
 
 
 
-import mplbplot.plot ## axes decorators for TH1F
+import mplbplot.decorateAxes ## axes decorators for TH1F
 
-class THistogramRatioPlot(object):
+class RatioPlotTemplate(object):
     """
-    Helper class for the common use case of a pad with two histogram stacks (MC and data or, more generally, expected and observed) and their ratio in a smaller pad below
+    Figure with a main and a ratio axes, that can be reused for many THistogramRatioPlot instances
+
+    The figure and axes are constructed and formatted once, reset() removes all artists
+    added since, and restores the axis limits, scales, and labels (this is much
+    cheaper than constructing a new figure for every plot, and keeps the memory usage flat).
+    If useRegistry is False, the figure is not registered with matplotlib.pyplot
+    (it can only be saved, not shown, and is not kept alive by pyplot).
+    close() should be called when the template is not needed anymore
+    (or it can be used as a context manager).
     """
-    def __init__(self, expected=None, observed=None, other=None): ## FIXME more (for placement of the axes)
-        ## TODO put placement in some kind of helper method (e.g. a staticmethod that takes the fig)
-        import matplotlib.pyplot as plt
+    def __init__(self, figsize=(7.875, 7.63875), useRegistry=True):
+        import matplotlib.gridspec
+        if useRegistry:
+            import matplotlib.pyplot as plt
+            self.fig = plt.figure(figsize=figsize)
+        else:
+            import matplotlib.figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            self.fig = matplotlib.figure.Figure(figsize=figsize)
+            FigureCanvasAgg(self.fig)
+        self.useRegistry = useRegistry
+        gs = matplotlib.gridspec.GridSpec(2, 1, height_ratios=(4,1))
+        self.ax = self.fig.add_subplot(gs[0])
+        self.rax = self.fig.add_subplot(gs[1], sharex=self.ax)
+        self.ax.label_outer()
+        self._formatAxes()
+        self._axesState = [ RatioPlotTemplate._saveState(ax) for ax in (self.ax, self.rax) ]
+
+    def _formatAxes(self):
         import matplotlib.ticker
         from mplbplot.plothelpers import formatAxes, minorTicksOn
-
-        self.fig, axes = plt.subplots(2, 1, sharex=True, gridspec_kw={"height_ratios":(4,1)}, figsize=(7.875, 7.63875)) ## ...
-        self.ax, self.rax = tuple(axes)
         self.rax.set_ylim(.5, 1.5)
         self.rax.set_ylabel("Data / MC")
         self.rax.yaxis.set_major_locator(matplotlib.ticker.MultipleLocator(.2))
@@ -133,12 +173,85 @@ class THistogramRatioPlot(object):
         formatAxes(self.rax, axis="x")
         minorTicksOn(self.rax.yaxis)
 
+    @staticmethod
+    def _saveState(ax):
+        return { "xscale" : ax.get_xscale(), "yscale" : ax.get_yscale()
+               , "xlim" : ax.get_xlim(), "ylim" : ax.get_ylim()
+               , "autoscalex" : ax.get_autoscalex_on(), "autoscaley" : ax.get_autoscaley_on()
+               , "xlabel" : ax.get_xlabel(), "ylabel" : ax.get_ylabel(), "title" : ax.get_title()
+               }
+
+    @staticmethod
+    def _clearAxes(ax, state):
+        """ Remove all artists from ax and restore the saved state """
+        for art in list(chain(ax.lines, ax.patches, ax.collections, ax.texts, ax.images, ax.artists, ax.tables)):
+            art.remove()
+        ax.containers = []
+        if ax.legend_ is not None:
+            ax.legend_.remove()
+        ax.relim() ## resets the data limits
+        ax.set_prop_cycle(None)
+        if ax.get_xscale() != state["xscale"]:
+            ax.set_xscale(state["xscale"])
+        if ax.get_yscale() != state["yscale"]:
+            ax.set_yscale(state["yscale"])
+        ax.set_xlim(state["xlim"], auto=state["autoscalex"])
+        ax.set_ylim(state["ylim"], auto=state["autoscaley"])
+        ax.set_xlabel(state["xlabel"])
+        ax.set_ylabel(state["ylabel"])
+        ax.set_title(state["title"])
+
+    def reset(self):
+        """ Remove everything that was drawn, and restore the initial layout """
+        if self.fig is None:
+            raise RuntimeError("Cannot reuse a closed template")
+        for ax, state in izip((self.ax, self.rax), self._axesState):
+            RatioPlotTemplate._clearAxes(ax, state)
+        for art in list(chain(self.fig.texts, self.fig.legends)):
+            art.remove()
+        self._formatAxes() ## the scale may have changed, which resets the tickers
+        self.ax.label_outer()
+
+    def close(self):
+        """ Release the figure (and remove it from the pyplot registry, if it was registered) """
+        if self.fig is not None:
+            if self.useRegistry:
+                import matplotlib.pyplot as plt
+                plt.close(self.fig)
+            self.fig, self.ax, self.rax = None, None, None
+
+    def __enter__(self):
+        return self
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class THistogramRatioPlot(object):
+    """
+    Helper class for the common use case of a pad with two histogram stacks (MC and data or, more generally, expected and observed) and their ratio in a smaller pad below
+
+    By default a new figure is made (registered with pyplot); to draw many plots,
+    passing a RatioPlotTemplate is recommended: it will be reset and reused.
+    """
+    def __init__(self, expected=None, observed=None, other=None, template=None): ## FIXME more (for placement of the axes)
+        if template is None:
+            self._template = RatioPlotTemplate()
+            self._ownsTemplate = True
+        else:
+            template.reset()
+            self._template = template
+            self._ownsTemplate = False
+        self.fig, self.ax, self.rax = self._template.fig, self._template.ax, self._template.rax
+
         #self.ax  = fig.add_axes((.17, .30, .8, .65), adjustable="box-forced", xlabel="", xticklabels=[]) ## left, bottom, width, height
         #self.rax = fig.add_axes((.17, .13, .8, .15), adjustable="box-forced")
 
         self.expected = expected if expected is not None else THistogramStack()
         self.observed = observed if observed is not None else THistogramStack()
         self.other = other if other is not None else dict() ## third category: stacks that are just overlaid but don't take part in the ratio
+    def close(self):
+        """ Close the figure, if it was made for this plot (a template that was passed is left untouched) """
+        if self._ownsTemplate:
+            self._template.close()
     def __getitem__(self, ky):
         return self.other[ky]
 
@@ -152,12 +265,16 @@ class THistogramRatioPlot(object):
             ax = self.ax
 
         ## expected
-        exp_hists, exp_colors = izip(*((eh.hist.obj, eh.drawOpts.get("fill_color", "white")) for eh in self.expected.entries))
-        ax.rhist(exp_hists, histtype="stepfilled", color=exp_colors, stacked=True)
+        exp_hists, exp_colors, exp_labels = izip(*((eh.hist.obj, eh.drawOpts.get("fill_color", "white"), ( eh.label if eh.label else "_nolegend_" )) for eh in self.expected.entries))
+        ax.rhist(exp_hists, histtype="stepfilled", color=exp_colors, label=exp_labels, stacked=True, simplify=True) ## merge runs of equal contents
         exp_statsyst = self.expected.getStatSystHisto()
         ax.rerrorbar(exp_statsyst, kind="box", hatch=8*"/", ec="none", fc="none")
         ## observed
-        ax.rerrorbar(self.observed.stackTotal, kind="bar", fmt="ko")
+        obs_labels = [ oh.label for oh in self.observed.entries if oh.label ]
+        ax.rerrorbar(self.observed.stackTotal, kind="bar", fmt="ko", label=( obs_labels[0] if obs_labels else "_nolegend_" ))
+        ## one legend entry per labeled entry (e.g. group)
+        if obs_labels or any(not lbl.startswith("_") for lbl in exp_labels):
+            ax.legend()
 
     def drawRatio(self, ax=None):
         if ax is None:
@@ -85,7 +85,15 @@ class PlotStyle(BaseYAMLObject):
         return (r,g,b,a)
 
 
+class Group(PlotStyle):
+    """ Group of files that are drawn as one histogram (with the style of the group) """
+    required_attributes = set(("name",))
+    optional_attributes = mergeDicts(PlotStyle.optional_attributes, {
+              "order"            : None
+            })
+
 from systematics import HistoKey
+import glob
 
 class HistoFile(PlotStyle):
     required_attributes = set(("path", "type"))
@@ -104,22 +112,54 @@ class HistoFile(PlotStyle):
             , "legend-group"     : None
             ##
             , "order"            : None
+            , "tree-name"        : None
             })
-    def __init__(self, **kwargs):
+    def __init__(self, histoCache=None, tfile=None, **kwargs):
+        """ Constructor
+
+        Keyword arguments (in addition to the YAML attributes):
+          histoCache    histocache.HistoArrayCache for the HistoKeys, if any
+          tfile         TFile-like object to take the histograms from (e.g. a
+                        histocache.ArchiveTFile, or treefill.TreeFile), instead of the file at path
+                        (which is opened when needed)
+        If path is a glob pattern (or a list of paths), the histograms with the
+        same name in all files are added (see histocache.MergedTFile)
+        """
         super(HistoFile, self).__init__(**kwargs)
+        self.histoCache = histoCache
+        self.groupStyle = None ## Group, if the file is in one (set by plotIt_load)
         if self.pretty_name is None:
             self.pretty_name = self.path
         if self.yields_group is None:
             if self.group is not None:
                 self.yields_group = self.group
-            elif self.legend is not None:
+            elif self.legend:
                 self.yields_group = self.legend
             else:
                 self.yields_group = self.path ## FIXME path
 
-        from cppyy import gbl
-        self._tf = gbl.TFile.Open(self.path)
+        if tfile is not None:
+            self._tf = tfile
+        elif isinstance(self.path, (list, tuple)):
+            from histocache import MergedTFile
+            self._tf = MergedTFile(self.path)
+        elif glob.has_magic(self.path):
+            from histocache import MergedTFile
+            paths = sorted(glob.glob(self.path))
+            if "__" not in os.path.basename(self.path): ## not the files with systematic variations (see ShapeSystVar)
+                paths = [ pth for pth in paths if "__" not in os.path.basename(pth) ]
+            if not paths:
+                raise IOError("No files found for pattern '{0}'".format(self.path))
+            self._tf = MergedTFile(paths, name=self.path)
+        else:
+            from histocache import openFile
+            self._tf = openFile(self.path)
+    @property
+    def tfile(self):
+        """ the (TFile-like) object the histograms are taken from """
+        return self._tf
     def getKey(self, name, **kwargs):
+        kwargs.setdefault("cache", self.histoCache)
         return HistoKey(self._tf, name, **kwargs)
 
 class Plot(BaseYAMLObject):
@@ -171,9 +211,9 @@ class Plot(BaseYAMLObject):
             , "draw-string"               : None
             , "selection-string"          : None
             #
-            , "for-yields"                : True
-            , "yields-title"              : True
-            , "yields-table-order"        : True
+            , "for-yields"                : False
+            , "yields-title"              : None
+            , "yields-table-order"        : 0
             , "sort-by-yields"            : False
             #
             , "vertical-lines"            : []
@@ -192,15 +232,20 @@ class Plot(BaseYAMLObject):
         #    self.x_axis_range = lims
 
 def _plotit_loadWrapper(fpath):
-    """ yaml.safe_load from path """
+    """ yaml.safe_load from path (with the libyaml-based loader, if available) """
     import yaml
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
     with open(fpath) as f:
-        res = yaml.safe_load(f)
+        res = yaml.load(f, Loader=loader)
     return res
 
 import os.path
 
-def _load_includes(cfgDict, basePath):
+def _load_includes(cfgDict, basePath, included=None):
+    """ Replace {"include" : [ paths ]} nodes by the merged contents of the files (recursively)
+
+    The paths of all included files are appended to included, if given
+    """
     updDict = dict()
     for k,v in cfgDict.iteritems():
         if isinstance(v, dict):
@@ -208,18 +253,100 @@ def _load_includes(cfgDict, basePath):
                 vals = v[next(v.iterkeys())]
                 newDict = dict()
                 for iv in vals:
-                    iPath = vals[0]
+                    iPath = iv
                     if not os.path.isabs(iPath):
                         iPath = os.path.join(basePath, iPath)
                     if not os.path.exists(iPath):
                         raise IOError("Included path '{}' does not exist".format(iPath))
                     newDict.update(_plotit_loadWrapper(iPath))
+                    if included is not None:
+                        included.append(iPath)
                 updDict[k] = newDict
-                _load_includes(newDict, basePath)
+                _load_includes(newDict, basePath, included=included)
             else:
-                _load_includes(v, basePath)
+                _load_includes(v, basePath, included=included)
     cfgDict.update(updDict)
 
+## bump when the format of the resolved configuration changes
+_CONFIG_CACHE_VERSION = 1
+
+def _fileFingerprint(path):
+    """ (absolute path, modification time, size, SHA-1 of the contents) """
+    import hashlib
+    st = os.stat(path)
+    with open(path, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    return (os.path.abspath(path), st.st_mtime, st.st_size, digest)
+
+def _isUpToDate(fingerprint):
+    """ Check if a file is unchanged: same modification time and size, or same contents """
+    path, mtime, size, digest = fingerprint
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    if st.st_size != size:
+        return False
+    return st.st_mtime == mtime or _fileFingerprint(path)[3] == digest
+
+def _configCachePath(mainPath):
+    """ default cache file for a main YAML file: hidden file in the same directory """
+    dirName, baseName = os.path.split(os.path.abspath(mainPath))
+    return os.path.join(dirName, ".{0}.plotitcache".format(baseName))
+
+def _readConfigCache(cachePath, mainPath):
+    """ Resolved configuration from the cache, or None if missing or outdated """
+    import cPickle as pickle
+    try:
+        with open(cachePath, "rb") as f:
+            version, cachedMainPath, fingerprints, cfg = pickle.load(f)
+    except Exception:
+        return None
+    if version != _CONFIG_CACHE_VERSION or cachedMainPath != os.path.abspath(mainPath):
+        return None
+    if not all(_isUpToDate(fp) for fp in fingerprints):
+        return None
+    return cfg
+
+def _writeConfigCache(cachePath, mainPath, fingerprints, cfg):
+    """ Write the resolved configuration to the cache (atomically; silently skipped if not possible) """
+    import cPickle as pickle
+    import tempfile
+    try:
+        fd, tmpPath = tempfile.mkstemp(prefix=os.path.basename(cachePath), dir=os.path.dirname(os.path.abspath(cachePath)))
+    except (IOError, OSError):
+        return
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((_CONFIG_CACHE_VERSION, os.path.abspath(mainPath), fingerprints, cfg), f, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmpPath, cachePath)
+    except Exception:
+        if os.path.exists(tmpPath):
+            os.remove(tmpPath)
+
+def plotIt_loadConfig(mainPath, cache=True, cachePath=None):
+    """ Load the configuration dictionary from mainPath, with all includes resolved
+
+    If cache is True, the resolved configuration is stored in a binary cache file
+    (by default next to mainPath, see _configCachePath) and reused as long as
+    the main file and all included files are unchanged.
+    """
+    if cache:
+        if cachePath is None:
+            cachePath = _configCachePath(mainPath)
+        cfg = _readConfigCache(cachePath, mainPath)
+        if cfg is not None:
+            return cfg
+    ## fingerprint before reading, such that a file modified in between invalidates the cache
+    fingerprints = [ _fileFingerprint(mainPath) ] if cache else None
+    cfg = _plotit_loadWrapper(mainPath)
+    included = []
+    _load_includes(cfg, os.path.dirname(mainPath), included=included)
+    if cache:
+        fingerprints += [ _fileFingerprint(iPath) for iPath in included ]
+        _writeConfigCache(cachePath, mainPath, fingerprints, cfg)
+    return cfg
+
 def makeSystematic(item):
     from systematics import ShapeSystVar, ConstantSystVar, LogNormalSystVar
     if isinstance(item, str):
@@ -257,16 +384,43 @@ def _plotIt_histoPath(histoPath, cfgRoot, baseDir):
     else:
         return os.path.join(baseDir, cfgRoot, histoPath)
 
-def plotIt_load(mainPath, histoBaseDir):
-    ## load config, with includes
-    cfg = _plotit_loadWrapper(mainPath)
-    basedir = os.path.dirname(mainPath)
-    _load_includes(cfg, basedir)
+def plotIt_load(mainPath, histoBaseDir, cache=True, histoCache=None, archive=None):
+    ## load config, with includes (see plotIt_loadConfig for the cache)
+    cfg = plotIt_loadConfig(mainPath, cache=cache)
+    ## histoCache: directory for a histocache.HistoArrayCache (or instance)
+    if isinstance(histoCache, basestring):
+        from histocache import HistoArrayCache
+        histoCache = HistoArrayCache(histoCache)
+    ## archive: mplbplot.archive.HistoArchive (or path) to take the histograms from instead of the files,
+    ## with the paths relative to the configuration root as labels
+    if isinstance(archive, basestring):
+        from mplbplot.archive import HistoArchive
+        archive = HistoArchive(archive)
     plotDefaults = dict((k,v) for k,v in cfg["configuration"].iteritems() if k in ("y-axis-format", "show-overflow", "errors-type"))
     ## construct objects
-    files = odict(sorted(dict((k, HistoFile(path=_plotIt_histoPath(k, cfg["configuration"]["root"], histoBaseDir), **v)) for k, v in cfg["files"].iteritems()).iteritems(), key=lambda (k,v) : v.order))
-    ## TODO groups
     plots = dict((k, Plot(name=k, **mergeDicts(plotDefaults, v))) for k, v in cfg.get("plots", {}).iteritems())
+    ## tree mode: for the files with a tree-name (or all, if it is set in the configuration),
+    ## the histograms for the plots with a draw-string are filled from the trees (see treefill)
+    from treefill import TreeHistoSpec, openTreeFile
+    treeSpecs = [ TreeHistoSpec(pName, aPlot.draw_string, aPlot.binning_x, selectionString=aPlot.selection_string, binningY=aPlot.binning_y)
+                  for pName, aPlot in sorted(plots.iteritems()) if aPlot.draw_string ]
+    treeName = lambda fCfg : fCfg.get("tree-name") or cfg["configuration"].get("tree-name")
+    if treeSpecs and archive is None and not any(treeName(fCfg) for fCfg in cfg["files"].itervalues()):
+        raise ValueError("Plots with a draw-string ({0}) need a tree-name, in the configuration or for the files".format(", ".join(spec.name for spec in treeSpecs)))
+    from histocache import ArchiveTFile
+    def _tfile(fName, fCfg):
+        if archive is not None:
+            return ArchiveTFile(archive, fName)
+        elif treeSpecs and treeName(fCfg):
+            return openTreeFile(_plotIt_histoPath(fName, cfg["configuration"]["root"], histoBaseDir), treeName(fCfg), treeSpecs)
+    files = odict(sorted(dict((k, HistoFile(path=_plotIt_histoPath(k, cfg["configuration"]["root"], histoBaseDir), histoCache=histoCache, tfile=_tfile(k, v), **v)) for k, v in cfg["files"].iteritems()).iteritems(), key=lambda (k,v) : v.order))
+    ## groups: the style is taken from the "groups" section (if a group is not defined there, its name is the legend)
+    groups = dict((k, Group(name=k, **v)) for k, v in (cfg.get("groups") or dict()).iteritems())
+    for f in files.itervalues():
+        if f.group is not None:
+            if f.group not in groups:
+                groups[f.group] = Group(name=f.group, legend=f.group)
+            f.groupStyle = groups[f.group]
     systematics = [ makeSystematic(item) for item in cfg.get("systematics", []) ]
 
     return cfg, files, plots, systematics
@@ -282,52 +436,220 @@ def getScaleForFile(f, config):
         else:
             return mcScale*config.get("scale", 1.)*f.scale
 
-def plotIt(plots, files, systematics=None, config=None):
+def plotIt_scalesAndSystematics(files, systematics, config):
+    """ Scale factor and dictionary of systematics (name -> SystVar) for each file """
+    return odict((f,
+        (getScaleForFile(f, config), dict((syst.name, syst) for syst in systematics if syst.on(fN, f)))
+        ) for fN,f in files.iteritems())
+
+def plotIt_stacks(pName, aPlot, scaleAndSystematicsPerFile):
+    """ Construct the observed and expected stacks for a plot (the histograms are only loaded when used)
+
+    The files in a group are added (histograms and systematic variations) into one entry,
+    with the style of the group; files with the same legend-group get one legend entry.
+    """
+    from histstacksandratioplot import THistogramStack
+    from systematics import SystVarsForHist, HistoGroup, SystVarsForGroup
+    ## collect the histograms per group (or file, if not in a group), in order of the first file
+    entries = odict()
+    for f, (fScale, fSysts) in scaleAndSystematicsPerFile.iteritems():
+        if f.type not in ("data", "mc"):
+            continue
+        hk = f.getKey(pName, scale=fScale, rebin=aPlot.rebin, xOverflowRange=(aPlot.x_axis_range if aPlot.show_overflow else None))
+        entries.setdefault(( f.type, ( f.group if f.group is not None else f ) ), []).append((f, hk, SystVarsForHist(hk, fSysts)))
+    obsStack = THistogramStack()
+    expStack = THistogramStack()
+    legendGroups = set()
+    for (fType, grp), members in entries.iteritems():
+        f = members[0][0]
+        style = f.groupStyle if f.groupStyle is not None else f
+        if f.group is None:
+            f, hist, systVars = members[0]
+        else:
+            hist = HistoGroup([ hk for mf, hk, mSysts in members ])
+            systVars = SystVarsForGroup(hist, [ mSysts for mf, hk, mSysts in members ])
+        label = style.legend
+        if f.legend_group is not None:
+            if f.legend_group in legendGroups:
+                label = None
+            legendGroups.add(f.legend_group)
+        if fType == "data":
+            obsStack.add(hist, systVars=systVars, label=label)
+        else:
+            expStack.add(hist, systVars=systVars, label=label, drawOpts={"fill_color":style.fill_color})
+    return obsStack, expStack
+
+def plotIt_loadStacks(obsStack, expStack):
+    """ Load all histograms (nominal and variations) of the stacks for a plot
+
+    Returns the approximate memory taken by them, in bytes
+    (double-precision contents and sumw2, assuming all variations are histograms)
+    """
+    nBytes = 0
+    for stack in (obsStack, expStack):
+        stack.load()
+        nBytes += sum(16*entry.hist.obj.GetNcells()*(1+2*len(entry.systVars)) for entry in stack.entries)
+    return nBytes
+
+def plotIt_iterStacks(plots, scaleAndSystematicsPerFile, prefetchDepth=0, prefetchMaxBytes=512*1024**2):
+    """ Iterate over (name, plot, obsStack, expStack) for (name, plot) in plots, with all histograms loaded
+
+    The histograms for the next prefetchDepth plots are loaded in the background
+    (up to about prefetchMaxBytes, see prefetch.prefetched)
+    """
+    from prefetch import prefetched
+    return prefetched(( (pName, aPlot) + plotIt_stacks(pName, aPlot, scaleAndSystematicsPerFile) for pName, aPlot in plots )
+            , lambda (pName, aPlot, obsStack, expStack) : plotIt_loadStacks(obsStack, expStack)
+            , depth=prefetchDepth, maxBytes=prefetchMaxBytes)
+
+def plotIt_draw(aPlot, obsStack, expStack, template=None):
+    """ Draw the stacks for a plot, and set the axis ranges and titles; returns the THistogramRatioPlot
+
+    If a RatioPlotTemplate is passed, it is reset and reused (otherwise a new figure is made)
+    """
+    from histstacksandratioplot import THistogramRatioPlot
+    if aPlot.sort_by_yields: ## smallest at the bottom
+        expStack.sort(key=lambda entry : entry.hist.Integral())
+    theplot = THistogramRatioPlot(expected=expStack, observed=obsStack, template=template) ## TODO more opts?
+    theplot.draw()
+    #
+    if aPlot.x_axis_range:
+        theplot.ax.set_xlim(*aPlot.x_axis_range)
+    if aPlot.x_axis:
+        theplot.rax.set_xlabel(aPlot.x_axis)
+    #
+    if aPlot.y_axis_range:
+        theplot.ax.set_ylim(*aPlot.y_axis_range)
+    else:
+        if not aPlot.log_y:
+            theplot.ax.set_ylim(0.)
+    if aPlot.y_axis:
+        theplot.ax.set_ylabel(aPlot.y_axis)
+    elif aPlot.y_axis_format:
+        pass
+    return theplot
+
+def plotIt_rasterization(config):
+    """ Rasterization policy for the vector formats (see mplbplot.rasterize), from the configuration
+
+    Artists with more than rasterize-threshold elements (default 20000; null to switch off)
+    are rasterized with a resolution of rasterize-dpi (default 300)
+    """
+    threshold = config.get("rasterize-threshold", 20000)
+    if threshold is None or threshold is False:
+        return None
+    from mplbplot.rasterize import RasterizationPolicy
+    return RasterizationPolicy(threshold=threshold, dpi=config.get("rasterize-dpi", 300))
+
+def plotIt_save(theplot, pName, extensions, outDir=".", saver=None, rasterization=None):
+    """ Save the figure of a plot (one file per extension)
+
+    If a figsaver.FigureSaver is passed, the files are written in the background,
+    and the SaveHandle is returned (the figure should not be modified before it is ready);
+    otherwise the rasterization policy, if given, is applied for the vector formats
+    (a FigureSaver has its own, see plotIt_rasterization)
+    """
+    if saver is not None:
+        return saver.save(theplot.fig, os.path.join(outDir, pName), extensions, name=pName) ## pName in the bundles
+    for ext in extensions:
+        path = os.path.join(outDir, "{0}.{1}".format(pName, ext))
+        if rasterization is not None and rasterization.appliesTo(ext):
+            with rasterization.applied(theplot.fig):
+                theplot.fig.savefig(path, dpi=rasterization.dpi)
+        else:
+            theplot.fig.savefig(path)
+
+def plotIt_bundles(bundles, outDir="."):
+    """ Bundles for figsaver.FigureSaver from a dictionary of extension to file name (relative to outDir)
+
+    The type of bundle is chosen from the file name: pdf can be written to a multi-page PDF document (.pdf),
+    and the raster formats to a zip or tar file (.zip, .tar, .tar.gz or .tgz; formats with the same file name
+    go to the same archive), e.g. { "pdf" : "plots.pdf", "png" : "plots.zip" }
+    """
+    from figsaver import PdfDocument, ImageArchive
+    bundleTypes = dict()
+    for ext, fName in bundles.iteritems():
+        bType = next(( bType for bType in (PdfDocument, ImageArchive) if any(fName.lower().endswith(sfx) for sfx in bType.suffixes) ), None)
+        if bType is None:
+            raise ValueError("Unknown bundle type for {0} (should be .pdf, .zip, .tar, .tar.gz or .tgz)".format(fName))
+        if ext.lower() not in bType.extensions:
+            raise ValueError("Cannot write {0} to {1} (only {2})".format(ext, fName, ", ".join(sorted(bType.extensions))))
+        bundleTypes[os.path.join(outDir, fName)] = bType
+    perPath = dict((path, bType(path)) for path, bType in bundleTypes.iteritems()) ## only opened if all are valid
+    return dict((ext, perPath[os.path.join(outDir, fName)]) for ext, fName in bundles.iteritems())
+
+def plotIt(plots, files, systematics=None, config=None, outDir=".", saveThreads=0, prefetchDepth=0, prefetchMaxBytes=512*1024**2, yieldsFormats=("tex",), treeThreads=4, bundles=None, renderCache=None):
+    """ Make and save all plots
+
+    By default a single figure (outside the pyplot registry) is reused for all plots,
+    and the plots are saved synchronously. With saveThreads > 0 two figures are used:
+    while one plot is being saved (by saveThreads worker threads), the next one is drawn on the other.
+    With prefetchDepth > 0, the histograms for the next prefetchDepth plots are loaded
+    in the background (see plotIt_iterStacks; this enables ROOT's thread safety).
+    If any plot is for yields, the yields table is written to outDir/yields.ext
+    for each of the yieldsFormats (see yields.YieldsTable).
+    In tree mode, the histograms are first filled from the trees of treeThreads files
+    in parallel (except for the files with a histogram cache, which may not need that).
+    Heavy artists are rasterized in the vector formats, see plotIt_rasterization for the options.
+    Instead of one file per plot and extension, all plots can be written to a multi-page PDF
+    and zip or tar files with the images, by passing a dictionary of extension to file name
+    as bundles (or as the bundles option in the configuration; see plotIt_bundles).
+    With a renderCache (mplbplot.rendercache.RenderCache or its directory; or the render-cache
+    option in the configuration), the files of plots that are unchanged since they were last
+    saved are written from there, without rendering them again.
+    """
     ## default kwargs
     if systematics is None:
         systematics = list()
     if config is None:
         config = dict()
+    if bundles is None:
+        bundles = config.get("bundles", dict())
+    if renderCache is None:
+        renderCache = config.get("render-cache")
+    if isinstance(renderCache, basestring):
+        from mplbplot.rendercache import RenderCache
+        renderCache = RenderCache(renderCache)
 
-    scaleAndSystematicsPerFile = odict((f,
-        (getScaleForFile(f, config), dict((syst.name, syst) for syst in systematics if syst.on(fN, f)))
-        ) for fN,f in files.iteritems())
+    scaleAndSystematicsPerFile = plotIt_scalesAndSystematics(files, systematics, config)
 
-    from histstacksandratioplot import THistogramStack, THistogramRatioPlot
-    from systematics import SystVarsForHist
-    for pName, aPlot in plots.iteritems():
-        obsStack = THistogramStack()
-        expStack = THistogramStack()
-        for f, (fScale, fSysts) in scaleAndSystematicsPerFile.iteritems():
-            hk = f.getKey(pName, scale=fScale, rebin=aPlot.rebin, xOverflowRange=(aPlot.x_axis_range if aPlot.show_overflow else None))
-            if f.type == "data":
-                obsStack.add(hk, systVars=SystVarsForHist(hk, fSysts)) ##, label=..., drawOpts=...
-            elif f.type == "mc":
-                expStack.add(hk, systVars=SystVarsForHist(hk, fSysts), drawOpts={"fill_color":f.fill_color}) ##, label=..., drawOpts=...
-        theplot = THistogramRatioPlot(expected=expStack, observed=obsStack) ## TODO more opts?
-        theplot.draw()
-        #
-        if aPlot.x_axis_range:
-            theplot.ax.set_xlim(*aPlot.x_axis_range)
-        if aPlot.x_axis:
-            theplot.rax.set_xlabel(aPlot.x_axis)
-        #
-        if aPlot.y_axis_range:
-            theplot.ax.set_ylim(*aPlot.y_axis_range)
-        else:
-            if not aPlot.log_y:
-                theplot.ax.set_ylim(0.)
-        if aPlot.y_axis:
-            theplot.ax.set_ylabel(aPlot.y_axis)
-        elif aPlot.y_axis_format:
-            pass
-        #
-        for ext in aPlot.save_extensions:
-            theplot.fig.savefig("{0}.{1}".format(pName, ext))
-
-
-def plotItFromYAML(yamlFileName, histoBaseDir):
-    cfg, files, plots, systematics = plotIt_load(yamlFileName, histoBaseDir)
+    from treefill import TreeFile, fillAll
+    fillAll([ f.tfile for f in files.itervalues() if isinstance(f.tfile, TreeFile) and f.histoCache is None ], nThreads=treeThreads)
+
+    yields = None
+    if yieldsFormats and any(aPlot.for_yields for aPlot in plots.itervalues()):
+        from yields import YieldsTable
+        yields = YieldsTable(files)
+
+    from histstacksandratioplot import RatioPlotTemplate
+    from figsaver import FigureSaver
+    templates = [ RatioPlotTemplate(useRegistry=False) for i in xrange(2 if saveThreads > 0 else 1) ]
+    try:
+        from mplbplot.rendercache import fingerprinting
+        with FigureSaver(nThreads=saveThreads, rasterization=plotIt_rasterization(config), bundles=plotIt_bundles(bundles, outDir=outDir), cache=renderCache) as saver, fingerprinting(renderCache is not None): ## waits for all files to be written
+            pending = [ None for tmpl in templates ]
+            for i, (pName, aPlot, obsStack, expStack) in enumerate(plotIt_iterStacks(plots.iteritems(), scaleAndSystematicsPerFile,
+                    prefetchDepth=prefetchDepth, prefetchMaxBytes=prefetchMaxBytes)):
+                if yields is not None:
+                    yields.fill(pName, aPlot, obsStack, expStack)
+                iTmpl = i % len(templates)
+                if pending[iTmpl] is not None:
+                    pending[iTmpl].wait()
+                theplot = plotIt_draw(aPlot, obsStack, expStack, template=templates[iTmpl])
+                pending[iTmpl] = plotIt_save(theplot, pName, aPlot.save_extensions, outDir=outDir, saver=saver)
+    finally:
+        for tmpl in templates:
+            tmpl.close()
+    if yields is not None:
+        for ext in yieldsFormats:
+            kwargs = dict()
+            if ext == "tex":
+                kwargs = { "precision" : config.get("yields-table-numerical-precision-yields", 1), "stretch" : config.get("yields-table-stretch", 1.15) }
+            yields.write(os.path.join(outDir, "yields.{0}".format(ext)), **kwargs)
+
+
+def plotItFromYAML(yamlFileName, histoBaseDir, histoCache=None, archive=None):
+    cfg, files, plots, systematics = plotIt_load(yamlFileName, histoBaseDir, histoCache=histoCache, archive=archive)
     ### get list of files, get list of systs, dict of systs per file; then list of plots: for each plot build the stacks and draw
     ## TODO cfg -> config
     plotIt(plots, files, systematics=systematics, config=cfg["configuration"])
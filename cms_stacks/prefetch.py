@@ -0,0 +1,67 @@
+"""
+Load the inputs for the next items (e.g. the histograms for the next plots) in the background
+
+The loading is done on a single worker thread, such that it can overlap with
+drawing and saving the current plot, and the loaded objects end up where the
+main thread uses them (e.g. the HistoKey caches). A worker process cannot do
+that without converting and copying every histogram.
+
+The worker opens files and reads objects while the main thread draws the items
+that were yielded before, so both can be in ROOT at the same time: ROOT's
+thread safety (ROOT::EnableThreadSafety) is switched on before the worker starts,
+and load should only touch the objects of the items it loads.
+"""
+__all__ = ("prefetched",)
+
+import collections
+
+def _enableROOTThreadSafety():
+    from cppyy import gbl
+    gbl.ROOT.EnableThreadSafety()
+
+def prefetched(items, load, depth=2, maxBytes=None):
+    """
+    Iterate over items, calling load(item) on a worker thread for up to depth items ahead
+
+    Every item is yielded only after load(item) has finished (exceptions are raised then),
+    but the worker may be loading the next items while the consumer uses it
+    (ROOT's thread safety is enabled for that, see above).
+    load should return the (approximate) memory taken by what it loaded, in bytes:
+    if maxBytes is given, no more items are loaded ahead once the items that
+    are loaded (or being loaded) but not yet yielded exceed that
+    (for those that are still being loaded, the average of the previous ones is used).
+    With depth=0 everything is done synchronously.
+    """
+    if depth <= 0:
+        for item in items:
+            load(item)
+            yield item
+        return
+
+    _enableROOTThreadSafety()
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(1)
+    try:
+        itItems = iter(items)
+        ahead = collections.deque() ## (item, AsyncResult), in order
+        sizes = [] ## of the items that were loaded (for the estimate)
+        def aheadBytes():
+            avgSize = ( float(sum(sizes))/len(sizes) if sizes else 0. )
+            return sum(( ( res.get() or 0 ) if res.ready() and res.successful() else avgSize ) for item, res in ahead)
+        exhausted = False
+        while True:
+            while ( not exhausted ) and len(ahead) <= depth and ( maxBytes is None or len(ahead) == 0 or aheadBytes() < maxBytes ):
+                try:
+                    item = next(itItems)
+                except StopIteration:
+                    exhausted = True
+                else:
+                    ahead.append((item, pool.apply_async(load, (item,))))
+            if not ahead:
+                break
+            item, res = ahead.popleft()
+            sizes.append(res.get() or 0)
+            yield item
+    finally:
+        pool.close() ## let the worker finish what it is loading
+        pool.join()
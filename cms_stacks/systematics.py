@@ -1,11 +1,12 @@
 """
 Systematics classes (based on plotIt)
 """
-__all__ = ("HistoKey", "SystVarsForHist",
+__all__ = ("HistoKey", "HistoGroup", "SystVarsForHist", "SystVarsForGroup",
            "SystVar", "ParameterizedSystVar", "ConstantSystVar", "LogNormalSystVar", "ShapeSystVar"
           )
 
 import itertools
+import numpy as np
 import histo_utils as h1u
 
 class HistoKey(object):
@@ -16,8 +17,8 @@ class HistoKey(object):
     and apply scaling and rebinning as needed at that point.
     """
     """ Small wrapper around TH1, to keep track of origin file, name and transformation (scale and rebin) """
-    __slots__ = ("tfile", "name", "scale", "rebin", "xOverflowRange", "_obj")
-    def __init__(self, tfile, name, scale=1., rebin=1, xOverflowRange=None):
+    __slots__ = ("tfile", "name", "scale", "rebin", "xOverflowRange", "cache", "_obj")
+    def __init__(self, tfile, name, scale=1., rebin=1, xOverflowRange=None, cache=None):
         """ Constructor
 
         Argments:
@@ -29,12 +30,15 @@ class HistoKey(object):
           xOverflowRange    visible range of the x-axis (bins outside,
                             including histogram overflows, will be added
                             to the first and last bin inside)
+          cache             histocache.HistoArrayCache to load the (transformed)
+                            histogram from, or store it in
         """
         self.tfile = tfile
         self.name = name
         self.scale = scale
         self.rebin = rebin
         self.xOverflowRange = xOverflowRange
+        self.cache = cache
         self._obj = None
     def __repr__(self):
         return "HistoKey({0!r}, {1!r}{2})".format(self.tfile, self.name, (", ".join(("", "scale={0:f}".format(self.scale), "rebin={0:d}".format(self.rebin), "xOverflowRange={0}".format(repr(self.xOverflowRange))))))
@@ -45,17 +49,25 @@ class HistoKey(object):
         Will make a deep copy (except for the tfile)
         """
         return HistoKey( tfile if tfile is not None else self.tfile
-                       , name if str(name) is not None else self.name
+                       , name if name is not None else self.name
                        , scale=(scale if scale is not None else self.scale )
                        , rebin=(rebin if rebin is not None else self.rebin )
                        , xOverflowRange=(tuple(xOverflowRange) if xOverflowRange is not None else self.xOverflowRange )
+                       , cache=self.cache
                        )
 
     def _get(self):
+        if self.cache is not None:
+            res = self.cache.load(self)
+            if res is not None:
+                self._obj = res
+                return
         if ( not self.tfile ) or self.tfile.IsZombie() or ( not self.tfile.IsOpen() ):
             raise RuntimeError("File '{}'cannot be read".format(self.tfile))
         res = self.tfile.Get(self.name)
         if not res:
+            if self.cache is not None:
+                self.cache.storeMissing(self)
             raise KeyError("Could not retrieve key '{0}' from file {1!r}".format(self.name, self.tfile))
         if ( self.scale != 1. ) or ( self.rebin != 1 ) or ( self.xOverflowRange is not None ):
             res = h1u.cloneHist(res)
@@ -68,7 +80,18 @@ class HistoKey(object):
                 res.Scale(self.scale)
             if self.rebin != 1:
                 res.Rebin(self.rebin)
+        if self.cache is not None:
+            self.cache.store(self, res)
         self._obj = res
+    def exists(self):
+        """ check if the histogram can be found (it is loaded if so) """
+        if self.cache is not None and self.cache.contains(self) is False:
+            return False
+        try:
+            self.obj
+        except KeyError:
+            return False
+        return True
     @property
     def obj(self):
         """ the underlying TH1 object """
@@ -78,6 +101,44 @@ class HistoKey(object):
     def __getattr__(self, name):
         return getattr(self.obj, name)
 
+class HistoGroup(object):
+    """
+    Sum of several histograms (HistoKey), e.g. for the files in a group
+
+    Behaves like HistoKey: the sum is made when first used, and cached
+    """
+    __slots__ = ("members", "_obj")
+    def __init__(self, members):
+        self.members = list(members)
+        self._obj = None
+    def __repr__(self):
+        return "HistoGroup({0!r})".format(self.members)
+    @property
+    def name(self):
+        return self.members[0].name
+    def _get(self):
+        res = h1u.cloneHist(self.members[0].obj)
+        for member in self.members[1:]:
+            res.Add(member.obj)
+        self._obj = res
+    def load(self):
+        """ Load all members """
+        for member in self.members:
+            member.obj
+    @property
+    def obj(self):
+        """ the summed TH1 object """
+        if not self._obj:
+            self._get()
+        return self._obj
+    def __getattr__(self, name):
+        return getattr(self.obj, name)
+
+def _binContents(hist):
+    """ contents of all bins of a histogram (HistoKey, HistoGroup or TH1), including underflow and overflow, from its buffer """
+    from mplbplot.decorators import cellArrays
+    return cellArrays(getattr(hist, "obj", hist))[0]
+
 class SystVar(object):
     """ interface & base for a systematic variation (without specified histogram) """
     @staticmethod
@@ -110,10 +171,11 @@ class SystVar(object):
 
     class ForHist(object):
         """ Interface & base for systematic variation for a single histogram """
-        __slots__ = ("hist", "systVar")
+        __slots__ = ("hist", "systVar", "_arrays")
         def __init__(self, hist, systVar):
             self.hist = hist
             self.systVar = systVar
+            self._arrays = None
         def nom(self, i):
             """ Nominal value for bin i """
             pass
@@ -123,24 +185,109 @@ class SystVar(object):
         def down(self, i):
             """ Down variation for bin i """
             pass
+        def load(self):
+            """ Load the histograms needed for the variations (if any) """
+            pass
+        def arrays(self):
+            """ Nominal, up and down values for all bins (numpy arrays, including underflow and overflow; cached) """
+            if self._arrays is None:
+                self._arrays = self._makeArrays()
+            return self._arrays
+        def _makeArrays(self):
+            """ (nom, up, down) arrays; the subclasses make them from the histogram buffers, this fallback calls the per-bin methods """
+            binRange = xrange(self.hist.GetNbinsX()+2)
+            return tuple(np.array([ fun(i) for i in binRange ]) for fun in (self.nom, self.up, self.down))
+        def maxVariation(self):
+            """ Largest absolute difference of the up and down variation with the nominal, for all bins (numpy array) """
+            nom, up, down = self.arrays()
+            return np.maximum(np.abs(up-nom), np.abs(down-nom))
 
 import collections
 class SystVarsForHist(collections.Mapping):
     """ dict-like object to assign as systVars to an entry
 
-    (parent is the actual dictionary with SystVars) """
-    __slots__ = ("hist", "parent")
+    (parent is the actual dictionary with SystVars;
+    the variations for hist are constructed when first accessed, and cached) """
+    __slots__ = ("hist", "parent", "_forHist")
     def __init__(self, hist, parent):
         self.hist = hist
         self.parent = parent
+        self._forHist = dict()
     def __getitem__(self, ky):
-        return self.parent[ky].forHist(self.hist)
+        if ky not in self._forHist:
+            self._forHist[ky] = self.parent[ky].forHist(self.hist)
+        return self._forHist[ky]
+    def __contains__(self, ky):
+        return ky in self.parent
     def __iter__(self):
         for systVar in self.parent.iterkeys():
             yield systVar
     def __len__(self):
         return len(self.parent)
 
+class SystVarsForGroup(collections.Mapping):
+    """ dict-like object to assign as systVars to an entry for a HistoGroup
+
+    (members are the systVars of the members of the group, in the same order;
+    the variations of the members are added, those without a variation
+    contribute their nominal value) """
+    __slots__ = ("hist", "members", "_forGroup")
+    def __init__(self, hist, members):
+        self.hist = hist
+        self.members = list(members)
+        self._forGroup = dict()
+    def __getitem__(self, ky):
+        if ky not in self._forGroup:
+            if ky not in self:
+                raise KeyError(ky)
+            self._forGroup[ky] = SystVarsForGroup.ForGroup(self.hist, [ ( mSysts[ky] if ky in mSysts else None ) for mSysts in self.members ])
+        return self._forGroup[ky]
+    def __contains__(self, ky):
+        return any(ky in mSysts for mSysts in self.members)
+    def __iter__(self):
+        seen = set()
+        for mSysts in self.members:
+            for ky in mSysts:
+                if ky not in seen:
+                    seen.add(ky)
+                    yield ky
+    def __len__(self):
+        return sum(1 for ky in self)
+
+    class ForGroup(object):
+        """ Systematic variation for a group: sum of those of the members (see SystVar.ForHist for the interface) """
+        __slots__ = ("hist", "variations", "_arrays")
+        def __init__(self, hist, variations):
+            self.hist = hist
+            self.variations = variations
+            self._arrays = None
+        def load(self):
+            for vari in self.variations:
+                if vari is not None:
+                    vari.load()
+        def arrays(self):
+            if self._arrays is None:
+                nom, up, down = 0., 0., 0.
+                for member, vari in itertools.izip(self.hist.members, self.variations):
+                    if vari is not None:
+                        mNom, mUp, mDown = vari.arrays()
+                    else:
+                        mNom = _binContents(member.obj)
+                        mUp, mDown = mNom, mNom
+                    nom, up, down = nom+mNom, up+mUp, down+mDown
+                self._arrays = (nom, up, down)
+            return self._arrays
+        def maxVariation(self):
+            """ Largest absolute difference of the up and down variation of the group with its nominal, for all bins """
+            nom, up, down = self.arrays()
+            return np.maximum(np.abs(up-nom), np.abs(down-nom))
+        def nom(self, i):
+            return self.arrays()[0][i]
+        def up(self, i):
+            return self.arrays()[1][i]
+        def down(self, i):
+            return self.arrays()[2][i]
+
 class ParameterizedSystVar(SystVar):
     """ base for constant etc. """
     def __init__(self, name, pretty_name=None, on=SystVar.default_filter):
@@ -151,12 +298,21 @@ class ParameterizedSystVar(SystVar):
         pass
     def down(self, hist, i):
         pass
+    def scales(self):
+        """ (up, down) factors for the nominal contents, or None if the variation is not a scale """
+        return None
 
     class ForHist(SystVar.ForHist):
         """ delegate everything to the corresponding systVar methods """
         __slots__ = tuple()
         def __init__(self, hist, systVar):
             super(ParameterizedSystVar.ForHist, self).__init__(hist, systVar)
+        def _makeArrays(self):
+            scales = self.systVar.scales()
+            if scales is None:
+                return super(ParameterizedSystVar.ForHist, self)._makeArrays()
+            nom = _binContents(self.hist)
+            return nom, nom*scales[0], nom*scales[1]
         def nom(self, i):
             return self.systVar.nom(self.hist, i)
         def up(self, i):
@@ -178,6 +334,8 @@ class ConstantSystVar(ParameterizedSystVar):
         return self.nom(hist, i)*self.value
     def down(self, hist, i):
         return self.nom(hist, i)*(2-self.value)
+    def scales(self):
+        return (self.value, 2-self.value)
 
 class LogNormalSystVar(ParameterizedSystVar):
     """ """
@@ -206,6 +364,8 @@ class LogNormalSystVar(ParameterizedSystVar):
         return self.nom(hist, i)*self.value_up
     def down(self, hist, i):
         return self.nom(hist, i)*self.value_down
+    def scales(self):
+        return (self.value_up, self.value_down)
 
 class ShapeSystVar(SystVar):
     """ for shapes """
@@ -220,19 +380,19 @@ class ShapeSystVar(SystVar):
             self.histDown = self._findVarHist("down")
         def _findVarHist(self, vari):
             variHistName = "{0}__{1}{2}".format(self.hist.name, self.systVar.name, vari)
-            if self.hist.tfile.Get(variHistName):
-                return self.hist.clone(name=variHistName)
+            variHist = self.hist.clone(name=variHistName)
+            if variHist.exists():
+                return variHist
             else: ## try to find the file
                 import os.path
                 fullpath = self.hist.tfile.GetPath().split(":")[0]
                 variPath = os.path.join(os.path.dirname(fullpath), "{0}__{1}{2}.root".format(os.path.splitext(os.path.basename(fullpath))[0], self.systVar.name, vari))
-                if os.path.exists(variPath):
-                    from cppyy import gbl
-                    vf = gbl.TFile.Open(variPath)
-                    if ( not vf ) or vf.IsZombie() or ( not vf.IsOpen() ):
-                        raise IOError("Could not open file '{}' correctly".format(variPath))
-                    if vf.Get(self.hist.name):
-                        return self.hist.clone(tfile=vf)
+                from histocache import siblingFile
+                variFile = siblingFile(self.hist.tfile, variPath) ## opened when needed (not if cached), and only once
+                if variFile is not None:
+                    variHist = self.hist.clone(tfile=variFile)
+                    if variHist.exists():
+                        return variHist
                     else:
                         print "Could not find '{0}' in file '{1}'".format(self.hist.name, variPath)
                         #raise KeyError()
@@ -242,6 +402,11 @@ class ShapeSystVar(SystVar):
                     #raise IOError("Path '{}' does not exist".format(variPath))
                 #print "Warning: could not find variation hist of {0} for {1}, assuming no variation then".format(self.hist, self.systVar.name)
                 return self.hist
+        def load(self):
+            self.histUp.obj
+            self.histDown.obj
+        def _makeArrays(self):
+            return tuple(_binContents(hist) for hist in (self.hist, self.histUp, self.histDown))
         def nom(self, i):
             return self.hist.GetBinContent(i)
         def up(self, i):
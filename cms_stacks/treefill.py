@@ -0,0 +1,299 @@
+"""
+Fill the histograms for all plots from trees, in a single pass over each tree
+
+For plots with a draw-string (and optionally a selection-string, and binning-x
+and binning-y), the expressions are evaluated on numpy arrays with the branches
+they use, which are read in chunks (with uproot, if available, or RDataFrame),
+such that every tree is read only once for all plots, and every histogram is filled
+from each chunk with a few vectorized operations (np.searchsorted and np.bincount).
+
+The expressions are those of TTree::Draw, restricted to scalar branches, arithmetic,
+comparisons, logical operators (&&, ||, !) and the common TMath functions;
+as for TTree::Draw, the selection is a weight (false is zero, true is one),
+and for two-dimensional histograms the draw-string is "y:x".
+
+TreeFile makes the histograms available to HistoKey as if they were in a TFile
+(they are filled for all plots when the first one is needed), such that
+scaling, rebinning, systematic variations (with trees in the sibling files)
+and the histogram cache (see histocache) work as for files with histograms;
+other objects are taken from the file itself.
+"""
+__all__ = ("Expression", "TreeHistoSpec", "parseBinning", "iterTreeChunks", "fillHistos", "TreeFile", "openTreeFile", "fillAll")
+
+import ast
+import re
+import os.path
+import hashlib
+import threading
+
+import numpy as np
+
+_functions = {
+      "abs"   : np.abs    , "Abs"   : np.abs
+    , "sqrt"  : np.sqrt   , "Sqrt"  : np.sqrt
+    , "exp"   : np.exp    , "Exp"   : np.exp
+    , "log"   : np.log    , "Log"   : np.log
+    , "log10" : np.log10  , "Log10" : np.log10
+    , "pow"   : np.power  , "Power" : np.power
+    , "cos"   : np.cos    , "Cos"   : np.cos
+    , "sin"   : np.sin    , "Sin"   : np.sin
+    , "tan"   : np.tan    , "Tan"   : np.tan
+    , "acos"  : np.arccos , "ACos"  : np.arccos
+    , "asin"  : np.arcsin , "ASin"  : np.arcsin
+    , "atan"  : np.arctan , "ATan"  : np.arctan
+    , "atan2" : np.arctan2, "ATan2" : np.arctan2
+    , "cosh"  : np.cosh   , "CosH"  : np.cosh
+    , "sinh"  : np.sinh   , "SinH"  : np.sinh
+    , "tanh"  : np.tanh   , "TanH"  : np.tanh
+    , "hypot" : np.hypot  , "Hypot" : np.hypot
+    , "min"   : np.minimum, "Min"   : np.minimum
+    , "max"   : np.maximum, "Max"   : np.maximum
+    , "floor" : np.floor  , "Floor" : np.floor
+    , "ceil"  : np.ceil   , "Ceil"  : np.ceil
+    , "Pi"    : lambda : np.pi ## TMath::Pi()
+    , "true"  : True      , "false" : False
+    , "_and"  : np.logical_and
+    , "_or"   : np.logical_or
+    , "_not"  : np.logical_not
+    }
+
+class _ToNumpy(ast.NodeTransformer):
+    """ Replace logical operators by the numpy functions (which work element-wise) """
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        fun = "_and" if isinstance(node.op, ast.And) else "_or"
+        res = node.values[0]
+        for val in node.values[1:]:
+            res = ast.Call(func=ast.Name(id=fun, ctx=ast.Load()), args=[res, val], keywords=[], starargs=None, kwargs=None)
+        return ast.copy_location(res, node)
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return ast.copy_location(ast.Call(func=ast.Name(id="_not", ctx=ast.Load()), args=[node.operand], keywords=[], starargs=None, kwargs=None), node)
+        return node
+    def visit_Compare(self, node):
+        if len(node.ops) != 1:
+            raise ValueError("Chained comparisons are not supported")
+        self.generic_visit(node)
+        return node
+
+class Expression(object):
+    """
+    TTree::Draw expression, evaluated on a dictionary of numpy arrays
+
+    >>> expr = Expression("sqrt(px*px+py*py) > 20 && !isFake")
+    >>> expr.branches
+    set(["px", "py", "isFake"])
+    >>> expr.evaluate({ "px" : pxArr, "py" : pyArr, "isFake" : isFakeArr })
+    """
+    __slots__ = ("expr", "branches", "_code")
+    def __init__(self, expr):
+        self.expr = expr
+        pyExpr = re.sub(r"\b(?:TMath|std)::", "", expr)
+        if "?" in pyExpr:
+            raise ValueError("The ternary operator is not supported (in '{0}')".format(expr))
+        pyExpr = pyExpr.replace("&&", " and ").replace("||", " or ")
+        pyExpr = re.sub(r"!(?!=)", " not ", pyExpr)
+        try:
+            tree = ast.parse(pyExpr.strip(), mode="eval")
+        except SyntaxError as ex:
+            raise ValueError("Could not parse expression '{0}': {1}".format(expr, ex))
+        tree = ast.fix_missing_locations(_ToNumpy().visit(tree))
+        self.branches = set(nd.id for nd in ast.walk(tree) if isinstance(nd, ast.Name) and nd.id not in _functions and nd.id not in ("True", "False"))
+        self._code = compile(tree, "<{0}>".format(expr), "eval")
+    def __repr__(self):
+        return "Expression({0!r})".format(self.expr)
+    def evaluate(self, columns):
+        """ evaluate for a dictionary of arrays (all branches should be there) """
+        ns = dict(_functions)
+        ns.update((br, columns[br]) for br in self.branches)
+        return eval(self._code, { "__builtins__" : None }, ns)
+
+def parseBinning(binning):
+    """ Bin edges (numpy array) for [ nBins, min, max ] (three numbers, the first an integer)
+    or a list of bin edges (also as a comma-separated string, with or without brackets) """
+    if isinstance(binning, basestring):
+        binning = [ float(tok) for tok in binning.strip("[]() ").split(",") if tok.strip() ]
+    binning = list(binning)
+    if len(binning) == 3 and float(binning[0]).is_integer() and int(binning[0]) > 0 and binning[2] > binning[1]:
+        return np.linspace(float(binning[1]), float(binning[2]), int(binning[0])+1)
+    edges = np.array(binning, dtype=np.float64)
+    if len(edges) < 2 or np.any(np.diff(edges) <= 0.):
+        raise ValueError("Invalid binning {0!r}: should be [ nBins, min, max ] or increasing bin edges".format(binning))
+    return edges
+
+class TreeHistoSpec(object):
+    """ Histogram to fill from a tree: name, x (and y) expressions, selection (weight), and binning """
+    __slots__ = ("name", "drawString", "selectionString", "xEdges", "yEdges", "x", "y", "selection")
+    def __init__(self, name, drawString, binningX, selectionString=None, binningY=None):
+        self.name = name
+        self.drawString = drawString
+        self.selectionString = selectionString
+        exprs = re.split(r"(?<!:):(?!:)", drawString)
+        if len(exprs) == 1:
+            self.y, self.x = None, Expression(exprs[0])
+        elif len(exprs) == 2:
+            if binningY is None:
+                raise ValueError("Two-dimensional draw-string '{0}' for {1} needs binning-y".format(drawString, name))
+            self.y, self.x = Expression(exprs[0]), Expression(exprs[1])
+        else:
+            raise ValueError("Only one- and two-dimensional draw-strings are supported (got '{0}' for {1})".format(drawString, name))
+        self.selection = Expression(selectionString) if selectionString else None
+        if binningX is None:
+            raise ValueError("Draw-string '{0}' for {1} needs binning-x".format(drawString, name))
+        self.xEdges = parseBinning(binningX)
+        self.yEdges = parseBinning(binningY) if self.y is not None else None
+    def __repr__(self):
+        return "TreeHistoSpec({0!r}, {1!r}, selectionString={2!r})".format(self.name, self.drawString, self.selectionString)
+    @property
+    def branches(self):
+        return set().union(*(expr.branches for expr in (self.x, self.y, self.selection) if expr is not None))
+    @property
+    def shape(self):
+        """ number of cells along x (and y), including underflow and overflow """
+        return tuple(len(edges)+1 for edges in (self.xEdges, self.yEdges) if edges is not None)
+    def key(self):
+        """ everything that defines the contents (for the cache) """
+        return (self.name, self.drawString, self.selectionString, tuple(self.xEdges), ( tuple(self.yEdges) if self.yEdges is not None else None ))
+
+def iterTreeChunks(path, treeName, branches, chunkSize=100000):
+    """ Dictionaries of branch name to numpy array (float64), for consecutive ranges of (at most chunkSize) entries
+
+    uproot is used if available (reading chunk by chunk), otherwise ROOT's RDataFrame
+    (which reads all entries at once, so chunkSize is ignored)
+    """
+    branches = sorted(branches)
+    try:
+        import uproot
+    except ImportError:
+        uproot = None
+    if uproot is not None:
+        tree = uproot.open(path)[treeName]
+        if int(uproot.__version__.split(".")[0]) >= 4:
+            chunks = tree.iterate(branches, step_size=chunkSize, library="np")
+        else:
+            chunks = tree.iterate(branches, entrysteps=chunkSize, namedecode="utf-8")
+        for chunk in chunks:
+            yield dict((br, np.asarray(chunk[br], dtype=np.float64)) for br in branches)
+    else:
+        from cppyy import gbl
+        if not branches: ## only constant expressions: just the number of entries
+            nEntries = gbl.ROOT.RDataFrame(treeName, path).Count().GetValue()
+            yield { "__nEntries__" : nEntries }
+            return
+        cols = gbl.ROOT.RDataFrame(treeName, path).AsNumpy(branches)
+        yield dict((br, np.asarray(cols[br], dtype=np.float64)) for br in branches)
+
+def _evaluateAs(expr, columns, nEntries):
+    """ evaluate, and broadcast to the number of entries (for constant expressions) """
+    return np.broadcast_to(np.asarray(expr.evaluate(columns), dtype=np.float64), (nEntries,))
+
+def fillHistos(chunks, specs):
+    """ Fill histograms for all specs from chunks (dictionaries of branch name to array, see iterTreeChunks)
+
+    Returns a dictionary of spec name to (contents, sumw2, entries), where contents and sumw2
+    are flat arrays with all cells, including underflow and overflow (the ROOT layout:
+    x varies fastest, for two-dimensional histograms).
+    """
+    results = dict((spec.name, [ np.zeros((np.prod(spec.shape),)), np.zeros((np.prod(spec.shape),)), 0 ]) for spec in specs)
+    for chunk in chunks:
+        if "__nEntries__" in chunk:
+            nEntries = chunk["__nEntries__"]
+        else:
+            nEntries = len(next(chunk.itervalues())) if chunk else 0
+        if nEntries == 0:
+            continue
+        for spec in specs:
+            res = results[spec.name]
+            weights = _evaluateAs(spec.selection, chunk, nEntries) if spec.selection is not None else np.ones((nEntries,))
+            ## underflow is 0, overflow N+1 (upper edge excluded, as in ROOT)
+            iCell = np.searchsorted(spec.xEdges, _evaluateAs(spec.x, chunk, nEntries), side="right")
+            if spec.y is not None:
+                iCell = iCell + spec.shape[0]*np.searchsorted(spec.yEdges, _evaluateAs(spec.y, chunk, nEntries), side="right")
+            nCells = len(res[0])
+            res[0] += np.bincount(iCell, weights=weights, minlength=nCells)
+            res[1] += np.bincount(iCell, weights=weights**2, minlength=nCells)
+            res[2] += np.count_nonzero(weights)
+    return dict((name, tuple(res)) for name, res in results.iteritems())
+
+class TreeFile(object):
+    """
+    TFile-like view of the histograms filled from a tree (see TreeHistoSpec)
+
+    All histograms are filled in one pass over the tree when the first one is needed
+    (or when fill is called); Get then returns a new TH1D or TH2D, or, for names
+    that are not those of a spec, the object in the file (see histocache.openFile).
+    Behaves like histocache.TFileRef otherwise.
+    """
+    __slots__ = ("path", "treeName", "specs", "chunkSize", "_histos", "_fingerprint", "_lock")
+    def __init__(self, path, treeName, specs, chunkSize=100000):
+        if not treeName:
+            raise ValueError("No tree name given for {0}".format(path))
+        self.path = path
+        self.treeName = treeName
+        self.specs = list(specs)
+        self.chunkSize = chunkSize
+        self._histos = None
+        self._fingerprint = None
+        self._lock = threading.Lock()
+    def __repr__(self):
+        return "TreeFile({0!r}, {1!r})".format(self.path, self.treeName)
+    @property
+    def fingerprint(self):
+        """ (absolute path and hash of the histogram definitions, modification time, size) """
+        if self._fingerprint is None:
+            st = os.stat(self.path)
+            specsHash = hashlib.sha1(repr((self.treeName, sorted(spec.key() for spec in self.specs)))).hexdigest()
+            self._fingerprint = ("{0}#{1}".format(os.path.abspath(self.path), specsHash), st.st_mtime, st.st_size)
+        return self._fingerprint
+    def fill(self):
+        """ Fill all histograms (if not done yet) """
+        with self._lock:
+            if self._histos is None:
+                branches = set().union(*(spec.branches for spec in self.specs))
+                self._histos = fillHistos(iterTreeChunks(self.path, self.treeName, branches, chunkSize=self.chunkSize), self.specs)
+    def GetName(self):
+        return self.path
+    def GetPath(self):
+        return "{0}:/".format(self.path)
+    def IsZombie(self):
+        return not os.path.exists(self.path)
+    def IsOpen(self):
+        return os.path.exists(self.path)
+    def Get(self, name):
+        spec = next(( spec for spec in self.specs if spec.name == name ), None)
+        if spec is None:
+            from histocache import openFile
+            return openFile(self.path).Get(name)
+        self.fill()
+        contents, sumw2, entries = self._histos[name]
+        import histo_utils as h1u
+        if spec.y is None:
+            return h1u.histoFromArrays(spec.xEdges, contents, sumw2, name=name, entries=entries)
+        else:
+            return h1u.histo2DFromArrays(spec.xEdges, spec.yEdges, contents, sumw2, name=name, entries=entries)
+
+_treeFiles = dict()
+_treeFilesLock = threading.Lock()
+def openTreeFile(path, treeName, specs, chunkSize=100000):
+    """ TreeFile for path (the same one for all calls with the same path, tree and specs, such that every tree is read once) """
+    ky = (os.path.abspath(path), treeName, tuple(spec.key() for spec in specs))
+    with _treeFilesLock:
+        if ky not in _treeFiles:
+            _treeFiles[ky] = TreeFile(path, treeName, specs, chunkSize=chunkSize)
+        return _treeFiles[ky]
+
+def fillAll(treeFiles, nThreads=4):
+    """ Fill the histograms for several TreeFile objects, in parallel (numpy and the decompression release the GIL) """
+    treeFiles = list(treeFiles)
+    if nThreads <= 1 or len(treeFiles) < 2:
+        for tf in treeFiles:
+            tf.fill()
+        return
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(min(nThreads, len(treeFiles)))
+    try:
+        pool.map(lambda tf : tf.fill(), treeFiles, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
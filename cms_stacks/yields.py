@@ -0,0 +1,163 @@
+"""
+Yields tables: integral, statistical and systematic uncertainty for every (plot, yields group)
+
+The yields are taken from the stacks that are drawn (after the histograms, and
+the arrays of the systematic variations, are loaded for that), one plot at a time:
+for every file only the integral, sum of weights squared and shifts of the
+integral for every systematic variation are kept. When the table is made,
+these are summed over the files in each yields group, for all plots at once.
+
+>>> yields = YieldsTable(files)
+>>> for pName, aPlot, obsStack, expStack in plotIt_iterStacks(...):
+>>>     yields.fill(pName, aPlot, obsStack, expStack)
+>>> yields.write("yields.tex") ## or .csv, .json
+"""
+__all__ = ("YieldsTable",)
+
+import json
+from itertools import chain, izip
+
+import numpy as np
+
+from systematics import HistoGroup
+
+class YieldsTable(object):
+    """
+    Yields for a set of plots, grouped by the yields-group of the files
+
+    The statistical uncertainty is the square root of the sum of weights squared,
+    the systematic uncertainty is the sum in quadrature of the largest (up or down)
+    shift of the yield for each systematic, where the shifts of all files in a
+    group are added linearly. The total expected yield (all simulated groups)
+    is included as well.
+    """
+    totalName = "Total expected"
+
+    def __init__(self, files):
+        """ Constructor (files: dictionary of HistoFile objects, in the order of the table; only data and mc are used) """
+        self.files = [ f for f in ( files.itervalues() if isinstance(files, dict) else files ) if f.type in ("data", "mc") ]
+        self._fileIdx = dict((id(f.tfile), i) for i, f in enumerate(self.files))
+        self.groups = []
+        for f in self.files:
+            if f.yields_group not in self.groups:
+                self.groups.append(f.yields_group)
+        self._groupType = dict((grp, next(f.type for f in self.files if f.yields_group == grp)) for grp in self.groups)
+        ## title in the LaTeX table: legend of the group with the same name, if any
+        self.groupTitles = dict((f.yields_group, f.groupStyle.legend) for f in self.files if f.groupStyle is not None and f.group == f.yields_group and f.groupStyle.legend)
+        self.systNames = []
+        self._plots = [] ## (name, title, order)
+        self._rows = [] ## per plot: (integrals, sumw2, { syst : (shifts up, shifts down) }), arrays over the files
+
+    def _membersOf(self, entry):
+        """ (index of the file, HistoKey, systVars) for the files that make up a stack entry """
+        if isinstance(entry.hist, HistoGroup):
+            members = izip(entry.hist.members, entry.systVars.members)
+        else:
+            members = [ (entry.hist, entry.systVars) ]
+        for hk, systVars in members:
+            yield self._fileIdx[id(hk.tfile)], hk, systVars
+
+    def fill(self, pName, aPlot, obsStack, expStack):
+        """ Add the yields for a plot (if it is for yields) from its stacks (with the histograms loaded) """
+        if not aPlot.for_yields:
+            return
+        nFiles = len(self.files)
+        integrals = np.zeros((nFiles,))
+        sumw2 = np.zeros((nFiles,))
+        shifts = dict()
+        from histo_utils import histoToArrays
+        for entry in chain(obsStack.entries, expStack.entries):
+            for iF, hk, systVars in self._membersOf(entry):
+                edges, contents, fSumw2 = histoToArrays(hk.obj)
+                integrals[iF] = np.sum(contents[1:-1])
+                sumw2[iF] = np.sum(fSumw2[1:-1])
+                for systN in systVars:
+                    nom, up, down = systVars[systN].arrays()
+                    if systN not in shifts:
+                        shifts[systN] = (np.zeros((nFiles,)), np.zeros((nFiles,)))
+                        if systN not in self.systNames:
+                            self.systNames.append(systN)
+                    shifts[systN][0][iF] = np.sum((up-nom)[1:-1])
+                    shifts[systN][1][iF] = np.sum((down-nom)[1:-1])
+        self._plots.append((pName, ( aPlot.yields_title if aPlot.yields_title else pName ), aPlot.yields_table_order))
+        self._rows.append((integrals, sumw2, shifts))
+
+    def compute(self):
+        """ Compute the yields for all plots and groups (and the total expected)
+
+        Returns a list of plot names and titles (in table order),
+        a list of group names, and arrays (plots x groups) with
+        the yields, statistical and systematic uncertainties,
+        and the shifts of the yields (systematics x plots x groups, for up and down)
+        """
+        order = sorted(xrange(len(self._plots)), key=lambda i : (self._plots[i][2], self._plots[i][0]))
+        plots = [ self._plots[i][:2] for i in order ]
+        groups = [ grp for grp in self.groups if self._groupType[grp] == "mc" ] + [ YieldsTable.totalName ] + [ grp for grp in self.groups if self._groupType[grp] != "mc" ]
+        ## membership matrix (files x groups)
+        nFiles, nSysts = len(self.files), len(self.systNames)
+        membership = np.zeros((nFiles, len(groups)))
+        for iF, f in enumerate(self.files):
+            membership[iF, groups.index(f.yields_group)] = 1.
+            if f.type == "mc":
+                membership[iF, groups.index(YieldsTable.totalName)] = 1.
+        ## per file (plots x files, and systematics x plots x files), then per group
+        integrals = np.array([ self._rows[i][0] for i in order ]).reshape((len(order), nFiles))
+        sumw2 = np.array([ self._rows[i][1] for i in order ]).reshape((len(order), nFiles))
+        noShift = np.zeros((nFiles,))
+        shiftsUp, shiftsDown = ( np.array([ [ self._rows[i][2].get(systN, (noShift, noShift))[j] for i in order ] for systN in self.systNames ]).reshape((nSysts, len(order), nFiles)) for j in (0, 1) )
+        yields = integrals.dot(membership)
+        stat = np.sqrt(sumw2.dot(membership))
+        shiftsUp, shiftsDown = shiftsUp.dot(membership), shiftsDown.dot(membership)
+        syst = np.sqrt(np.sum(np.maximum(np.abs(shiftsUp), np.abs(shiftsDown))**2, axis=0))
+        return plots, groups, yields, stat, syst, (shiftsUp, shiftsDown)
+
+    def toLaTeX(self, precision=1, stretch=1.15):
+        """ LaTeX tabular with one row per group and one column per plot (yield $\\pm$ stat. $\\pm$ syst.) """
+        plots, groups, yields, stat, syst, shifts = self.compute()
+        fmt = "${{0:.{0:d}f}} \\pm {{1:.{0:d}f}} \\pm {{2:.{0:d}f}}$".format(precision)
+        lines = [ "\\renewcommand{{\\arraystretch}}{{{0}}}".format(stretch)
+                , "\\begin{{tabular}}{{l{0}}}".format(len(plots)*"c")
+                , " & ".join([ "" ]+[ title for pName, title in plots ])+" \\\\"
+                , "\\hline" ]
+        for iG, grp in enumerate(groups):
+            if grp == YieldsTable.totalName or ( iG > 0 and groups[iG-1] == YieldsTable.totalName ):
+                lines.append("\\hline")
+            lines.append(" & ".join([ self.groupTitles.get(grp, grp) ]+[ fmt.format(yields[iP,iG], stat[iP,iG], syst[iP,iG]) for iP in xrange(len(plots)) ])+" \\\\")
+        lines.append("\\end{tabular}")
+        return "\n".join(lines)+"\n"
+
+    def toCSV(self):
+        """ CSV with one line per (plot, group): plot, group, yield, stat, syst """
+        plots, groups, yields, stat, syst, shifts = self.compute()
+        lines = [ "plot,group,yield,stat,syst" ]
+        for iP, (pName, title) in enumerate(plots):
+            for iG, grp in enumerate(groups):
+                lines.append(",".join([ _csvField(pName), _csvField(grp) ]+[ repr(float(arr[iP,iG])) for arr in (yields, stat, syst) ]))
+        return "\n".join(lines)+"\n"
+
+    def toJSON(self):
+        """ JSON object: { plot : { "title" : title, "yields" : { group : { "yield", "stat", "syst", "systematics" : { name : [ up, down ] } } } } } """
+        plots, groups, yields, stat, syst, (shiftsUp, shiftsDown) = self.compute()
+        return json.dumps(dict((pName, {
+              "title"  : title
+            , "yields" : dict((grp, {
+                  "yield" : float(yields[iP,iG]), "stat" : float(stat[iP,iG]), "syst" : float(syst[iP,iG])
+                , "systematics" : dict((systN, [ float(shiftsUp[iS,iP,iG]), float(shiftsDown[iS,iP,iG]) ]) for iS, systN in enumerate(self.systNames))
+                }) for iG, grp in enumerate(groups))
+            }) for iP, (pName, title) in enumerate(plots)), indent=2, sort_keys=True)
+
+    formats = { "tex" : toLaTeX, "csv" : toCSV, "json" : toJSON }
+
+    def write(self, path, **kwargs):
+        """ Write the table to path, in the format given by the extension (tex, csv or json) """
+        ext = path.split(".")[-1].lower()
+        if ext not in YieldsTable.formats:
+            raise ValueError("Unknown yields table format '{0}' (known: {1})".format(ext, ", ".join(sorted(YieldsTable.formats))))
+        with open(path, "w") as outFile:
+            outFile.write(YieldsTable.formats[ext](self, **kwargs))
+
+def _csvField(val):
+    val = str(val)
+    if any(c in val for c in ",\"\n"):
+        return "\"{0}\"".format(val.replace("\"", "\"\""))
+    return val
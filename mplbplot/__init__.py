@@ -9,5 +9,8 @@ __version__ = "0.1.0"
 
 ## workaround for a problem with loading of graphics libraries
 ## make sure we don't import matplotlib before ROOT
-from cppyy import gbl
-gbl.kTRUE
+try:
+    from cppyy import gbl
+    gbl.kTRUE
+except ImportError: ## reading histogram archives (mplbplot.archive) does not need ROOT
+    pass
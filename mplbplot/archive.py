@@ -0,0 +1,187 @@
+"""
+Single-file archive of one-dimensional histograms, readable without ROOT
+
+The archive can be written from a set of ROOT files, and is read by
+memory-mapping it (read-only), such that many processes can share it
+through the page cache. Layout (all numbers little-endian):
+ - 8 bytes: the magic string "MPLBHARC"
+ - 8 bytes (uint64): length of the index
+ - the index (JSON), padded with spaces to a multiple of 8 bytes
+ - data (float64): all distinct bin edge arrays, followed by a block
+   with the contents of all histograms (including underflow and overflow)
+   and a block with their sumw2 (in the same order)
+The index has the offsets (in units of float64, from the start of the data)
+and lengths of the edge arrays, the offsets of the contents and sumw2 blocks,
+and for every file label and histogram name the index of its edges,
+the offset of its first bin in the contents and sumw2 blocks,
+the number of entries, and the title.
+
+Usage:
+>>> writeArchive("histos.mplbarch", glob.glob("/data/*.root"), baseDir="/data")
+>>> arch = HistoArchive("histos.mplbarch")
+>>> h = arch.get("sample1.root", "met")
+>>> h.edges, h.contents, h.sumw2
+
+or, from the command line:
+  python -m mplbplot.archive histos.mplbarch /data/*.root --baseDir=/data
+"""
+__all__ = ("HistoArchive", "ArchivedHisto", "writeArchive", "histoArrays")
+
+import json
+import os.path
+import struct
+
+import numpy as np
+
+MAGIC = b"MPLBHARC"
+VERSION = 1
+
+class ArchivedHisto(object):
+    """ Histogram from an archive: bin edges (N+1), contents and sumw2 (N+2, with underflow and overflow) """
+    __slots__ = ("name", "title", "edges", "contents", "sumw2", "entries")
+    def __init__(self, name, title, edges, contents, sumw2, entries):
+        self.name = name
+        self.title = title
+        self.edges = edges
+        self.contents = contents
+        self.sumw2 = sumw2
+        self.entries = entries
+    def __repr__(self):
+        return "ArchivedHisto({0!r}, nBins={1:d})".format(self.name, self.nBins)
+    @property
+    def nBins(self):
+        return len(self.edges)-1
+
+class HistoArchive(object):
+    """
+    Read-only (memory-mapped) access to a histogram archive (see writeArchive)
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic = f.read(len(MAGIC))
+            if magic != MAGIC:
+                raise IOError("{0} is not a histogram archive".format(path))
+            idxLength, = struct.unpack("<Q", f.read(8))
+            index = json.loads(f.read(idxLength).decode("utf-8"))
+        if index["version"] != VERSION:
+            raise IOError("Unsupported histogram archive version {0} (expected {1})".format(index["version"], VERSION))
+        self._edges = index["edges"]
+        self._contentsOffset = index["contentsOffset"]
+        self._sumw2Offset = index["sumw2Offset"]
+        self._files = index["files"]
+        self._data = np.memmap(path, dtype="<f8", mode="r", offset=16+idxLength)
+    def __repr__(self):
+        return "HistoArchive({0!r})".format(self.path)
+
+    def labels(self):
+        """ labels of the files (paths relative to the base directory when written) """
+        return self._files.keys()
+    def keys(self, label):
+        """ names of the histograms from the file with the given label """
+        return self._files[label].keys()
+    def __contains__(self, label):
+        return label in self._files
+    def has(self, label, name):
+        """ check if there is a histogram name for the file label """
+        return label in self._files and name in self._files[label]
+
+    def get(self, label, name):
+        """ ArchivedHisto (memory-mapped arrays) for name in the file label, or None if not found """
+        entry = self._files.get(label, dict()).get(name)
+        if entry is None:
+            return None
+        iEdges, offset, entries, title = entry
+        edgesOffset, nEdges = self._edges[iEdges]
+        nCells = nEdges+1
+        return ArchivedHisto(name, title,
+                self._data[edgesOffset:edgesOffset+nEdges],
+                self._data[self._contentsOffset+offset:self._contentsOffset+offset+nCells],
+                self._data[self._sumw2Offset+offset:self._sumw2Offset+offset+nCells],
+                entries)
+
+def histoArrays(hist):
+    """ bin edges (N+1), contents and sumw2 (N+2, including underflow and overflow) of a TH1, as numpy arrays """
+    nBins = hist.GetNbinsX()
+    xAx = hist.GetXaxis()
+    edges = np.array([ xAx.GetBinLowEdge(i) for i in xrange(1, nBins+1) ] + [ xAx.GetBinUpEdge(nBins) ])
+    contents = np.array([ hist.GetBinContent(i) for i in xrange(nBins+2) ])
+    sumw2 = np.array([ hist.GetBinError(i)**2 for i in xrange(nBins+2) ])
+    return edges, contents, sumw2
+
+def _walkHistos(tdir, prefix=""):
+    """ (name, histogram) for all one-dimensional histograms in a TDirectory (recursively, highest cycle only) """
+    seen = set()
+    for key in tdir.GetListOfKeys():
+        name = key.GetName()
+        if name in seen:
+            continue
+        seen.add(name)
+        obj = tdir.Get(name)
+        if obj.InheritsFrom("TDirectory"):
+            for item in _walkHistos(obj, prefix="{0}{1}/".format(prefix, name)):
+                yield item
+        elif obj.InheritsFrom("TH1") and obj.GetDimension() == 1:
+            yield prefix+name, obj
+
+def writeArchive(path, files, baseDir=None):
+    """
+    Write all one-dimensional histograms from files to an archive at path
+
+    files can be a list of paths, or a dictionary of labels to paths or TFile objects;
+    for a list, the labels are the paths relative to baseDir (the basenames if not given).
+    Bin edges that are the same for several histograms are stored only once.
+    """
+    from cppyy import gbl
+    if not isinstance(files, dict):
+        files = dict(( ( os.path.relpath(fPath, baseDir) if baseDir is not None else os.path.basename(fPath) ), fPath) for fPath in files)
+    edgesIdx = dict() ## edges bytes -> index
+    edges = []
+    contents = []
+    sumw2 = []
+    offset = 0
+    index = dict()
+    for label, tf in sorted(files.iteritems()):
+        opened = not hasattr(tf, "GetListOfKeys")
+        if opened:
+            tf = gbl.TFile.Open(tf)
+            if ( not tf ) or tf.IsZombie():
+                raise IOError("Could not open file '{0}' correctly".format(files[label]))
+        fIndex = index[label] = dict()
+        for name, hist in _walkHistos(tf):
+            hEdges, hContents, hSumw2 = histoArrays(hist)
+            ky = hEdges.tobytes()
+            if ky not in edgesIdx:
+                edgesIdx[ky] = len(edges)
+                edges.append(hEdges)
+            fIndex[name] = (edgesIdx[ky], offset, hist.GetEntries(), hist.GetTitle())
+            contents.append(hContents)
+            sumw2.append(hSumw2)
+            offset += len(hContents)
+        if opened:
+            tf.Close()
+    edgesOffsets = np.cumsum([ 0 ]+[ len(ed) for ed in edges ])
+    idxStr = json.dumps({
+          "version"        : VERSION
+        , "edges"          : [ (int(eOff), len(ed)) for eOff, ed in zip(edgesOffsets, edges) ]
+        , "contentsOffset" : int(edgesOffsets[-1])
+        , "sumw2Offset"    : int(edgesOffsets[-1])+offset
+        , "files"          : index
+        }).encode("utf-8")
+    idxStr += b" "*(-len(idxStr) % 8)
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(idxStr)))
+        f.write(idxStr)
+        for block in (edges, contents, sumw2):
+            for arr in block:
+                f.write(np.ascontiguousarray(arr, dtype="<f8").tobytes())
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Write the one-dimensional histograms from a set of ROOT files to an archive")
+    parser.add_argument("output", help="Archive file to write")
+    parser.add_argument("files", nargs="+", help="ROOT files")
+    parser.add_argument("--baseDir", help="Directory the labels of the files are relative to (default: use the basenames)")
+    args = parser.parse_args()
+    writeArchive(args.output, args.files, baseDir=args.baseDir)
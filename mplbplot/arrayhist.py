@@ -0,0 +1,309 @@
+"""
+Histograms from numpy arrays of bin edges, contents and sums of weights squared
+
+ArrayHist1D and ArrayHist2D have the accessors of TH1 and TH2 that the draw methods
+use (and the same bin numbering, with underflow and overflow cells), so they can
+be passed to rhist, rplot, rerrorbar, rtext, rcontour, rcontourf and rpcolor
+(with mplbplot.decorateAxes), and to the mplbplot.live methods, without making
+ROOT objects. They are used for the snapshots of mplbplot.streaming.StreamingHist1D
+and for the projections and slices of TH3 (mplbplot.th3).
+"""
+__all__ = ("ArrayAxis", "ArrayHist1D", "ArrayHist2D")
+
+import numpy as np
+
+class _Array(object):
+    """ TArray-like wrapper (GetArray, GetSize) """
+    __slots__ = ("_a",)
+    def __init__(self, a):
+        self._a = a
+    def GetArray(self):
+        return self._a
+    def GetSize(self):
+        return len(self._a)
+
+################################################################################
+# Axis                                                                         #
+################################################################################
+
+class ArrayAxis(object):
+    """ TAxis-like view of an array of bin edges (ROOT bin numbering: 1 to N, 0 and N+1 for underflow and overflow) """
+    __slots__ = ("edges",)
+    def __init__(self, edges):
+        self.edges = edges
+    def GetNbins(self):
+        return len(self.edges)-1
+    def GetXmin(self):
+        return self.edges[0]
+    def GetXmax(self):
+        return self.edges[-1]
+    def GetBinLowEdge(self, i):
+        return self.edges[i-1] if i >= 1 else -np.inf
+    def GetBinUpEdge(self, i):
+        return self.edges[i] if i < len(self.edges) else np.inf
+    def GetBinCenter(self, i):
+        return .5*(self.GetBinLowEdge(i)+self.GetBinUpEdge(i))
+    def GetBinWidth(self, i):
+        return self.GetBinUpEdge(i)-self.GetBinLowEdge(i)
+    def GetBinLabel(self, i):
+        return ""
+    def FindFixBin(self, x):
+        return int(np.searchsorted(self.edges, x, side="right"))
+    def __bins__(self):
+        return ArrayAxisBins(self)
+
+class ArrayAxisBin(object):
+    """ bin of an ArrayAxis, with the same attributes as decorators.AxisBin1D """
+    __slots__ = ("_a", "_i")
+    def __init__(self, axis, i):
+        self._a = axis
+        self._i = i
+    def __repr__(self):
+        return "ArrayAxisBins({0!r})[{1:n}]".format(self._a, self._i)
+    center  = property(lambda self : self._a.GetBinCenter(self._i))
+    lowEdge = property(lambda self : self._a.GetBinLowEdge(self._i))
+    upEdge  = property(lambda self : self._a.GetBinUpEdge(self._i))
+    width   = property(lambda self : self._a.GetBinWidth(self._i))
+    label   = property(lambda self : "")
+
+class ArrayAxisBins(object):
+    """ pythonic access to the bins of an ArrayAxis (see decorators.AxisBins1D) """
+    __slots__ = ("_a",)
+    def __init__(self, axis):
+        self._a = axis
+    def __iter__(self):
+        for i in xrange(1, self._a.GetNbins()+1):
+            yield ArrayAxisBin(self._a, i)
+    def __len__(self):
+        return self._a.GetNbins()
+    def __getitem__(self, i):
+        return ArrayAxisBin(self._a, i)
+
+################################################################################
+# One-dimensional histograms                                                   #
+################################################################################
+
+class ArrayBin1D(object):
+    """ bin of an ArrayHist1D, with the same attributes as decorators.HistoBin1D """
+    __slots__ = ("_h", "_i")
+    def __init__(self, hist, i):
+        self._h = hist
+        self._i = i
+    def __repr__(self):
+        return "{0}({1!r})[{2:n}]".format(self.__class__.__name__, self._h, self._i)
+    content  = property(lambda self : self._h._contents[self._i])
+    error    = property(lambda self : np.sqrt(self._h._sumw2[self._i]))
+    lowError = error
+    upError  = error
+    contentH  = property(lambda self : self.content/self.xWidth)
+    errorH    = property(lambda self : self.error/self.xWidth)
+    lowErrorH = errorH
+    upErrorH  = errorH
+    xCenter  = property(lambda self : self._h._axis.GetBinCenter(self._i))
+    xLowEdge = property(lambda self : self._h._axis.GetBinLowEdge(self._i))
+    xUpEdge  = property(lambda self : self._h._axis.GetBinUpEdge(self._i))
+    xWidth   = property(lambda self : self._h._axis.GetBinWidth(self._i))
+    xLabel   = property(lambda self : "")
+
+class ArrayBins1D(object):
+    """ pythonic access to the bins of an ArrayHist1D (see decorators.HistoBins1D) """
+    __slots__ = ("_h",)
+    def __init__(self, hist):
+        self._h = hist
+    def __iter__(self):
+        for i in xrange(1, self._h.GetNbinsX()+1):
+            yield ArrayBin1D(self._h, i)
+    def __len__(self):
+        return self._h.GetNbinsX()
+    def __getitem__(self, i):
+        return ArrayBin1D(self._h, i)
+
+class ArrayHist1D(object):
+    """
+    TH1-like histogram from arrays of bin edges (N+1), contents and sumw2 (N+2, including underflow and overflow)
+
+    The arrays are not copied.
+    """
+    __slots__ = ("name", "title", "edges", "_axis", "_contents", "_sumw2", "_entries")
+    def __init__(self, edges, contents, sumw2=None, name="h", title="", entries=None):
+        self.name = name
+        self.title = title
+        self.edges = edges
+        self._axis = ArrayAxis(edges)
+        if len(contents) != len(edges)+1:
+            raise ValueError("Expected {0:d} cells (with underflow and overflow) for {1:d} bin edges, got {2:d}".format(len(edges)+1, len(edges), len(contents)))
+        self._contents = contents
+        self._sumw2 = sumw2 if sumw2 is not None else contents
+        self._entries = entries
+    def __repr__(self):
+        return "{0}({1!r}, nBins={2:d})".format(self.__class__.__name__, self.name, self.GetNbinsX())
+    def contents(self):
+        """ contents of all cells, including underflow and overflow """
+        return self._contents
+    def sumw2(self):
+        """ sum of weights squared of all cells, including underflow and overflow """
+        return self._sumw2
+    def GetName(self):
+        return self.name
+    def GetTitle(self):
+        return self.title
+    def GetDimension(self):
+        return 1
+    def GetXaxis(self):
+        return self._axis
+    def GetNbinsX(self):
+        return len(self.edges)-1
+    def GetNcells(self):
+        return len(self._contents)
+    def GetBinContent(self, i):
+        return self._contents[i]
+    def GetBinError(self, i):
+        return np.sqrt(self._sumw2[i])
+    GetBinErrorLow = GetBinError
+    GetBinErrorUp = GetBinError
+    def GetBinWidth(self, i):
+        return self._axis.GetBinWidth(i)
+    def GetEntries(self):
+        return self._entries if self._entries is not None else np.sum(self._contents)
+    def Integral(self):
+        return np.sum(self._contents[1:-1])
+    ## buffers (see decorators.cellArrays)
+    def GetArray(self):
+        return self._contents
+    def GetSumw2N(self):
+        return len(self._sumw2)
+    def GetSumw2(self):
+        return _Array(self._sumw2)
+    def __bins__(self):
+        return ArrayBins1D(self)
+    ## draw methods (as for TH1, see draw_th1._addDecorations; imported when used, such that this module does not need ROOT)
+    def __plot__(self, *args, **kwargs):
+        from .draw_th1 import plot
+        return plot(self, *args, **kwargs)
+    def __errorbar__(self, *args, **kwargs):
+        from .draw_th1 import errorbar
+        return errorbar(self, *args, **kwargs)
+    def __text__(self, *args, **kwargs):
+        from .draw_th1 import text
+        return text(self, *args, **kwargs)
+
+################################################################################
+# Two-dimensional histograms                                                   #
+################################################################################
+
+class ArrayBin2D(object):
+    """ bin of an ArrayHist2D, with the same attributes as decorators.HistoBin2D """
+    __slots__ = ("_h", "_i", "_j")
+    def __init__(self, hist, i, j):
+        self._h = hist
+        self._i = i
+        self._j = j
+    def __repr__(self):
+        return "{0}({1!r})[{2:n},{3:n}]".format(self.__class__.__name__, self._h, self._i, self._j)
+    content  = property(lambda self : self._h._contents[self._h.GetBin(self._i, self._j)])
+    error    = property(lambda self : np.sqrt(self._h._sumw2[self._h.GetBin(self._i, self._j)]))
+    lowError = error
+    upError  = error
+    contentH  = property(lambda self : self.content/(self.xWidth*self.yWidth))
+    errorH    = property(lambda self : self.error/(self.xWidth*self.yWidth))
+    lowErrorH = errorH
+    upErrorH  = errorH
+    xCenter  = property(lambda self : self._h._xAxis.GetBinCenter(self._i))
+    xLowEdge = property(lambda self : self._h._xAxis.GetBinLowEdge(self._i))
+    xUpEdge  = property(lambda self : self._h._xAxis.GetBinUpEdge(self._i))
+    xWidth   = property(lambda self : self._h._xAxis.GetBinWidth(self._i))
+    xLabel   = property(lambda self : "")
+    yCenter  = property(lambda self : self._h._yAxis.GetBinCenter(self._j))
+    yLowEdge = property(lambda self : self._h._yAxis.GetBinLowEdge(self._j))
+    yUpEdge  = property(lambda self : self._h._yAxis.GetBinUpEdge(self._j))
+    yWidth   = property(lambda self : self._h._yAxis.GetBinWidth(self._j))
+    yLabel   = property(lambda self : "")
+
+class ArrayBins2D(object):
+    """ pythonic access to the bins of an ArrayHist2D (see decorators.HistoBins2D, the iteration order is the same) """
+    __slots__ = ("_h",)
+    def __init__(self, hist):
+        self._h = hist
+    def __iter__(self):
+        for i in xrange(1, self._h.GetNbinsX()+1):
+            for j in xrange(1, self._h.GetNbinsY()+1):
+                yield ArrayBin2D(self._h, i, j)
+    def __len__(self):
+        return self._h.GetNbinsX()*self._h.GetNbinsY()
+    def __getitem__(self, (i, j)):
+        return ArrayBin2D(self._h, i, j)
+
+class ArrayHist2D(object):
+    """
+    TH2-like histogram from arrays of x and y bin edges, and contents and sumw2
+    with shape (nBinsY+2, nBinsX+2) (including underflow and overflow, y first such that
+    the flattened arrays have the ROOT cell numbering: i+(nBinsX+2)*j)
+
+    The arrays are not copied.
+    """
+    __slots__ = ("name", "title", "xEdges", "yEdges", "_xAxis", "_yAxis", "_contents", "_sumw2", "_entries")
+    def __init__(self, xEdges, yEdges, contents, sumw2=None, name="h", title="", entries=None):
+        self.name = name
+        self.title = title
+        self.xEdges = xEdges
+        self.yEdges = yEdges
+        self._xAxis = ArrayAxis(xEdges)
+        self._yAxis = ArrayAxis(yEdges)
+        shape = (len(yEdges)+1, len(xEdges)+1)
+        if np.shape(contents) != shape:
+            raise ValueError("Expected contents with shape {0!r} for {1:d} x and {2:d} y bin edges, got {3!r}".format(shape, len(xEdges), len(yEdges), np.shape(contents)))
+        self._contents = np.ravel(contents)
+        self._sumw2 = np.ravel(sumw2) if sumw2 is not None else self._contents
+        self._entries = entries
+    def __repr__(self):
+        return "{0}({1!r}, nBins=({2:d}, {3:d}))".format(self.__class__.__name__, self.name, self.GetNbinsX(), self.GetNbinsY())
+    def contents(self):
+        """ contents of all cells, including underflow and overflow, with shape (nBinsY+2, nBinsX+2) """
+        return self._contents.reshape((self.GetNbinsY()+2, self.GetNbinsX()+2))
+    def sumw2(self):
+        """ sum of weights squared of all cells, including underflow and overflow, with shape (nBinsY+2, nBinsX+2) """
+        return self._sumw2.reshape((self.GetNbinsY()+2, self.GetNbinsX()+2))
+    def GetName(self):
+        return self.name
+    def GetTitle(self):
+        return self.title
+    def GetDimension(self):
+        return 2
+    def GetXaxis(self):
+        return self._xAxis
+    def GetYaxis(self):
+        return self._yAxis
+    def GetNbinsX(self):
+        return len(self.xEdges)-1
+    def GetNbinsY(self):
+        return len(self.yEdges)-1
+    def GetNcells(self):
+        return len(self._contents)
+    def GetBin(self, i, j):
+        return i+(self.GetNbinsX()+2)*j
+    def GetBinContent(self, i, j=None):
+        return self._contents[i if j is None else self.GetBin(i, j)]
+    def GetBinError(self, i, j=None):
+        return np.sqrt(self._sumw2[i if j is None else self.GetBin(i, j)])
+    GetBinErrorLow = GetBinError
+    GetBinErrorUp = GetBinError
+    def GetEntries(self):
+        return self._entries if self._entries is not None else np.sum(self._contents)
+    def Integral(self):
+        return np.sum(self.contents()[1:-1,1:-1])
+    ## buffers (see decorators.cellArrays)
+    def GetArray(self):
+        return self._contents
+    def GetSumw2N(self):
+        return len(self._sumw2)
+    def GetSumw2(self):
+        return _Array(self._sumw2)
+    def __bins__(self):
+        return ArrayBins2D(self)
+    ## draw methods (as for TH2, see draw_th1._addDecorations and draw_th2._addDecorations)
+    def __plot__(self, *args, **kwargs):
+        raise AttributeError("This method is only for 1D histograms")
+    __errorbar__ = __plot__
+    def __text__(self, *args, **kwargs):
+        from .draw_th2 import text
+        return text(self, *args, **kwargs)
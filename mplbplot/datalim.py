@@ -0,0 +1,84 @@
+"""
+Data limits of the axes from the arrays that the draw methods already have
+
+axes.add_patch updates the data limits for every patch it adds, by transforming
+its path (one rectangle per bin for rhist with histtype="bar", or for rerrorbar with
+kind="box"), which takes more time than constructing the patch itself.
+The draw methods add those patches inside patchLimitsFrom, which skips that,
+and updates the data limits once from the edges and heights (and error extents)
+instead. For logarithmic scales only the positive coordinates are used,
+such that empty bins and error bars that extend below zero do not set the lower limit.
+With autolim=False the draw methods do not change the data limits at all
+(e.g. when the axis ranges are set explicitly afterwards).
+"""
+__all__ = ("updateDataLim", "patchLimitsFrom", "addBoxes")
+
+from contextlib import contextmanager
+
+import numpy as np
+
+def _validCoordinates(values, scale):
+    values = np.asarray(values, dtype=np.float64).ravel()
+    valid = np.isfinite(values)
+    if scale == "log":
+        valid &= ( values > 0. )
+    return values[valid]
+
+def updateDataLim(axes, x, y, autoscale=True):
+    """
+    Extend the data limits of axes to include the ranges of x and y (arrays of coordinates, not necessarily of the same length),
+    and autoscale the view (if autoscale is True)
+    """
+    x, y = _validCoordinates(x, axes.get_xscale()), _validCoordinates(y, axes.get_yscale())
+    if len(x) == 0 or len(y) == 0:
+        return
+    ## the corners of the bounding box: the minimal positive values are tracked by the data limits as well
+    xr, yr = (x.min(), x.max()), (y.min(), y.max())
+    xPos, yPos = x[x > 0.], y[y > 0.]
+    corners = [ (xr[0], yr[0]), (xr[1], yr[1]) ]
+    if len(xPos) > 0 and len(yPos) > 0:
+        corners.append((xPos.min(), yPos.min()))
+    axes.update_datalim(corners)
+    if autoscale:
+        axes.autoscale_view()
+
+def _noPatchLimits(patch):
+    pass
+
+@contextmanager
+def patchLimitsFrom(axes, autolim=True):
+    """
+    Add patches inside the with-block without updating the data limits for each of them
+
+    The with-block should append the x and y coordinates (arrays) that the patches cover
+    to the lists that are yielded; the data limits are updated from those when leaving it
+    (unless autolim is False, then they are not changed).
+    """
+    xs, ys = [], []
+    axes._update_patch_limits = _noPatchLimits
+    try:
+        yield xs, ys
+    finally:
+        del axes._update_patch_limits
+    if autolim and xs and ys:
+        updateDataLim(axes, np.concatenate([ np.ravel(x) for x in xs ]), np.concatenate([ np.ravel(y) for y in ys ]))
+
+def addBoxes(axes, boxes, autolim=True, **kwargs):
+    """
+    Add a Rectangle for every (left, width, bottom, height) in boxes, and update the data limits once for all of them
+
+    The keyword arguments are passed on to the Rectangle constructor;
+    if a transform is passed, the data limits are updated for every patch, as by axes.add_patch.
+    Returns the list of patches.
+    """
+    import matplotlib.patches
+    boxes = np.asarray(boxes, dtype=np.float64).reshape((-1, 4))
+    rects = ( matplotlib.patches.Rectangle((left, bottom), width=width, height=height, **kwargs)
+              for left, width, bottom, height in boxes )
+    if "transform" in kwargs:
+        return [ axes.add_patch(r) for r in rects ]
+    with patchLimitsFrom(axes, autolim) as (xs, ys):
+        patches = [ axes.add_patch(r) for r in rects ]
+        xs.append(( boxes[:,0], boxes[:,0]+boxes[:,1] ))
+        ys.append(( boxes[:,2], boxes[:,2]+boxes[:,3] ))
+    return patches
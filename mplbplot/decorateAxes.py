@@ -17,58 +17,87 @@ Usage:
 Available methods:
   For one-dimensional histograms (TH1*) only:
    - rhist (HIST option)
-  For one-dimensional histograms (TH1*) and TGraph:
-   - rplot (P and L option; full documentation: __plot__ methods of TH1 and TGraph)
-   - rerrorbar (all E options; full documentation: __errorbar__ methods of TH1 and TGraph)
+  For one-dimensional histograms (TH1*), TProfile, TEfficiency and TGraph:
+   - rplot (P and L option; full documentation: __plot__ methods of TH1, TProfile, TEfficiency and TGraph)
+   - rerrorbar (all E options; full documentation: __errorbar__ methods of TH1, TProfile, TEfficiency and TGraph)
   For one- and two-dimensional histograms:
    - rtext (TEXT option; full documentation: __text__ methods of TH1 and TH2)
   For two-dimensional histograms:
-   - rcontour, rcontourf (CONT), and pcolor (COLZ)
+   - rcontour, rcontourf (CONT), and pcolor (COLZ; also for TH2Poly and THnSparse, and with sparse=True for mostly empty TH2)
+  Three-dimensional histograms can be drawn through their projections and slices (see mplbplot.th3)
+All methods take a rasterize keyword argument, to rasterize what they draw in vector output (see mplbplot.rasterize)
 """
 __all__ = ()
 
 import draw_th1    ## add rhist and implementations for rplot, rerrorbar and rtext
 import draw_tgraph ## add implementations for rplot and rerrorbar
 import draw_th2    ## add rcontour, rcontourf, rpcolor and implementation for rtext
-for imod in (draw_th1, draw_tgraph, draw_th2):
+import draw_tprofile ## implementations for rplot and rerrorbar (TProfile), and rpcolor (TProfile2D)
+import draw_tefficiency ## implementations for rplot and rerrorbar (TEfficiency)
+for imod in (draw_th1, draw_tgraph, draw_th2, draw_tprofile, draw_tefficiency):
     imod._addDecorations()
 
 import matplotlib.axes
 
+from .profiling import instrumented
+from .rasterize import rasterizable
+from .rendercache import fingerprinted
+
 # Single dispatch for ax.rplot(obj, ...)
+@instrumented("rplot")
+@fingerprinted("rplot")
+@rasterizable()
 def rplot_ax(self, obj, *args, **kwargs):
     return obj.__plot__(*args, axes=self, **kwargs)
 matplotlib.axes.Axes.rplot = rplot_ax
 
 # Single dispatch for ax.rerrorbar(obj, ...)
+@instrumented("rerrorbar")
+@fingerprinted("rerrorbar")
+@rasterizable()
 def rerrorbar_ax(self, obj, *args, **kwargs):
     return obj.__errorbar__(*args, axes=self, **kwargs)
 matplotlib.axes.Axes.rerrorbar = rerrorbar_ax
 
 # Single dispatch for ax.rtext(obj, ...)
+@instrumented("rtext")
+@fingerprinted("rtext")
+@rasterizable()
 def rtext_ax(self, obj, *args, **kwargs):
     return obj.__text__(*args, axes=self, **kwargs)
 matplotlib.axes.Axes.rtext = rtext_ax
 
 # decorate ax.rhist(hist, ...)
+@instrumented("rhist")
+@fingerprinted("rhist")
+@rasterizable()
 def rhist_ax(self, obj, *args, **kwargs):
     return draw_th1.hist(obj, *args, axes=self, **kwargs)
 rhist_ax.__doc__ = draw_th1.hist.__doc__
 matplotlib.axes.Axes.rhist = rhist_ax
 
 # decorate ax.rcontour(hist, ...)
+@instrumented("rcontour")
+@fingerprinted("rcontour")
+@rasterizable()
 def rcontour_ax(self, obj, *args, **kwargs):
     return draw_th2.contour(obj, *args, axes=self, **kwargs)
 rcontour_ax.__doc__ = draw_th2.contour.__doc__
 matplotlib.axes.Axes.rcontour = rcontour_ax
 
 # decorate ax.rcontourf(hist, ...)
+@instrumented("rcontourf")
+@fingerprinted("rcontourf")
+@rasterizable()
 def rcontourf_ax(self, obj, *args, **kwargs):
     return draw_th2.contourf(obj, *args, axes=self, **kwargs)
 rcontourf_ax.__doc__ = draw_th2.contourf.__doc__
 matplotlib.axes.Axes.rcontourf = rcontourf_ax
 
 # decorate ax.rpcolor(hist, ...)
+@instrumented("rpcolor")
+@fingerprinted("rpcolor")
+@rasterizable()
 def rpcolor_ax(self, obj, *args, **kwargs):
     return draw_th2.pcolor(obj, *args, axes=self, **kwargs)
 rpcolor_ax.__doc__ = draw_th2.pcolor.__doc__
@@ -17,58 +17,86 @@ Usage:
 Available methods:
   For one-dimensional histograms (TH1*) only:
    - rhist (HIST option)
-  For one-dimensional histograms (TH1*) and TGraph:
-   - rplot (P and L option; full documentation: __plot__ methods of TH1 and TGraph)
-   - rerrorbar (all E options; full documentation: __errorbar__ methods of TH1 and TGraph)
+  For one-dimensional histograms (TH1*), TProfile, TEfficiency and TGraph:
+   - rplot (P and L option; full documentation: __plot__ methods of TH1, TProfile, TEfficiency and TGraph)
+   - rerrorbar (all E options; full documentation: __errorbar__ methods of TH1, TProfile, TEfficiency and TGraph)
   For one- and two-dimensional histograms:
    - rtext (TEXT option; full documentation: __text__ methods of TH1 and TH2)
   For two-dimensional histograms:
    - rcontour, rcontourf (CONT), and pcolor (COLZ)
+All methods take a rasterize keyword argument, to rasterize what they draw in vector output (see mplbplot.rasterize)
 """
 __all__ = ()
 
 import draw_th1    ## add rhist and implementations for rplot, rerrorbar and rtext
 import draw_tgraph ## add implementations for rplot and rerrorbar
 import draw_th2    ## add rcontour, rcontourf, rpcolor and implementation for rtext
-for imod in (draw_th1, draw_tgraph, draw_th2):
+import draw_tprofile ## implementations for rplot and rerrorbar (TProfile), and rpcolor (TProfile2D)
+import draw_tefficiency ## implementations for rplot and rerrorbar (TEfficiency)
+for imod in (draw_th1, draw_tgraph, draw_th2, draw_tprofile, draw_tefficiency):
     imod._addDecorations()
 
 import matplotlib.pyplot as plt
 
+from .profiling import instrumented
+from .rasterize import rasterizable
+from .rendercache import fingerprinted
+
 # Single dispatch for plt.rplot(obj, ...)
+@instrumented("rplot", axesFirst=False)
+@fingerprinted("rplot", axesFirst=False)
+@rasterizable(axesFirst=False)
 def rplot_plt(obj, *args, **kwargs):
     return obj.__plot__(*args, axes=plt.gca(), **kwargs)
 plt.rplot = rplot_plt
 
 # Single dispatch for plt.rerrorbar(obj, ...)
+@instrumented("rerrorbar", axesFirst=False)
+@fingerprinted("rerrorbar", axesFirst=False)
+@rasterizable(axesFirst=False)
 def rerrorbar_plt(obj, *args, **kwargs):
     return obj.__errorbar__(*args, axes=plt.gca(), **kwargs)
 plt.rerrorbar = rerrorbar_plt
 
 # Single dispatch for plt.rtext(obj, ...)
+@instrumented("rtext", axesFirst=False)
+@fingerprinted("rtext", axesFirst=False)
+@rasterizable(axesFirst=False)
 def rtext_plt(obj, *args, **kwargs):
     return obj.__text__(*args, axes=plt.gca(), **kwargs)
 plt.rtext = rtext_plt
 
 # decorate plt.rhist(hist, ...)
+@instrumented("rhist", axesFirst=False)
+@fingerprinted("rhist", axesFirst=False)
+@rasterizable(axesFirst=False)
 def rhist_plt(obj, *args, **kwargs):
     return draw_th1.hist(obj, *args, axes=plt.gca(), **kwargs)
 rhist_plt.__doc__ = draw_th1.hist.__doc__
 plt.rhist = rhist_plt
 
 # decorate plt.rcontour(hist, ...)
+@instrumented("rcontour", axesFirst=False)
+@fingerprinted("rcontour", axesFirst=False)
+@rasterizable(axesFirst=False)
 def rcontour_plt(obj, *args, **kwargs):
     return draw_th2.contour(obj, *args, axes=plt.gca(), **kwargs)
 rcontour_plt.__doc__ = draw_th2.contour.__doc__
 plt.rcontour = rcontour_plt
 
 # decorate plt.rcontourf(hist, ...)
+@instrumented("rcontourf", axesFirst=False)
+@fingerprinted("rcontourf", axesFirst=False)
+@rasterizable(axesFirst=False)
 def rcontourf_plt(obj, *args, **kwargs):
     return draw_th2.contourf(obj, *args, axes=plt.gca(), **kwargs)
 rcontourf_plt.__doc__ = draw_th2.contourf.__doc__
 plt.rcontourf = rcontourf_plt
 
 # decorate plt.rpcolor(hist, ...)
+@instrumented("rpcolor", axesFirst=False)
+@fingerprinted("rpcolor", axesFirst=False)
+@rasterizable(axesFirst=False)
 def rpcolor_plt(obj, *args, **kwargs):
     return draw_th2.pcolor(obj, *args, axes=plt.gca(), **kwargs)
 rpcolor_plt.__doc__ = draw_th2.pcolor.__doc__
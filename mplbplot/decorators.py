@@ -1,7 +1,7 @@
 """
-Pythonic access to TH1, TH2 and TGraph data
+Pythonic access to TH1, TH2, TH3 and TGraph data
 """
-__all__ = ("bins", "points")
+__all__ = ("bins", "points", "cellArrays")
 
 def bins(hist):
     """
@@ -21,8 +21,47 @@ def points(graph):
     """
     return graph.__points__()
 
+import numpy as np
 from itertools import product
 
+## buffer types of the histogram classes (TH1F inherits from TArrayF etc.)
+_arrayTypes = (("TArrayD", np.float64), ("TArrayF", np.float32), ("TArrayI", np.int32), ("TArrayS", np.int16), ("TArrayC", np.int8))
+
+## call counters, set by mplbplot.profiling while recording a draw method call (None otherwise)
+_counters = None
+
+def _rootCall(accessor, *args):
+    """ accessor(*args), counted as a C++ call while recording (see mplbplot.profiling) """
+    if _counters is not None:
+        return _counters.call(1, accessor, *args)
+    return accessor(*args)
+
+def _bufferArray(buf, nCells, dtype, copy=True):
+    """ first nCells elements of a buffer (PyROOT/cppyy view of a C array, or numpy array), as float64 (a copy, unless copy is False and no conversion is needed) """
+    if _counters is not None:
+        _counters.bins += nCells
+    if isinstance(buf, np.ndarray):
+        return np.array(buf[:nCells], dtype=np.float64, copy=copy)
+    if hasattr(buf, "SetSize"): ## PyROOT buffers do not know their size
+        buf.SetSize(nCells)
+    return np.frombuffer(buf, dtype=dtype, count=nCells).astype(np.float64, copy=copy)
+
+def cellArrays(histo, copy=True):
+    """ contents and sumw2 of all cells of a histogram (including underflow and overflow), as numpy arrays
+
+    These are copied from the histogram buffers, unless copy is False
+    (then they are views of the buffers, for double-precision histograms).
+    If sumw2 is not stored, the contents are returned instead.
+    """
+    nCells = _rootCall(histo.GetNcells)
+    dtype = next(( dt for arrType, dt in _arrayTypes if not hasattr(histo, "InheritsFrom") or _rootCall(histo.InheritsFrom, arrType) ), np.float64)
+    contents = _bufferArray(_rootCall(histo.GetArray), nCells, dtype, copy=copy)
+    if _rootCall(histo.GetSumw2N) > 0:
+        sumw2 = _bufferArray(_rootCall(_rootCall(histo.GetSumw2).GetArray), nCells, np.float64, copy=copy)
+    else:
+        sumw2 = contents.copy() if copy else contents
+    return contents, sumw2
+
 from cppyy import gbl
 
 axisBinDescriptors = { "center"   : gbl.TAxis.GetBinCenter
@@ -60,14 +99,19 @@ class BinProperty1(property):
     >>> @property
     >>> def fun(self):
     >>>     return self._h.getter(self._i)
+
+    nCalls is the number of C++ calls made by the accessor (for mplbplot.profiling)
     """
-    def __init__( self, accessor, idxAttr ):
+    def __init__( self, accessor, idxAttr, nCalls=1 ):
         self.accessor = accessor
         self.idxAttr = idxAttr
+        self.nCalls = nCalls
         property.__init__(self, fget=None, fset=None, fdel=None)
     def __get__( self, obj, objtype=None ):
         if obj is None:
             return self
+        if _counters is not None:
+            return _counters.call(self.nCalls, self.accessor, obj._h, getattr(obj, self.idxAttr))
         return self.accessor(obj._h, getattr(obj, self.idxAttr))
 
 class BinProperty2(property):
@@ -77,17 +121,46 @@ class BinProperty2(property):
     >>> @property
     >>> def fun(self):
     >>>     return self._h.getter(self._i, self._j)
+
+    nCalls is the number of C++ calls made by the accessor (for mplbplot.profiling)
     """
-    def __init__( self, accessor, xIdxAttr, yIdxAttr ):
+    def __init__( self, accessor, xIdxAttr, yIdxAttr, nCalls=1 ):
         self.accessor = accessor
         self.xIdxAttr = xIdxAttr
         self.yIdxAttr = yIdxAttr
+        self.nCalls = nCalls
         property.__init__(self, fget=None, fset=None, fdel=None)
     def __get__( self, obj, objtype=None ):
         if obj is None:
             return self
+        if _counters is not None:
+            return _counters.call(self.nCalls, self.accessor, obj._h, getattr(obj, self.xIdxAttr), getattr(obj, self.yIdxAttr))
         return self.accessor(obj._h, getattr(obj, self.xIdxAttr), getattr(obj, self.yIdxAttr))
 
+class BinProperty3(property):
+    """
+    Easily construct many properties of the type
+
+    >>> @property
+    >>> def fun(self):
+    >>>     return self._h.getter(self._i, self._j, self._k)
+
+    nCalls is the number of C++ calls made by the accessor (for mplbplot.profiling)
+    """
+    def __init__( self, accessor, xIdxAttr, yIdxAttr, zIdxAttr, nCalls=1 ):
+        self.accessor = accessor
+        self.xIdxAttr = xIdxAttr
+        self.yIdxAttr = yIdxAttr
+        self.zIdxAttr = zIdxAttr
+        self.nCalls = nCalls
+        property.__init__(self, fget=None, fset=None, fdel=None)
+    def __get__( self, obj, objtype=None ):
+        if obj is None:
+            return self
+        if _counters is not None:
+            return _counters.call(self.nCalls, self.accessor, obj._h, getattr(obj, self.xIdxAttr), getattr(obj, self.yIdxAttr), getattr(obj, self.zIdxAttr))
+        return self.accessor(obj._h, getattr(obj, self.xIdxAttr), getattr(obj, self.yIdxAttr), getattr(obj, self.zIdxAttr))
+
 ################################################################################
 # Histogram axis                                                               #
 ################################################################################
@@ -101,6 +174,8 @@ class AxisBin1D(object):
     def __init__(self, axis, i):
         self._h = axis
         self._i = i
+        if _counters is not None:
+            _counters.bins += 1
 
     def __repr__(self):
         return "AxisBins1D({0})[{1:n}]".format(repr(self._h), self._i)
@@ -153,6 +228,8 @@ class HistoBin1D(object):
     def __init__(self, hist, i):
         self._h = hist
         self._i = i
+        if _counters is not None:
+            _counters.bins += 1
 
     def __repr__(self):
         return "{0}({1})[{2:n}]".format(self.__class__.__name__, repr(self._h), self._i)
@@ -165,14 +242,14 @@ for name, getter in histBinDescriptors.iteritems():
     # height instead of contents
     hGetter = lambda h,i,getter=getter : ( getter(h,i)/h.GetBinWidth(i) )
     hGetterName = "lambda h,i : ROOT.TH1.{0}(h, i) / h.GetBinWidth(i)".format(getter.__name__)
-    hProp = BinProperty1(hGetter, "_i")
+    hProp = BinProperty1(hGetter, "_i", nCalls=2)
     hProp.__doc__ = "Bin {n} height using {func}".format(n=name, func=hGetterName)
     setattr(HistoBin1D, "{0}H".format(name), hProp)
 # Delegates to X-axis
 for name, getter in axisBinDescriptors.iteritems():
     xGetter = lambda h,i,getter=getter : getter(h.GetXaxis(), i)
     xGetterName = "lambda h,i : ROOT.TAxis.{0}(h.GetXaxis(), i)".format(getter.__name__)
-    prop = BinProperty1(xGetter, "_i")
+    prop = BinProperty1(xGetter, "_i", nCalls=2)
     prop.__doc__ = "Bin {n} using {func}".format(n=name, func=xGetterName)
     setattr(HistoBin1D, "x{0}{1}".format(name[:1].upper(),name[1:]), prop)
 
@@ -204,8 +281,6 @@ class HistoBins1D(object):
 def _th1_bins(self):
     return HistoBins1D(self)
 gbl.TH1.__bins__ = _th1_bins
-# placeholder for non-1D subclasses (2D is just below)
-gbl.TH3.__bins__ = property(lambda: AttributeError("3D histograms are not supported yet"))
 
 ################################################################################
 # Two-dimensional histograms                                                   #
@@ -221,6 +296,8 @@ class HistoBin2D(object):
         self._h = hist
         self._i = i
         self._j = j
+        if _counters is not None:
+            _counters.bins += 1
 
     def __repr__(self):
         return "{0}({1})[{2:n},{3:n}]".format(self.__class__.__name__, repr(self._h), self._i, self._j)
@@ -233,7 +310,7 @@ for name, getter in histBinDescriptors.iteritems():
     # height instead of contents
     hGetter = lambda h,i,j,getter=getter : ( getter(h,i,j)/(h.GetXaxis().GetBinWidth(i)*h.GetYaxis().GetBinWidth(j)) )
     hGetterName = "lambda h,i,j : {0}(h, i, j) / (h.GetXaxis().GetBinWidth(i)*h.GetYaxis().GetBinWidth(j)".format(getter.__name__)
-    hProp = BinProperty2(hGetter, "_i", "_j")
+    hProp = BinProperty2(hGetter, "_i", "_j", nCalls=5)
     hProp.__doc__ = "Bin {n} height using {func}".format(n=name, func=hGetterName)
     setattr(HistoBin2D, "{0}H".format(name), hProp)
 # Delegates to axes
@@ -241,13 +318,13 @@ for name, getter in axisBinDescriptors.iteritems():
     # X axis
     xGetter = lambda h,i,getter=getter : getter(h.GetXaxis(), i)
     xGetterName = "lambda h,i : ROOT.TAxis.{0}(h.GetXaxis(), i)".format(getter.__name__)
-    xProp = BinProperty1(xGetter, "_i")
+    xProp = BinProperty1(xGetter, "_i", nCalls=2)
     xProp.__doc__ = "Bin {n} using {func}".format(n=name, func=xGetterName)
     setattr(HistoBin2D, "x{0}{1}".format(name[:1].upper(),name[1:]), xProp)
     # Y axis
     yGetter = lambda h,j,getter=getter : getter(h.GetYaxis(), j)
     yGetterName = "lambda h,j : ROOT.TAxis.{0}(h.GetYaxis(), j)".format(getter.__name__)
-    yProp = BinProperty1(yGetter, "_j")
+    yProp = BinProperty1(yGetter, "_j", nCalls=2)
     yProp.__doc__ = "Bin {n} using {func}".format(n=name, func=yGetterName)
     setattr(HistoBin2D, "y{0}{1}".format(name[:1].upper(),name[1:]), yProp)
 
@@ -279,6 +356,94 @@ def _th2_bins(self):
     return HistoBins2D(self)
 gbl.TH2.__bins__ = _th2_bins
 
+################################################################################
+# Three-dimensional histograms                                                 #
+################################################################################
+
+class HistoBin3D(object):
+    """
+    iterator referring to a bin of a three-dimensional histogram
+    """
+    __slots__ = ("_h", "_i", "_j", "_k")
+
+    def __init__(self, hist, i, j, k):
+        self._h = hist
+        self._i = i
+        self._j = j
+        self._k = k
+        if _counters is not None:
+            _counters.bins += 1
+
+    def __repr__(self):
+        return "{0}({1})[{2:n},{3:n},{4:n}]".format(self.__class__.__name__, repr(self._h), self._i, self._j, self._k)
+
+# HistoBin3D data descriptors
+for name, getter in histBinDescriptors.iteritems():
+    prop = BinProperty3(getter, "_i", "_j", "_k")
+    prop.__doc__ = "Bin {n} using ROOT.TH3.{func}".format(n=name, func=getter.__name__)
+    setattr(HistoBin3D, name, prop)
+    # height instead of contents
+    hGetter = lambda h,i,j,k,getter=getter : ( getter(h,i,j,k)/(h.GetXaxis().GetBinWidth(i)*h.GetYaxis().GetBinWidth(j)*h.GetZaxis().GetBinWidth(k)) )
+    hGetterName = "lambda h,i,j,k : {0}(h, i, j, k) / (h.GetXaxis().GetBinWidth(i)*h.GetYaxis().GetBinWidth(j)*h.GetZaxis().GetBinWidth(k))".format(getter.__name__)
+    hProp = BinProperty3(hGetter, "_i", "_j", "_k", nCalls=7)
+    hProp.__doc__ = "Bin {n} height using {func}".format(n=name, func=hGetterName)
+    setattr(HistoBin3D, "{0}H".format(name), hProp)
+# Delegates to axes
+for name, getter in axisBinDescriptors.iteritems():
+    for axName, idxAttr in (("x", "_i"), ("y", "_j"), ("z", "_k")):
+        axGetter = lambda h,i,getter=getter,axName=axName : getter(getattr(h, "Get{0}axis".format(axName.upper()))(), i)
+        axGetterName = "lambda h,i : ROOT.TAxis.{0}(h.Get{1}axis(), i)".format(getter.__name__, axName.upper())
+        axProp = BinProperty1(axGetter, idxAttr, nCalls=2)
+        axProp.__doc__ = "Bin {n} using {func}".format(n=name, func=axGetterName)
+        setattr(HistoBin3D, "{0}{1}{2}".format(axName, name[:1].upper(),name[1:]), axProp)
+
+class HistoBins3D(object):
+    """
+    pythonic access to a three-dimensional histogram's bins
+
+    Not strictly a sequence since ROOT's bin numbering is preserved,
+    but forward iteration and random access are supported.
+    The contents and sumw2 methods give the whole grid at once, as arrays
+    with shape (nBinsZ+2, nBinsY+2, nBinsX+2), i.e. indexed as [k,j,i]
+    (including underflow and overflow, such that the ROOT bin numbers can be used),
+    which are views of the histogram buffers for TH3D (see mplbplot.th3 for projections and slices).
+    """
+    __slots__ = ("_h",)
+
+    def __init__(self, hist):
+        self._h = hist
+
+    def __repr__(self):
+        return "HistoBins3D({0})".format(repr(self._h))
+
+    def __iter__(self):
+        for i, j, k in product(xrange(1,self._h.GetNbinsX()+1), xrange(1,self._h.GetNbinsY()+1), xrange(1,self._h.GetNbinsZ()+1)):
+            yield HistoBin3D(self._h, i, j, k)
+
+    def __len__(self):
+        return self._h.GetNbinsX()*self._h.GetNbinsY()*self._h.GetNbinsZ()
+    def __getitem__(self, (i, j, k) ):
+        return HistoBin3D(self._h, i, j, k)
+
+    @property
+    def shape(self):
+        """ shape of the contents and sumw2 arrays (nBinsZ+2, nBinsY+2, nBinsX+2) """
+        return (self._h.GetNbinsZ()+2, self._h.GetNbinsY()+2, self._h.GetNbinsX()+2)
+    def contents(self):
+        """ contents of all cells, as an array indexed as [k,j,i] """
+        return cellArrays(self._h, copy=False)[0].reshape(self.shape)
+    def sumw2(self):
+        """ sum of weights squared of all cells, as an array indexed as [k,j,i] (the contents if sumw2 is not stored) """
+        return cellArrays(self._h, copy=False)[1].reshape(self.shape)
+    def edges(self, axis):
+        """ array of bin edges of an axis ("x", "y" or "z") """
+        ax = getattr(self._h, "Get{0}axis".format(axis.upper()))()
+        return np.array([ ax.GetBinLowEdge(i) for i in xrange(1, ax.GetNbins()+1) ]+[ ax.GetBinUpEdge(ax.GetNbins()) ])
+
+def _th3_bins(self):
+    return HistoBins3D(self)
+gbl.TH3.__bins__ = _th3_bins
+
 ################################################################################
 # TGraph                                                                       #
 ################################################################################
@@ -292,6 +457,8 @@ class GraphPoint(object):
     def __init__(self, graph, i):
         self._h = graph
         self._i = i
+        if _counters is not None:
+            _counters.bins += 1
 
     def __repr__(self):
         return "GraphPoints({0})[{1:n}]".format(repr(self._h), self._i)
@@ -0,0 +1,288 @@
+"""
+Matplotlib draw methods for TEfficiency (and pairs of passed and total histograms)
+
+The efficiencies and confidence intervals of all bins are calculated at once, with
+numpy implementations of the intervals of TEfficiency (Clopper-Pearson, normal
+approximation, Wilson, Agresti-Coull, and the central Bayesian intervals with a beta prior).
+For pairs of histograms, Efficiency(passed, total) can be drawn in the same way.
+When used through the decorators with mplbplot.plot (recommended),
+the methods will be called rplot and rerrorbar:
+
+>>> ax.rerrorbar(tEff, fmt="ko")
+>>> ax.rerrorbar(Efficiency(hPassed, hTotal, statOption="wilson"), fmt="ro")
+"""
+__all__ = ("efficiencyIntervals", "efficiencyArrays", "Efficiency", "plot", "errorbar")
+
+import math
+
+import numpy as np
+
+from .decorators import cellArrays
+
+## default confidence level of TEfficiency (one sigma)
+defaultConfLevel = 0.682689492137
+
+################################################################################
+# Special functions                                                            #
+################################################################################
+
+_lgamma = np.vectorize(math.lgamma, otypes=[np.float64])
+
+def _betaContFrac(x, a, b, maxIter=300, eps=1.e-15):
+    """ continued fraction for the incomplete beta function (modified Lentz's method, as in Numerical Recipes betacf) """
+    tiny = 1.e-300
+    qab, qap, qam = a+b, a+1., a-1.
+    c = np.ones_like(x)
+    d = 1.-qab*x/qap
+    d = np.where(np.abs(d) < tiny, tiny, d)
+    d = 1./d
+    h = d.copy()
+    for m in xrange(1, maxIter+1):
+        m2 = 2*m
+        aa = m*(b-m)*x/((qam+m2)*(a+m2))
+        d = 1.+aa*d
+        d = np.where(np.abs(d) < tiny, tiny, d)
+        c = 1.+aa/c
+        c = np.where(np.abs(c) < tiny, tiny, c)
+        d = 1./d
+        h *= d*c
+        aa = -(a+m)*(qab+m)*x/((a+m2)*(qap+m2))
+        d = 1.+aa*d
+        d = np.where(np.abs(d) < tiny, tiny, d)
+        c = 1.+aa/c
+        c = np.where(np.abs(c) < tiny, tiny, c)
+        d = 1./d
+        delta = d*c
+        h *= delta
+        if np.all(np.abs(delta-1.) < eps):
+            break
+    return h
+
+def betaIncReg(x, a, b, lnBeta=None):
+    """ regularized incomplete beta function I_x(a, b) (arrays of the same shape; lnBeta=ln(B(a,b)) can be passed if known) """
+    x, a, b = np.broadcast_arrays(*( np.asarray(v, dtype=np.float64) for v in (x, a, b) ))
+    if lnBeta is None:
+        lnBeta = _lgamma(a)+_lgamma(b)-_lgamma(a+b)
+    xc = np.clip(x, 0., 1.)
+    with np.errstate(divide="ignore"):
+        front = np.exp(a*np.log(xc)+b*np.log1p(-xc)-lnBeta)
+    ## continued fraction converges fast for x < (a+1)/(a+b+2), use the symmetry relation otherwise
+    direct = ( xc < (a+1.)/(a+b+2.) )
+    res = np.empty_like(xc)
+    if np.any(direct):
+        res[direct] = front[direct]*_betaContFrac(xc[direct], a[direct], b[direct])/a[direct]
+    if not np.all(direct):
+        inv = ~direct
+        res[inv] = 1.-front[inv]*_betaContFrac(1.-xc[inv], b[inv], a[inv])/b[inv]
+    return np.where(xc <= 0., 0., np.where(xc >= 1., 1., res))
+
+def _betaQuantileGuess(p, a, b):
+    """ starting point for betaQuantile (as in Numerical Recipes invbetai) """
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        ## a, b >= 1: normal approximation
+        pp = np.where(p < .5, p, 1.-p)
+        t = np.sqrt(-2.*np.log(pp))
+        z = (2.30753+t*0.27061)/(1.+t*(0.99229+t*0.04481))-t
+        z = np.where(p < .5, -z, z)
+        al = (z**2-3.)/6.
+        h = 2./(1./(2.*a-1.)+1./(2.*b-1.))
+        w = z*np.sqrt(al+h)/h-(1./(2.*b-1.)-1./(2.*a-1.))*(al+5./6.-2./(3.*h))
+        xLarge = a/(a+b*np.exp(2.*w))
+        ## otherwise: from the behaviour near 0 and 1
+        lna, lnb = np.log(a/(a+b)), np.log(b/(a+b))
+        t, u = np.exp(a*lna)/a, np.exp(b*lnb)/b
+        w = t+u
+        xSmall = np.where(p < t/w, (a*w*p)**(1./a), 1.-(b*w*(1.-p))**(1./b))
+    x = np.where((a >= 1.) & (b >= 1.), xLarge, xSmall)
+    return np.clip(np.where(np.isfinite(x), x, .5), 1.e-300, 1.-1.e-16)
+
+def betaQuantile(p, a, b, maxIter=200, eps=1.e-13):
+    """ quantile (inverse of the cumulative distribution) of the beta distribution, for arrays of p, a and b
+
+    Newton steps from an approximate starting point, which fall back to bisection
+    if they would leave the interval in which the quantile is known to be.
+    """
+    p, a, b = np.broadcast_arrays(*( np.asarray(v, dtype=np.float64) for v in (p, a, b) ))
+    lnBeta = _lgamma(a)+_lgamma(b)-_lgamma(a+b)
+    lo, hi = np.zeros_like(p), np.ones_like(p)
+    x = _betaQuantileGuess(p, a, b)
+    active = np.ones(p.shape, dtype=bool)
+    for i in xrange(maxIter):
+        f = betaIncReg(x, a, b, lnBeta=lnBeta)-p
+        lo, hi = np.where(f < 0., x, lo), np.where(f < 0., hi, x)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            xNew = x-f/np.exp((a-1.)*np.log(x)+(b-1.)*np.log1p(-x)-lnBeta)
+            inBracket = np.isfinite(xNew) & (xNew >= lo) & (xNew <= hi)
+        xNew = np.where(inBracket, xNew, .5*(lo+hi))
+        converged = ( np.abs(xNew-x) <= eps*x ) | ( f == 0. ) | ( hi-lo <= eps*x )
+        x = np.where(active, xNew, x)
+        active &= ~converged
+        if not np.any(active):
+            break
+    return np.where(p <= 0., 0., np.where(p >= 1., 1., x))
+
+def normalQuantile(p):
+    """ quantile of the standard normal distribution (for a single p, by Newton's method on erf) """
+    x = 0.
+    for i in xrange(100):
+        step = (.5*math.erfc(-x/math.sqrt(2.))-p)/(math.exp(-.5*x*x)/math.sqrt(2.*math.pi))
+        x -= step
+        if abs(step) < 1.e-15*max(abs(x), 1.):
+            break
+    return x
+
+################################################################################
+# Confidence intervals (as TEfficiency::ClopperPearson, Normal, Wilson etc.)   #
+################################################################################
+
+def _clopperPearson(total, passed, level):
+    alpha = .5*(1.-level)
+    low, up = np.zeros_like(passed), np.ones_like(passed)
+    sel = ( passed != 0. )
+    low[sel] = betaQuantile(alpha, passed[sel], (total-passed+1.)[sel])
+    sel = ( passed != total )
+    up[sel] = betaQuantile(1.-alpha, (passed+1.)[sel], (total-passed)[sel])
+    return low, up
+
+def _normal(total, passed, level):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average = passed/total
+        delta = normalQuantile(.5*(1.+level))*np.sqrt(average*(1.-average)/total)
+    return np.clip(average-delta, 0., 1.), np.clip(average+delta, 0., 1.)
+
+def _wilson(total, passed, level):
+    kappa = normalQuantile(.5*(1.+level))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average = passed/total
+        mode = (passed+.5*kappa**2)/(total+kappa**2)
+        delta = kappa/(total+kappa**2)*np.sqrt(total*average*(1.-average)+.25*kappa**2)
+    return np.clip(mode-delta, 0., 1.), np.clip(mode+delta, 0., 1.)
+
+def _agrestiCoull(total, passed, level):
+    kappa = normalQuantile(.5*(1.+level))
+    mode = (passed+.5*kappa**2)/(total+kappa**2)
+    delta = kappa*np.sqrt(mode*(1.-mode)/(total+kappa**2))
+    return np.clip(mode-delta, 0., 1.), np.clip(mode+delta, 0., 1.)
+
+## frequentist intervals, as the TEfficiency statistic options kFCP, kFNormal, kFWilson and kFAC
+_frequentistIntervals = { "cp" : _clopperPearson, "normal" : _normal, "wilson" : _wilson, "ac" : _agrestiCoull }
+## Bayesian intervals, with the beta prior parameters, as kBJeffrey, kBUniform and kBBayesian (the latter with alpha and beta given)
+_bayesianPriors = { "jeffrey" : (.5, .5), "uniform" : (1., 1.), "bayesian" : None }
+
+def efficiencyIntervals(passed, total, statOption="cp", confLevel=defaultConfLevel, alpha=1., beta=1.):
+    """
+    Efficiencies, and lower and upper edges of the confidence intervals, for arrays of passed and total counts
+
+    statOption is one of "cp" (Clopper-Pearson), "normal", "wilson", "ac" (Agresti-Coull),
+    or "jeffrey", "uniform" and "bayesian" (with a beta(alpha, beta) prior) for central intervals
+    of the posterior, whose mean is the efficiency (as TEfficiency without posterior mode or shortest interval).
+    Where the total is zero, the efficiency is zero and the interval [0, 1] (for the frequentist options;
+    the Bayesian ones give the prior mean and interval).
+    """
+    passed, total = np.broadcast_arrays(np.asarray(passed, dtype=np.float64), np.asarray(total, dtype=np.float64))
+    empty = ( total == 0. )
+    tot = np.where(empty, 1., total) ## avoid dividing by zero (the results for empty bins are set at the end)
+    if statOption in _frequentistIntervals:
+        eff = passed/tot
+        low, up = _frequentistIntervals[statOption](tot, passed, confLevel)
+    elif statOption in _bayesianPriors:
+        alpha, beta = _bayesianPriors[statOption] or (alpha, beta)
+        aa, bb = passed+alpha, total-passed+beta
+        eff = aa/(aa+bb)
+        valid = ( aa > 0. ) & ( bb > 0. )
+        aa, bb = np.where(valid, aa, 1.), np.where(valid, bb, 1.)
+        low = np.where(valid, betaQuantile(.5*(1.-confLevel), aa, bb), 0.)
+        up = np.where(valid, betaQuantile(.5*(1.+confLevel), aa, bb), 1.)
+        return eff, low, up
+    else:
+        raise ValueError("Unknown statistic option '{0}' (known: {1})".format(statOption, ", ".join(sorted(list(_frequentistIntervals)+list(_bayesianPriors)))))
+    return np.where(empty, 0., eff), np.where(empty, 0., low), np.where(empty, 1., up)
+
+################################################################################
+# TEfficiency and pairs of histograms                                          #
+################################################################################
+
+## TEfficiency statistic options (enum names) that are implemented here
+_rootStatOptions = { "kFCP" : "cp", "kFNormal" : "normal", "kFWilson" : "wilson", "kFAC" : "ac", "kBJeffrey" : "jeffrey", "kBUniform" : "uniform", "kBBayesian" : "bayesian" }
+
+def _xEdges(hist):
+    axis = hist.GetXaxis()
+    return np.array([ axis.GetBinLowEdge(i) for i in xrange(1, axis.GetNbins()+1) ] + [ axis.GetBinUpEdge(axis.GetNbins()) ])
+
+class Efficiency(object):
+    """ Efficiency from a pair of (one-dimensional) passed and total histograms, with a statistic option and confidence level (see efficiencyIntervals) """
+    __slots__ = ("passed", "total", "statOption", "confLevel", "alpha", "beta")
+    def __init__(self, passed, total, statOption="cp", confLevel=defaultConfLevel, alpha=1., beta=1.):
+        self.passed = passed
+        self.total = total
+        self.statOption = statOption
+        self.confLevel = confLevel
+        self.alpha = alpha
+        self.beta = beta
+    def arrays(self):
+        """ bin edges, efficiencies, lower and upper interval edges, and totals """
+        passed, total = cellArrays(self.passed)[0][1:-1], cellArrays(self.total)[0][1:-1]
+        eff, low, up = efficiencyIntervals(passed, total, statOption=self.statOption, confLevel=self.confLevel, alpha=self.alpha, beta=self.beta)
+        return _xEdges(self.total), eff, low, up, total
+    def __plot__(self, *args, **kwargs):
+        return plot(self, *args, **kwargs)
+    def __errorbar__(self, *args, **kwargs):
+        return errorbar(self, *args, **kwargs)
+
+def _tefficiencyArrays(tEff):
+    """ as Efficiency.arrays, for a TEfficiency (per bin with the TEfficiency methods for the options that are not implemented here) """
+    from cppyy import gbl
+    if tEff.GetDimension() != 1:
+        raise ValueError("Only one-dimensional TEfficiency objects can be drawn")
+    totalHist = tEff.GetTotalHistogram()
+    total = cellArrays(totalHist)[0][1:-1]
+    statOption = next(( opt for enumName, opt in _rootStatOptions.iteritems() if tEff.GetStatisticOption() == getattr(gbl.TEfficiency, enumName) ), None)
+    if statOption is None or tEff.UsesWeights() or ( tEff.UsesBayesianStat() and ( tEff.UsesPosteriorMode() or tEff.UsesShortestInterval() ) ):
+        nBins = totalHist.GetNbinsX()
+        eff = np.array([ tEff.GetEfficiency(i) for i in xrange(1, nBins+1) ])
+        low = eff-np.array([ tEff.GetEfficiencyErrorLow(i) for i in xrange(1, nBins+1) ])
+        up = eff+np.array([ tEff.GetEfficiencyErrorUp(i) for i in xrange(1, nBins+1) ])
+    else:
+        passed = cellArrays(tEff.GetPassedHistogram())[0][1:-1]
+        eff, low, up = efficiencyIntervals(passed, total, statOption=statOption, confLevel=tEff.GetConfidenceLevel(), alpha=tEff.GetBetaAlpha(), beta=tEff.GetBetaBeta())
+    return _xEdges(totalHist), eff, low, up, total
+
+def efficiencyArrays(eff):
+    """ bin edges, efficiencies, lower and upper interval edges, and totals for a TEfficiency or Efficiency """
+    return eff.arrays() if isinstance(eff, Efficiency) else _tefficiencyArrays(eff)
+
+def plot( eff, fmt=None, axes=None, empty=False, **kwargs ):
+    """
+    Wrapper around axes.plot for TEfficiency (or Efficiency), replacement for ROOT's P and L options
+
+    Bins with a total of zero are skipped unless "empty" is set to True.
+    """
+    edges, y, low, up, total = efficiencyArrays(eff)
+    sel = slice(None) if empty else ( total != 0. )
+    return axes.plot( .5*(edges[:-1]+edges[1:])[sel], y[sel], fmt, **kwargs )
+
+def errorbar( eff, axes=None, empty=False, xErrors=True, kind="bar", **kwargs ):
+    """
+    Wrapper around axes.errorbar for TEfficiency (or Efficiency), replacement for ROOT's E option
+
+    The efficiencies and asymmetric confidence intervals of all bins are calculated at once (see efficiencyIntervals),
+    for the statistic option and confidence level of the TEfficiency (options that are not implemented
+    with numpy, e.g. Feldman-Cousins, weights, or the posterior mode, are taken from the TEfficiency bin by bin).
+    The type of error visualisation can be set by setting kind="bar" or "band".
+    Bins with a total of zero are skipped unless "empty" is set to True. x errors can be turned off by setting xErrors to False.
+    """
+    edges, y, low, up, total = efficiencyArrays(eff)
+    sel = slice(None) if empty else ( total != 0. )
+    x, y, low, up = .5*(edges[:-1]+edges[1:])[sel], y[sel], low[sel], up[sel]
+    if kind == "bar":
+        return axes.errorbar(x, y, yerr=(y-low, up-y), xerr=( .5*np.diff(edges)[sel] if xErrors else None ), **kwargs)
+    elif kind == "band":
+        return axes.fill_between(x, low, y2=up, **kwargs)
+    else:
+        raise ValueError("Unknown kind '{0}' (should be 'bar' or 'band')".format(kind))
+
+def _addDecorations():
+    """ load decorators for draw methods that need dispatch """
+    from cppyy import gbl
+    gbl.TEfficiency.__plot__ = plot
+    gbl.TEfficiency.__errorbar__ = errorbar
@@ -10,6 +10,7 @@ TGraph.__plot__ and TGraph.__errorbar__.
 __all__ = ("plot", "errorbar")
 
 from .decorators import points
+from .datalim import addBoxes
 
 def plot( graph, fmt=None, axes=None, **kwargs ):
     """
@@ -21,7 +22,7 @@ def plot( graph, fmt=None, axes=None, **kwargs ):
 
     return axes.plot( x, y, fmt, **kwargs )
 
-def errorbar( graph, axes=None, xErrors=True, kind="bar", removeZero=False, **kwargs ):
+def errorbar( graph, axes=None, xErrors=True, kind="bar", removeZero=False, autolim=True, **kwargs ):
     """
     Wrapper around axes.errorbar for TGraph, replacement for ROOT's E option (with P and/or L at a time, in case kind is bar)
 
@@ -29,17 +30,14 @@ def errorbar( graph, axes=None, xErrors=True, kind="bar", removeZero=False, **kw
     The type of error visualisation can be set by setting kind="bar", "box" or "band".
     x errors can be turned off by setting xErrors to False (ignored in case kind is box; meaningless in case kind is band).
     Points with y=0 can be removed by passing the option removeZero=True
+    For kind="box", the data limits are updated once for all boxes, or not at all if "autolim" is set to False (see mplbplot.datalim.addBoxes).
     """
     if kind == "bar":
         x,xle,xue,y,yle,yue = zip(*[ (p.x, p.xLowError, p.xHighError, p.y, p.yLowError, p.yHighError) for p in points(graph) if not removeZero or p.y != 0. ])
         return axes.errorbar(x, y, yerr=(yle, yue), xerr=( (xle,xue) if xErrors else None ), **kwargs)
     elif kind == "box":
-        import matplotlib.patches
-        return [ axes.add_patch( matplotlib.patches.Rectangle(
-                        (p.x-p.xLowError, p.y-p.yLowError), ## left bottom
-                        width=(p.xLowError+p.xHighError), height=(p.yLowError+p.yHighError),
-                        **kwargs ) )
-                    for p in points(graph) if not removeZero or p.y != 0. ]
+        return addBoxes(axes, [ (p.x-p.xLowError, p.xLowError+p.xHighError, p.y-p.yLowError, p.yLowError+p.yHighError) ## left, width, bottom, height
+                    for p in points(graph) if not removeZero or p.y != 0. ], autolim=autolim, **kwargs)
     elif kind == "band":
         x,yLow,yHigh = zip(*[ (p.x, p.y-p.yLowError, p.y+p.yHighError) for p in points(graph) if not removeZero or p.y != 0. ])
         return axes.fill_between( x, yLow, y2=yHigh, **kwargs )
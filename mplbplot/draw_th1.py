@@ -8,11 +8,17 @@ the methods will be called rhist, rplot, rerrorbar and rtext,
 and the documentation for the latter three is available through
 TH1.__plot__, TH1.__errorbar__, and TH1.__text__.
 """
-__all__ = ("hist", "plot", "errorbar", "text", "IncompatibleAxesError")
+__all__ = ("hist", "plot", "errorbar", "text", "IncompatibleAxesError", "StepPolygon")
 
 from itertools import izip_longest
 
+import numpy as np
+import matplotlib.artist
+import matplotlib.patches
+from matplotlib.path import Path
+
 from .decorators import bins
+from .datalim import patchLimitsFrom, addBoxes
 
 def _equal_lists(a,b):
     return all( ia == ib for ia,ib in izip_longest(a,b) )
@@ -27,7 +33,93 @@ class IncompatibleAxesError(IndexError):
     def __str__(self):
         return "{a:s} and {b:s} have incompatible axes".format(a=self.hA, b=self.hB)
 
-def hist( histo, axes=None, volume=False, **kwargs ):
+def _mergeStepVertices(xy):
+    """ indices of the vertices of a polyline with horizontal and vertical segments that are needed to draw it
+    (without repeated points, and without the middle points of horizontal or vertical runs, e.g. of equal bin contents;
+    a point where the polyline turns back, e.g. over empty bins at the end of a filled histogram, is kept) """
+    if len(xy) < 3:
+        return np.arange(len(xy))
+    idx = np.concatenate(([ 0 ], 1+np.flatnonzero(np.any(np.diff(xy, axis=0) != 0., axis=1))))
+    if len(idx) < 3:
+        return idx
+    pts = xy[idx]
+    before, after = np.sign(pts[1:-1]-pts[:-2]), np.sign(pts[2:]-pts[1:-1])
+    sameX = ( before[:,0] == 0. ) & ( after[:,0] == 0. ) & ( before[:,1] == after[:,1] )
+    sameY = ( before[:,1] == 0. ) & ( after[:,1] == 0. ) & ( before[:,0] == after[:,0] )
+    keep = np.concatenate(([ True ], ~( sameX | sameY ), [ True ]))
+    return idx[keep]
+
+def _columnVertices(u, v, tolerance):
+    """ indices of the vertices to keep if all consecutive vertices with u in the same interval of size tolerance
+    are replaced by the first, last, and those with the lowest and highest v (in the original order) """
+    col = np.floor(u/tolerance)
+    starts = np.concatenate(([ 0 ], 1+np.flatnonzero(col[1:] != col[:-1])))
+    if len(starts) == len(u):
+        return np.arange(len(u))
+    runId = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(u))))
+    byLow = np.lexsort((v, runId))
+    byHigh = np.lexsort((-v, runId))
+    ends = np.append(starts[1:], len(u))-1
+    nPerRun = ends-starts+1
+    firstInRun = np.cumsum(nPerRun)-nPerRun
+    return np.unique(np.concatenate((starts, ends, byLow[firstInRun], byHigh[firstInRun])))
+
+class StepPolygon(matplotlib.patches.Polygon):
+    """
+    Polygon for the outline of a step histogram, with fewer vertices
+
+    Runs of bins with equal contents are merged when constructing it. If tolerance is given,
+    steps that are narrower than that (in device units: pixels, or points for vector output)
+    are also collapsed when drawing, to the lowest and highest point per interval of that width
+    along the binned axis (axis 0 for x, 1 for y): the outline moves by less than the tolerance
+    along that axis, and not at all along the other.
+    """
+    def __init__(self, xy, tolerance=None, axis=0, **kwargs):
+        xy = np.asarray(xy, dtype=np.float64)
+        closed = kwargs.pop("closed", True)
+        if closed and len(xy) > 1 and np.all(xy[0] == xy[-1]):
+            xy = xy[:-1]
+        super(StepPolygon, self).__init__(xy[_mergeStepVertices(xy)], closed=closed, **kwargs)
+        self.tolerance = tolerance
+        self.axis = axis
+
+    @classmethod
+    def fromPolygon(cls, poly, tolerance=None, axis=0):
+        """ StepPolygon with the vertices and properties of poly (e.g. made by axes.hist) """
+        step = cls(poly.get_xy(), tolerance=tolerance, axis=axis, closed=poly.get_closed())
+        step.update_from(poly)
+        step.set_zorder(poly.get_zorder())
+        return step
+
+    @matplotlib.artist.allow_rasterization
+    def draw(self, renderer):
+        path = self._path
+        if self.tolerance and len(path.vertices) > 4:
+            display = self.get_transform().transform(path.vertices)
+            idx = _columnVertices(display[:,self.axis], display[:,1-self.axis], self.tolerance)
+            if len(idx) < len(path.vertices):
+                self._path = Path(path.vertices[idx], ( path.codes[idx] if path.codes is not None else None ))
+        try:
+            super(StepPolygon, self).draw(renderer)
+        finally:
+            self._path = path
+
+def _stepPolygons(axes, patches, tolerance, orientation):
+    """ replace the polygons of a step histogram made by axes.hist by StepPolygon (also in axes.patches) """
+    from matplotlib.cbook import silent_list
+    if len(patches) > 0 and not isinstance(patches[0], matplotlib.patches.Patch):
+        return [ _stepPolygons(axes, ipatches, tolerance, orientation) for ipatches in patches ]
+    steps = []
+    for poly in patches:
+        step = StepPolygon.fromPolygon(poly, tolerance=tolerance, axis=( 1 if orientation == "horizontal" else 0 ))
+        axes.patches[axes.patches.index(poly)] = step
+        step.axes = axes
+        step.set_figure(axes.figure)
+        step._remove_method = axes.patches.remove ## as set by axes.add_patch, for step.remove()
+        steps.append(step)
+    return silent_list("StepPolygon", steps)
+
+def hist( histo, axes=None, volume=False, simplify=False, autolim=True, **kwargs ):
     """
     Wrapper around axes.hist
  
@@ -35,7 +127,30 @@ def hist( histo, axes=None, volume=False, **kwargs ):
     In case multiple histograms are given, a check is done to make sure the axes are equal.
     If the "volume" option is set to True, the height is determined as the bin contents divided by its width
     (such that the volume is proportional to the contents, rather than the height).
+    For the step and stepfilled histtypes, the outline can be drawn with fewer vertices (see StepPolygon):
+    if "simplify" is set to True, runs of bins with equal contents are merged, and if it is a number,
+    also steps narrower than that (in pixels, or points for vector output) are collapsed when drawing.
+    For the bar and barstacked histtypes, the data limits are updated once for all bars (see mplbplot.datalim),
+    or not at all if "autolim" is set to False.
     """
+    if kwargs.get("histtype", "bar").startswith("bar") and "transform" not in kwargs:
+        with patchLimitsFrom(axes, autolim) as (xs, ys):
+            n, edges, patches = _hist(histo, axes, volume, **kwargs)
+            xs.append(_barCorners(patches, "get_x", "get_width"))
+            ys.append(_barCorners(patches, "get_y", "get_height"))
+        return n, edges, patches
+    n, edges, patches = _hist(histo, axes, volume, **kwargs)
+    if simplify is not False and simplify is not None and kwargs.get("histtype", "bar").startswith("step"):
+        patches = _stepPolygons(axes, patches, ( None if simplify is True else simplify ), kwargs.get("orientation", "vertical"))
+    return n, edges, patches
+
+def _barCorners(patches, getPos, getSize):
+    """ lower and upper coordinates of the rectangles (one or several containers of them, as returned by axes.hist) """
+    rects = [ p for pp in patches for p in pp ] if len(patches) > 0 and not isinstance(patches[0], matplotlib.patches.Patch) else list(patches)
+    pos = np.array([ getattr(r, getPos)() for r in rects ], dtype=np.float64)
+    return np.concatenate((pos, pos+np.array([ getattr(r, getSize)() for r in rects ], dtype=np.float64)))
+
+def _hist( histo, axes, volume, **kwargs ):
     height = ( lambda b : b.contentH ) if volume else ( lambda b : b.content )
 
     if hasattr(histo, "__iter__") and len(histo) > 0:
@@ -44,9 +159,10 @@ def hist( histo, axes=None, volume=False, **kwargs ):
         # check compatibility of axes
         if not all( _equal_lists(xBinEdges(ih), firstEdges) for ih in histo ):
             raise Exception
-        return axes.hist( [ firstCenters for ih in histo ], weights=[ [ height(b) for b in bins(ih) ] for ih in histo ], bins=firstEdges, **kwargs )
+        n, edges, patches = axes.hist( [ firstCenters for ih in histo ], weights=[ [ height(b) for b in bins(ih) ] for ih in histo ], bins=firstEdges, **kwargs )
     else:
-        return axes.hist( [ b.xCenter for b in bins(histo) ], weights=[ height(b) for b in bins(histo) ], bins=xBinEdges(histo), **kwargs )
+        n, edges, patches = axes.hist( [ b.xCenter for b in bins(histo) ], weights=[ height(b) for b in bins(histo) ], bins=xBinEdges(histo), **kwargs )
+    return n, edges, patches
 
 def _getBinCoordinate( edge=None, axis=None ):
     """
@@ -80,7 +196,7 @@ def plot( histo, fmt=None, axes=None, empty=False, volume=False, useEdge=None, *
 
     return axes.plot( x, y, fmt, **kwargs )
 
-def errorbar( histo, axes=None, empty=False, volume=False, useEdge=None, xErrors=True, kind="bar", **kwargs ):
+def errorbar( histo, axes=None, empty=False, volume=False, useEdge=None, xErrors=True, kind="bar", autolim=True, **kwargs ):
     """
     Wrapper around axes.errorbar for TH1, replacement for ROOT's E option (with P and/or L at a time, in case kind is bar)
 
@@ -89,6 +205,7 @@ def errorbar( histo, axes=None, empty=False, volume=False, useEdge=None, xErrors
     Empty bins are kept if "empty" is set to True. x errors can be turned off by setting xErrors to False (ignored in case kind is box; meaningless in case kind is band).
     If the "volume" option is set to True, the height is determined as the bin contents divided by its width
     (such that the volume is proportional to the contents, rather than the height).
+    For kind="box", the data limits are updated once for all boxes, or not at all if "autolim" is set to False (see mplbplot.datalim.addBoxes).
     """
     height       = ( lambda b : b.contentH  ) if volume else ( lambda b : b.content  )
     heightUpErr  = ( lambda b : b.upErrorH  ) if volume else ( lambda b : b.upError  )
@@ -99,12 +216,8 @@ def errorbar( histo, axes=None, empty=False, volume=False, useEdge=None, xErrors
         x,xe,y,yle,yue = zip(*[ (getX(b), .5*b.xWidth, height(b), heightLowErr(b), heightUpErr(b)) for b in bins(histo) if empty or b.content != 0. ])
         return axes.errorbar(x, y, yerr=(yle, yue), xerr=( xe if xErrors else None ), **kwargs)
     elif kind == "box":
-        import matplotlib.patches
-        return [ axes.add_patch( matplotlib.patches.Rectangle(
-                        (b.xLowEdge, height(b)-heightLowErr(b)), ## left bottom
-                        width=b.xWidth, height=heightLowErr(b)+heightUpErr(b),
-                        **kwargs ) )
-                    for b in bins(histo) if empty or b.content != 0. ]
+        return addBoxes(axes, [ (b.xLowEdge, b.xWidth, height(b)-heightLowErr(b), heightLowErr(b)+heightUpErr(b)) ## left, width, bottom, height
+                    for b in bins(histo) if empty or b.content != 0. ], autolim=autolim, **kwargs)
     elif kind == "band":
         x,yLow,yHigh = zip(*[ (getX(b), height(b)-heightLowErr(b), height(b)+heightUpErr(b)) for b in bins(histo) if empty or b.content != 0. ])
         return axes.fill_between( x, yLow, y2=yHigh, **kwargs )
@@ -142,17 +255,19 @@ def _addDecorations():
     # placeholder to block rplot(TH2) etc.
     def _onlyForTH1():
         raise AttributeError("This method is only for 1D histograms")
+    def _notForTH3(*args, **kwargs):
+        raise AttributeError("3D histograms cannot be drawn directly, draw a projection or slice instead (see mplbplot.th3)")
 
     from cppyy import gbl
 
     gbl.TH1.__plot__ = plot
     gbl.TH2.__plot__ = _onlyForTH1
-    gbl.TH3.__plot__ = _onlyForTH1
+    gbl.TH3.__plot__ = _notForTH3
 
     gbl.TH1.__errorbar__ = errorbar
     gbl.TH2.__errorbar__ = _onlyForTH1
-    gbl.TH3.__errorbar__ = _onlyForTH1
+    gbl.TH3.__errorbar__ = _notForTH3
 
     gbl.TH1.__text__ = text
     gbl.TH2.__text__ = _onlyForTH1
-    gbl.TH3.__text__ = _onlyForTH1
+    gbl.TH3.__text__ = _notForTH3
@@ -10,8 +10,12 @@ __all__ = ("countour", "contourf", "pcolor", "text")
 
 import numpy as np
 import itertools
+from array import array
+from collections import OrderedDict
 
-from .decorators import bins
+from matplotlib.collections import PolyCollection
+
+from .decorators import bins, cellArrays, _bufferArray, _rootCall
 from .draw_th1 import _getBinCoordinate
 
 def contour( histo, *args, **kwargs ):
@@ -72,10 +76,31 @@ def pcolor( histo, *args, **kwargs ):
     any other arguments are passed on to pcolor.
     If the "volume" option is set to True, the height is determined as the bin contents divided by its width
     (such that the volume is proportional to the contents, rather than the height).
+
+    If "sparse" is set to True, only the non-empty bins are drawn, as one PolyCollection
+    (any other keyword arguments are passed on to its constructor, and vmin and vmax to set_clim),
+    which is faster for mostly empty histograms.
+    THnSparse is always drawn like this, by projecting on the dimensions given by "dims" (default: (0, 1)),
+    which only loops over the filled bins.
+    For TProfile2D the means are drawn (see draw_tprofile.pcolor for the options).
+    TH2Poly is drawn as one PolyCollection as well; if "geometryKey" is given (e.g. the name of the detector layout),
+    the polygons are cached under that key, such that drawing another histogram with the same binning only needs the contents
+    (otherwise they are read from the histogram every time).
     """
     # get keyword arguments
     axes = kwargs.pop("axes", None)
     volume = kwargs.pop("volume", False)
+    sparse = kwargs.pop("sparse", False)
+    dims = kwargs.pop("dims", (0, 1))
+    geometryKey = kwargs.pop("geometryKey", None)
+
+    if _isTProfile2D(histo):
+        from .draw_tprofile import pcolor as profilePcolor
+        return profilePcolor(histo, axes=axes, **kwargs)
+    if _isTH2Poly(histo):
+        return _polyPcolor(histo, axes=axes, volume=volume, geometryKey=geometryKey, **kwargs)
+    if sparse or _isTHnSparse(histo):
+        return _sparsePcolor(histo, axes=axes, volume=volume, dims=dims, **kwargs)
 
     height = ( lambda b : b.contentH ) if volume else ( lambda b : b.content )
 
@@ -85,6 +110,129 @@ def pcolor( histo, *args, **kwargs ):
 
     return axes.pcolormesh(xEdges, yEdges, z, *args, **kwargs)
 
+def _isTHnSparse(histo):
+    return hasattr(histo, "InheritsFrom") and histo.InheritsFrom("THnSparse")
+
+def _axisEdges(axis):
+    return np.array([ axis.GetBinLowEdge(i) for i in xrange(1, axis.GetNbins()+1) ] + [ axis.GetBinUpEdge(axis.GetNbins()) ])
+
+def _filledTH2Bins(histo):
+    """ x and y bin numbers and contents of the non-empty bins of a TH2 (from a view of the buffer) """
+    nx, ny = histo.GetNbinsX(), histo.GetNbinsY()
+    contents = cellArrays(histo, copy=False)[0].reshape((ny+2, nx+2))[1:-1,1:-1]
+    j, i = np.nonzero(contents)
+    return i+1, j+1, contents[j,i]
+
+def _filledTHnSparseBins(histo, dims):
+    """ bin numbers along dims, and contents summed over the other dimensions, of the filled bins of a THnSparse """
+    nFilled = histo.GetNbins()
+    coords = array("i", [ 0 ]*histo.GetNdimensions())
+    idx = np.empty((nFilled, 2), dtype=np.int64)
+    values = np.empty((nFilled,))
+    for iFilled in xrange(nFilled):
+        values[iFilled] = _rootCall(histo.GetBinContent, iFilled, coords)
+        idx[iFilled] = coords[dims[0]], coords[dims[1]]
+    nx, ny = histo.GetAxis(dims[0]).GetNbins(), histo.GetAxis(dims[1]).GetNbins()
+    inRange = (idx[:,0] >= 1) & (idx[:,0] <= nx) & (idx[:,1] >= 1) & (idx[:,1] <= ny) & (values != 0.)
+    cells, iCell = np.unique(idx[inRange,0]+(nx+2)*idx[inRange,1], return_inverse=True)
+    values = np.bincount(iCell, weights=values[inRange], minlength=len(cells))
+    return cells%(nx+2), cells//(nx+2), values
+
+def _sparsePcolor( histo, axes=None, volume=False, dims=(0, 1), **kwargs ):
+    """ pcolor for the non-empty bins only (see pcolor) """
+    if _isTHnSparse(histo):
+        xAxis, yAxis = histo.GetAxis(dims[0]), histo.GetAxis(dims[1])
+        i, j, values = _filledTHnSparseBins(histo, dims)
+    else:
+        xAxis, yAxis = histo.GetXaxis(), histo.GetYaxis()
+        i, j, values = _filledTH2Bins(histo)
+    xEdges, yEdges = _axisEdges(xAxis), _axisEdges(yAxis)
+    xLow, xUp, yLow, yUp = xEdges[i-1], xEdges[i], yEdges[j-1], yEdges[j]
+    if volume:
+        values = values/((xUp-xLow)*(yUp-yLow))
+    verts = np.stack([ np.column_stack(corner) for corner in ((xLow, yLow), (xLow, yUp), (xUp, yUp), (xUp, yLow)) ], axis=1)
+    return _addPolyCollection(axes, verts, values, (xEdges[0], xEdges[-1]), (yEdges[0], yEdges[-1]), **kwargs)
+
+def _addPolyCollection( axes, verts, values, xRange, yRange, **kwargs ):
+    """ add a PolyCollection colored by values (vmin and vmax are passed to set_clim), and show the whole range """
+    vmin, vmax = kwargs.pop("vmin", None), kwargs.pop("vmax", None)
+    kwargs.setdefault("edgecolors", "none")
+    kwargs.setdefault("antialiaseds", False) ## as pcolormesh
+    coll = PolyCollection(verts, array=values, **kwargs)
+    coll.set_clim(vmin, vmax)
+    ## the whole histogram range is shown, without margins, as for pcolormesh
+    coll.sticky_edges.x[:] = list(xRange)
+    coll.sticky_edges.y[:] = list(yRange)
+    axes.update_datalim([ (xRange[0], yRange[0]), (xRange[1], yRange[1]) ])
+    axes.add_collection(coll, autolim=False)
+    axes.autoscale_view()
+    return coll
+
+def _isTProfile2D(histo):
+    return hasattr(histo, "InheritsFrom") and histo.InheritsFrom("TProfile2D")
+
+def _isTH2Poly(histo):
+    return hasattr(histo, "InheritsFrom") and histo.InheritsFrom("TH2Poly")
+
+class PolyGeometry(object):
+    """
+    Polygons of the bins of a TH2Poly (a bin can have several, if it is defined by a TMultiGraph)
+
+    verts is the list of (n, 2) vertex arrays, binIdx the (0-based) bin index for each of those,
+    areas the area of each bin, and xRange and yRange the extent of all bins.
+    """
+    __slots__ = ("verts", "binIdx", "areas", "xRange", "yRange")
+    def __init__(self, histo):
+        self.verts = []
+        binIdx = []
+        for iBin, polyBin in enumerate(histo.GetBins()):
+            poly = _rootCall(polyBin.GetPolygon)
+            graphs = _rootCall(poly.GetListOfGraphs) if _rootCall(poly.InheritsFrom, "TMultiGraph") else [ poly ]
+            for graph in graphs:
+                n = _rootCall(graph.GetN)
+                self.verts.append(np.column_stack((_bufferArray(_rootCall(graph.GetX), n, np.float64), _bufferArray(_rootCall(graph.GetY), n, np.float64))))
+                binIdx.append(iBin)
+        self.binIdx = np.array(binIdx, dtype=np.int64)
+        ## shoelace formula, summed over the polygons of each bin
+        polyAreas = np.array([ .5*np.abs(np.dot(v[:,0], np.roll(v[:,1], -1))-np.dot(v[:,1], np.roll(v[:,0], -1))) for v in self.verts ])
+        self.areas = np.bincount(self.binIdx, weights=polyAreas, minlength=histo.GetNumberOfBins())
+        allVerts = np.concatenate(self.verts) if self.verts else np.zeros((1, 2))
+        self.xRange = (np.min(allVerts[:,0]), np.max(allVerts[:,0]))
+        self.yRange = (np.min(allVerts[:,1]), np.max(allVerts[:,1]))
+
+## PolyGeometry of recently drawn TH2Poly binnings, by geometry key (see polyGeometry)
+_polyGeometries = OrderedDict()
+_polyGeometriesMaxSize = 16
+
+def polyGeometry(histo, geometryKey=None):
+    """
+    PolyGeometry for a TH2Poly, from the cache if one was made for the same geometryKey before
+
+    geometryKey identifies the binning (it is up to the caller to use the same key only for the same binning);
+    if it is not given, the polygons are read from the histogram, and not cached
+    """
+    if geometryKey is None:
+        return PolyGeometry(histo)
+    geom = _polyGeometries.pop(geometryKey, None)
+    if geom is None:
+        geom = PolyGeometry(histo)
+        if len(_polyGeometries) >= _polyGeometriesMaxSize:
+            _polyGeometries.popitem(last=False)
+    _polyGeometries[geometryKey] = geom ## (most recently used last)
+    return geom
+
+def polyContents(histo):
+    """ array with the contents of the bins of a TH2Poly (bin i+1 at index i) """
+    return np.array([ _rootCall(b.GetContent) for b in histo.GetBins() ], dtype=np.float64)
+
+def _polyPcolor( histo, axes=None, volume=False, geometryKey=None, **kwargs ):
+    """ pcolor for TH2Poly (see pcolor) """
+    geom = polyGeometry(histo, geometryKey=geometryKey)
+    values = polyContents(histo)
+    if volume:
+        values = values/geom.areas
+    return _addPolyCollection(axes, geom.verts, values[geom.binIdx], geom.xRange, geom.yRange, **kwargs)
+
 def text( histo, formatFun="{0:.0f}".format, axes=None, empty=False, useEdgeX=None, useEdgeY=None, **kwargs ):
     """
     Wrapper around axes.text for every bin of a TH2, replacement for ROOT's TEXT option
@@ -0,0 +1,133 @@
+"""
+Matplotlib draw methods for TProfile and TProfile2D
+
+The means, errors and entries of all bins are calculated at once (with numpy)
+from the sums that the profile stores (of w*y, w*y^2, w and w^2 per bin),
+following TProfile::GetBinContent and GetBinError for the error options
+"" (error on the mean), "s" (spread), "i" and "g" (see profileArrays).
+When used through the decorators with mplbplot.plot (recommended),
+plot and errorbar are called for rplot and rerrorbar with a TProfile,
+and pcolor for rpcolor with a TProfile2D.
+"""
+__all__ = ("profileArrays", "plot", "errorbar", "pcolor")
+
+import numpy as np
+
+from .decorators import cellArrays, _bufferArray, _rootCall
+from .draw_th2 import _axisEdges, _isTProfile2D
+from .datalim import addBoxes
+
+def _binEntries(profile, nCells):
+    """ sum of weights per cell (fBinEntries, which is protected: from the buffer of the projection with option "B",
+    which has these as contents, or per bin if the profile cannot be projected) """
+    projName = "{0}_binEntries".format(profile.GetName())
+    if _isTProfile2D(profile) and hasattr(profile, "ProjectionXY"):
+        proj = _rootCall(profile.ProjectionXY, projName, "B")
+    elif not _isTProfile2D(profile) and hasattr(profile, "ProjectionX"):
+        proj = _rootCall(profile.ProjectionX, projName, "B")
+    else:
+        return np.array([ _rootCall(profile.GetBinEntries, i) for i in xrange(nCells) ], dtype=np.float64)
+    _rootCall(proj.SetDirectory, 0)
+    return cellArrays(proj)[0]
+
+def profileArrays(profile, errorOption=None):
+    """
+    Means, errors and entries (sum of weights) of all cells of a TProfile or TProfile2D (including underflow and overflow)
+
+    The errors are calculated for errorOption, or the error option of the profile if not given:
+    "" for the error on the mean, "s" for the spread, "i" as "" but 1/sqrt(12*N) for bins
+    with zero spread, and "g" for 1/sqrt(N), where N is the effective number of entries.
+    Cells without entries have zero mean and error.
+    """
+    nCells = profile.GetNcells()
+    sumwy, sumwy2 = cellArrays(profile)
+    sumw = _binEntries(profile, nCells)
+    binSumw2 = _rootCall(profile.GetBinSumw2)
+    sumw2 = _bufferArray(_rootCall(binSumw2.GetArray), nCells, np.float64) if _rootCall(binSumw2.GetSize) > 0 else sumw
+    filled = ( sumw != 0. )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = np.where(filled, sumwy/sumw, 0.)
+        spread = np.sqrt(np.abs(np.where(filled, sumwy2/sumw, 0.)-means**2))
+        nEff = np.where(sumw2 != 0., sumw**2/sumw2, 0.)
+        opt = ( errorOption if errorOption is not None else profile.GetErrorOption() ).lower()
+        if opt == "s":
+            errors = spread
+        elif opt == "i":
+            errors = np.where(spread != 0., spread/np.sqrt(nEff), 1./np.sqrt(12.*nEff))
+        elif opt == "g":
+            errors = 1./np.sqrt(sumw)
+        elif opt == "":
+            errors = spread/np.sqrt(nEff)
+        else:
+            raise ValueError("Unknown profile error option '{0}' (should be '', 's', 'i' or 'g')".format(opt))
+    errors = np.where(filled, errors, 0.)
+    return means, errors, sumw
+
+def _xPoints(profile, useEdge):
+    edges = _axisEdges(profile.GetXaxis())
+    if useEdge == "lower":
+        x = edges[:-1]
+    elif useEdge == "upper":
+        x = edges[1:]
+    else:
+        x = .5*(edges[:-1]+edges[1:])
+    return edges, x
+
+def plot( profile, fmt=None, axes=None, empty=False, useEdge=None, **kwargs ):
+    """
+    Wrapper around axes.plot for TProfile, replacement for ROOT's P and L options
+
+    Bin centers (or edges, if specified with useEdge="lower" or "upper") and means are taken from the profile.
+    Bins without entries are kept if "empty" is set to True.
+    """
+    edges, x = _xPoints(profile, useEdge)
+    means, errors, entries = profileArrays(profile)
+    sel = slice(None) if empty else ( entries[1:-1] != 0. )
+    return axes.plot( x[sel], means[1:-1][sel], fmt, **kwargs )
+
+def errorbar( profile, axes=None, empty=False, useEdge=None, xErrors=True, kind="bar", errorOption=None, autolim=True, **kwargs ):
+    """
+    Wrapper around axes.errorbar for TProfile, replacement for ROOT's E option (with P and/or L at a time, in case kind is bar)
+
+    Bin centers (or edges, if specified with useEdge="lower" or "upper"), means and errors are taken from the profile;
+    the errors are those for errorOption, or the error option of the profile if not given (see profileArrays).
+    The type of error visualisation can be set by setting kind="bar", "box" or "band".
+    Bins without entries are kept if "empty" is set to True. x errors can be turned off by setting xErrors to False (ignored in case kind is box; meaningless in case kind is band).
+    For kind="box", the data limits are updated once for all boxes, or not at all if "autolim" is set to False (see mplbplot.datalim.addBoxes).
+    """
+    edges, x = _xPoints(profile, useEdge)
+    means, errors, entries = profileArrays(profile, errorOption=errorOption)
+    sel = slice(None) if empty else ( entries[1:-1] != 0. )
+    x, y, yErr = x[sel], means[1:-1][sel], errors[1:-1][sel]
+    if kind == "bar":
+        return axes.errorbar(x, y, yerr=yErr, xerr=( .5*np.diff(edges)[sel] if xErrors else None ), **kwargs)
+    elif kind == "box":
+        return addBoxes(axes, np.column_stack((edges[:-1][sel], np.diff(edges)[sel], y-yErr, 2.*yErr)), autolim=autolim, **kwargs)
+    elif kind == "band":
+        return axes.fill_between( x, y-yErr, y2=y+yErr, **kwargs )
+
+def pcolor( profile, axes=None, value="mean", empty=False, errorOption=None, **kwargs ):
+    """
+    Wrapper around axes.pcolormesh for TProfile2D, replacement for ROOT's COLZ option
+
+    The color is the mean of every bin, or the error (for errorOption, or the error option of the profile; see profileArrays)
+    if value="error", or the sum of weights if value="entries". Bins without entries are not drawn, unless "empty" is set to True.
+    Any other arguments are passed on to pcolormesh.
+    """
+    xEdges, yEdges = _axisEdges(profile.GetXaxis()), _axisEdges(profile.GetYaxis())
+    means, errors, entries = profileArrays(profile, errorOption=errorOption)
+    try:
+        z = { "mean" : means, "error" : errors, "entries" : entries }[value]
+    except KeyError:
+        raise ValueError("Unknown value '{0}' (should be 'mean', 'error' or 'entries')".format(value))
+    shape = (len(yEdges)+1, len(xEdges)+1)
+    z = z.reshape(shape)[1:-1,1:-1]
+    if not empty:
+        z = np.ma.masked_where(entries.reshape(shape)[1:-1,1:-1] == 0., z)
+    return axes.pcolormesh(xEdges, yEdges, z, **kwargs)
+
+def _addDecorations():
+    """ load decorators for draw methods that need dispatch """
+    from cppyy import gbl
+    gbl.TProfile.__plot__ = plot
+    gbl.TProfile.__errorbar__ = errorbar
@@ -0,0 +1,227 @@
+"""
+Histogram artists that can be updated in place, e.g. for online monitoring
+
+The hist, errorbar and pcolor methods draw with the same methods as rhist, rerrorbar
+(kind="bar") and rpcolor, and return a handle with an update(histo) method
+that takes the new contents (and sumw2) directly from the histogram buffers, and
+changes the data of the existing artists, rather than making new ones.
+BlitManager redraws only those artists, on top of a saved background:
+
+>>> from mplbplot import live
+>>> hHandle = live.hist(h, axes=ax, histtype="stepfilled")
+>>> eHandle = live.errorbar(hData, axes=ax, fmt="ko")
+>>> blit = live.BlitManager(fig.canvas, (hHandle, eHandle))
+>>> while True:
+>>>     ... ## fill h and hData
+>>>     hHandle.update(h)
+>>>     eHandle.update(hData)
+>>>     blit.update()
+
+The binning is assumed not to change between updates (the axis limits are not
+changed either, unless rescale=True is passed to BlitManager.update).
+"""
+__all__ = ("hist", "errorbar", "pcolor", "LiveHist", "LiveErrorbar", "LivePcolor", "BlitManager")
+
+import numpy as np
+
+from .decorators import bins, cellArrays
+from cppyy import gbl
+from . import draw_th1
+from . import draw_th2
+
+class LiveHist(object):
+    """ Handle for a histogram drawn with hist (see there); artists is the list of patches """
+    __slots__ = ("axes", "histtype", "volume", "edges", "artists")
+    def __init__(self, histo, axes=None, histtype="bar", volume=False, **kwargs):
+        if kwargs.get("simplify", False) not in (False, None):
+            raise ValueError("The outline of a live histogram cannot be simplified (the vertices are updated in place)")
+        self.axes = axes
+        self.histtype = histtype
+        self.volume = volume
+        n, edges, patches = draw_th1.hist(histo, axes=axes, volume=volume, histtype=histtype, **kwargs)
+        self.edges = np.asarray(edges)
+        self.artists = list(patches)
+    def _heights(self, histo):
+        contents = cellArrays(histo)[0][1:len(self.edges)]
+        return contents/np.diff(self.edges) if self.volume else contents
+    def update(self, histo):
+        """ Set the heights from histo (with the same binning) """
+        heights = self._heights(histo)
+        if self.histtype.startswith("step"):
+            ## one polygon: (x0, bottom), (x0, h0), (x1, h0), (x1, h1) ... (xN, hN-1), (xN, bottom) [, back along the bottom]
+            poly = self.artists[0]
+            xy = poly.get_xy()
+            xy[1:2*len(heights)+1,1] = np.repeat(heights, 2)
+            poly.set_xy(xy)
+        else:
+            for rect, height in zip(self.artists, heights):
+                rect.set_height(height)
+
+def hist(histo, axes=None, histtype="bar", volume=False, **kwargs):
+    """
+    Draw a (single) TH1 with draw_th1.hist (as rhist), and return a LiveHist handle that can update the patches in place
+
+    All keyword arguments are passed on to draw_th1.hist, but the outline cannot be simplified
+    """
+    return LiveHist(histo, axes=axes, histtype=histtype, volume=volume, **kwargs)
+
+class LiveErrorbar(object):
+    """ Handle for a histogram drawn with errorbar (see there); artists are those of the ErrorbarContainer """
+    __slots__ = ("axes", "empty", "volume", "x", "xErr", "edges", "container", "artists")
+    def __init__(self, histo, axes=None, empty=False, volume=False, useEdge=None, xErrors=True, **kwargs):
+        self.axes = axes
+        self.empty = empty
+        self.volume = volume
+        self.edges = np.array(draw_th1.xBinEdges(histo))
+        self.x = { "lower" : self.edges[:-1], "upper" : self.edges[1:] }.get(useEdge, .5*(self.edges[:-1]+self.edges[1:]))
+        self.xErr = .5*np.diff(self.edges) if xErrors else None
+        ## all bins are drawn, such that the number of points stays the same; empty bins are hidden (set to NaN)
+        self.container = draw_th1.errorbar(histo, axes=axes, empty=True, volume=volume, useEdge=useEdge, xErrors=xErrors, kind="bar", **kwargs)
+        dataLine, caplines, barcols = self.container.lines
+        self.artists = [ art for art in (dataLine,) if art is not None ] + list(caplines) + list(barcols)
+        if not empty:
+            self._hide(cellArrays(histo)[0][1:len(self.edges)] == 0.)
+    def _hide(self, mask):
+        """ hide the points and error bars of the bins in mask (keeping the others as drawn) """
+        dataLine, caplines, barcols = self.container.lines
+        for line in ( [ dataLine ] if dataLine is not None else [] ) + list(caplines):
+            y = np.array(line.get_ydata(), dtype=np.float64)
+            y[mask] = np.nan
+            line.set_ydata(y)
+        for barcol in barcols:
+            segments = np.array(barcol.get_segments(), dtype=np.float64)
+            segments[mask] = np.nan
+            barcol.set_segments(segments)
+    def _values(self, histo):
+        """ y, and lower and upper y errors; empty bins are NaN (not drawn) unless empty is set
+
+        The errors are taken from sumw2 (as the bin errors with the default error option),
+        or per bin (as draw_th1.errorbar) if the histogram has another error option (e.g. Poisson)
+        """
+        contents, sumw2 = cellArrays(histo)
+        y = contents[1:len(self.edges)]
+        if hasattr(histo, "GetBinErrorOption") and histo.GetBinErrorOption() != gbl.TH1.kNormal:
+            yLowErr = np.array([ b.lowError for b in bins(histo) ], dtype=np.float64)
+            yUpErr = np.array([ b.upError for b in bins(histo) ], dtype=np.float64)
+        else:
+            yLowErr = yUpErr = np.sqrt(np.abs(sumw2[1:len(self.edges)]))
+        if self.volume:
+            widths = np.diff(self.edges)
+            y, yLowErr, yUpErr = y/widths, yLowErr/widths, yUpErr/widths
+        if not self.empty:
+            y = np.where(y != 0., y, np.nan)
+        return y, yLowErr, yUpErr
+    def update(self, histo):
+        """ Set the points and error bars from histo (with the same binning) """
+        y, yLowErr, yUpErr = self._values(histo)
+        dataLine, caplines, barcols = self.container.lines
+        if dataLine is not None:
+            dataLine.set_data(self.x, y)
+        yLow, yUp = y-yLowErr, y+yUpErr
+        ## x errors first (if any), then y errors (as axes.errorbar)
+        lines = []
+        if self.xErr is not None:
+            xLow, xUp = self.x-self.xErr, self.x+self.xErr
+            lines.append((np.stack([ np.column_stack((xLow, y)), np.column_stack((xUp, y)) ], axis=1), ((xLow, y), (xUp, y))))
+        lines.append((np.stack([ np.column_stack((self.x, yLow)), np.column_stack((self.x, yUp)) ], axis=1), ((self.x, yLow), (self.x, yUp))))
+        for barcol, (segments, caps) in zip(barcols, lines):
+            barcol.set_segments(segments)
+        if caplines:
+            for capline, (cx, cy) in zip(caplines, ( cap for segments, lineCaps in lines for cap in lineCaps )):
+                capline.set_data(cx, cy)
+
+def errorbar(histo, axes=None, empty=False, volume=False, useEdge=None, xErrors=True, **kwargs):
+    """
+    Draw a TH1 with draw_th1.errorbar (as rerrorbar, with kind="bar"), and return a LiveErrorbar handle
+    that can update the points and error bars in place
+
+    When updating, the errors are taken from the sumw2 buffer (per bin if the histogram has a non-default error option).
+    All other keyword arguments are passed on to draw_th1.errorbar (and from there to axes.errorbar)
+    """
+    return LiveErrorbar(histo, axes=axes, empty=empty, volume=volume, useEdge=useEdge, xErrors=xErrors, **kwargs)
+
+class LivePcolor(object):
+    """ Handle for a histogram drawn with pcolor (see there); artists is the QuadMesh (or PolyCollection, for TH2Poly) """
+    __slots__ = ("axes", "volume", "shape", "areas", "geometry", "artists")
+    def __init__(self, histo, axes=None, volume=False, geometryKey=None, **kwargs):
+        if kwargs.get("sparse", False) or draw_th2._isTHnSparse(histo) or draw_th2._isTProfile2D(histo):
+            raise ValueError("Only TH2 (drawn with all bins) and TH2Poly can be updated in place")
+        self.axes = axes
+        self.volume = volume
+        self.geometry = None
+        if draw_th2._isTH2Poly(histo):
+            self.geometry = draw_th2.polyGeometry(histo, geometryKey=geometryKey)
+        else:
+            xEdges, yEdges = draw_th2._axisEdges(histo.GetXaxis()), draw_th2._axisEdges(histo.GetYaxis())
+            self.shape = (len(yEdges)+1, len(xEdges)+1) ## with underflow and overflow
+            self.areas = np.outer(np.diff(yEdges), np.diff(xEdges))
+        self.artists = [ draw_th2.pcolor(histo, axes=axes, volume=volume, geometryKey=geometryKey, **kwargs) ]
+    def _values(self, histo):
+        if self.geometry is not None:
+            values = draw_th2.polyContents(histo)
+            return ( values/self.geometry.areas if self.volume else values )[self.geometry.binIdx]
+        z = cellArrays(histo)[0].reshape(self.shape)[1:-1,1:-1]
+        return z/self.areas if self.volume else z
+    def update(self, histo, autoscale=False):
+        """ Set the colors from histo (with the same binning); the color scale is adjusted if autoscale is set """
+        mesh = self.artists[0]
+        mesh.set_array(self._values(histo).ravel())
+        if autoscale:
+            mesh.autoscale()
+
+def pcolor(histo, axes=None, volume=False, geometryKey=None, **kwargs):
+    """
+    Draw a TH2 (or TH2Poly) with draw_th2.pcolor (as rpcolor), and return a LivePcolor handle that can update the colors in place
+
+    All other keyword arguments are passed on to draw_th2.pcolor, but sparse drawing is not supported
+    """
+    return LivePcolor(histo, axes=axes, volume=volume, geometryKey=geometryKey, **kwargs)
+
+class BlitManager(object):
+    """
+    Redraw only the artists of some handles (or other artists), on top of a saved background
+
+    The artists are set to animated, such that a full draw of the canvas only draws the rest
+    (the background, which is then saved); update restores that, draws the artists, and blits.
+    """
+    def __init__(self, canvas, handles=tuple()):
+        self.canvas = canvas
+        self.artists = []
+        self._background = None
+        for handle in handles:
+            self.add(handle)
+        self._cid = canvas.mpl_connect("draw_event", self._onDraw)
+    def add(self, handle):
+        """ Add a handle (or an artist) """
+        for art in getattr(handle, "artists", [ handle ]):
+            art.set_animated(True)
+            self.artists.append(art)
+    def _onDraw(self, event):
+        """ after a full draw (e.g. resize): save the new background, and draw the artists on top """
+        self._background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._drawArtists()
+    def _drawArtists(self):
+        fig = self.canvas.figure
+        for art in self.artists:
+            fig.draw_artist(art)
+    def update(self, rescale=False):
+        """ Redraw the artists; with rescale, the view limits are adjusted to the data (which needs a full draw) """
+        if rescale:
+            for ax in set(art.axes for art in self.artists if art.axes is not None):
+                ax.relim()
+                ax.autoscale_view()
+            self._background = None
+        if self._background is None:
+            self.canvas.draw() ## calls _onDraw
+        else:
+            self.canvas.restore_region(self._background)
+            self._drawArtists()
+            self.canvas.blit(self.canvas.figure.bbox)
+        self.canvas.flush_events()
+    def disconnect(self):
+        """ Stop managing the artists (they are drawn normally again, e.g. when saving the figure) """
+        self.canvas.mpl_disconnect(self._cid)
+        for art in self.artists:
+            art.set_animated(False)
+        self.artists = []
+        self._background = None
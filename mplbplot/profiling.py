@@ -0,0 +1,215 @@
+"""
+Opt-in instrumentation of the mplbplot draw methods
+
+When recording is switched on, every call to one of the r* methods
+(from mplbplot.decorateAxes, mplbplot.decoratePyplot, or mplbplot.pyplot)
+is timed, and the number of bin (or point) proxies, the number of calls
+to the ROOT accessors through them (C++ crossings, and the time spent
+in those), and the number of artists added to the axes are counted.
+For the methods that read the histogram buffers (see decorators.cellArrays)
+the calls to get the buffers are counted as crossings, and the number of
+elements read from them as bins.
+
+Usage:
+>>> import mplbplot.profiling
+>>> with mplbplot.profiling.recording() as rec:
+>>>     ax.rhist(h1, histtype="step")
+>>>     ax.rerrorbar(h2, fmt="ko")
+>>>     with rec.stage("render"):
+>>>         fig.savefig("plot.pdf")
+>>> print rec.report()
+>>> rec.toJSON("timings.json")
+
+or, to switch it on globally:
+>>> rec = mplbplot.profiling.enable()
+>>> ...
+>>> mplbplot.profiling.disable()
+
+The time spent in the ROOT accessors is measured around each call,
+so with recording switched on the draw methods are somewhat slower.
+When it is off (the default), the overhead is a single check per accessor call.
+"""
+__all__ = ("CallRecord", "Recorder", "recording", "enable", "disable", "activeRecorder", "instrumented")
+
+import functools
+import json
+from contextlib import contextmanager
+from collections import OrderedDict as odict
+from timeit import default_timer as _clock
+
+from . import decorators
+
+class CallCounters(object):
+    """ Counters updated by the bin and point proxies, and when reading buffers (see mplbplot.decorators), during a call """
+    __slots__ = ("crossings", "bins", "accessorTime")
+    def __init__(self):
+        self.crossings = 0
+        self.bins = 0
+        self.accessorTime = 0.
+    def call(self, nCalls, accessor, *args):
+        """ Call accessor(*args), counting nCalls C++ calls and timing it """
+        self.crossings += nCalls
+        start = _clock()
+        try:
+            return accessor(*args)
+        finally:
+            self.accessorTime += _clock()-start
+
+class CallRecord(object):
+    """ Timing and counters for one draw method call """
+    __slots__ = ("method", "objType", "objName", "wallTime", "accessorTime", "crossings", "bins", "artists")
+    def __init__(self, method, objType, objName, wallTime, accessorTime, crossings, bins, artists):
+        self.method = method
+        self.objType = objType
+        self.objName = objName
+        self.wallTime = wallTime
+        self.accessorTime = accessorTime
+        self.crossings = crossings
+        self.bins = bins
+        self.artists = artists
+    def __repr__(self):
+        return "CallRecord({0})".format(", ".join("{0}={1!r}".format(k, getattr(self, k)) for k in CallRecord.__slots__))
+    def toDict(self):
+        return odict((k, getattr(self, k)) for k in CallRecord.__slots__)
+
+def _objDescription(obj):
+    """ type and name of the object passed to a draw method (comma-separated for stacks) """
+    if isinstance(obj, (list, tuple)) and len(obj) > 0 and all(hasattr(o, "GetName") for o in obj):
+        return ",".join(sorted(set(type(o).__name__ for o in obj))), ",".join(o.GetName() for o in obj)
+    return type(obj).__name__, ( obj.GetName() if hasattr(obj, "GetName") else None )
+
+def _nChildren(axes):
+    return len(axes.get_children()) if axes is not None else 0
+
+class Recorder(object):
+    """
+    Collects the timings of the draw method calls (and of named stages)
+    """
+    def __init__(self):
+        self.calls = []
+        self.stages = []
+
+    def clear(self):
+        self.calls = []
+        self.stages = []
+
+    def record(self, method, fun, axes, obj, args, kwargs):
+        """ Call fun(*args, **kwargs), and add a CallRecord for it """
+        if decorators._counters is not None: ## nested call, counted by the outer one
+            return fun(*args, **kwargs)
+        counters = CallCounters()
+        nArtistsBefore = _nChildren(axes)
+        decorators._counters = counters
+        start = _clock()
+        try:
+            return fun(*args, **kwargs)
+        finally:
+            wallTime = _clock()-start
+            decorators._counters = None
+            objType, objName = _objDescription(obj)
+            self.calls.append(CallRecord(method, objType, objName, wallTime,
+                counters.accessorTime, counters.crossings, counters.bins,
+                _nChildren(axes)-nArtistsBefore))
+
+    @contextmanager
+    def stage(self, name):
+        """ Time a block of code (e.g. rendering with savefig) under the given name """
+        start = _clock()
+        try:
+            yield
+        finally:
+            self.stages.append((name, _clock()-start))
+
+    def summary(self):
+        """ Aggregated counters and timings per method (and total time per stage) """
+        perMethod = odict()
+        for rec in self.calls:
+            agg = perMethod.setdefault(rec.method, odict((("calls", 0), ("wallTime", 0.), ("maxWallTime", 0.), ("accessorTime", 0.), ("crossings", 0), ("bins", 0), ("artists", 0))))
+            agg["calls"] += 1
+            agg["wallTime"] += rec.wallTime
+            agg["maxWallTime"] = max(agg["maxWallTime"], rec.wallTime)
+            for ky in ("accessorTime", "crossings", "bins", "artists"):
+                agg[ky] += getattr(rec, ky)
+        perStage = odict()
+        for name, wallTime in self.stages:
+            agg = perStage.setdefault(name, odict((("calls", 0), ("wallTime", 0.))))
+            agg["calls"] += 1
+            agg["wallTime"] += wallTime
+        return odict((("methods", perMethod), ("stages", perStage)))
+
+    def report(self):
+        """ Human-readable table of the aggregated counters (times in ms) """
+        summ = self.summary()
+        lines = [ "{0:<12} {1:>6} {2:>11} {3:>10} {4:>11} {5:>10} {6:>10} {7:>8}".format("method", "calls", "total [ms]", "max [ms]", "ROOT [ms]", "crossings", "bins", "artists") ]
+        for method, agg in summ["methods"].iteritems():
+            lines.append("{0:<12} {1:>6d} {2:>11.1f} {3:>10.1f} {4:>11.1f} {5:>10d} {6:>10d} {7:>8d}".format(method,
+                agg["calls"], 1.e3*agg["wallTime"], 1.e3*agg["maxWallTime"], 1.e3*agg["accessorTime"],
+                agg["crossings"], agg["bins"], agg["artists"]))
+        for name, agg in summ["stages"].iteritems():
+            lines.append("{0:<12} {1:>6d} {2:>11.1f}".format(name, agg["calls"], 1.e3*agg["wallTime"]))
+        return "\n".join(lines)
+
+    def toJSON(self, path=None, indent=2):
+        """ Export all calls, stages and the summary as JSON (to path, if given, otherwise returned as a string) """
+        content = odict((
+              ("calls", [ rec.toDict() for rec in self.calls ])
+            , ("stages", [ odict((("name", name), ("wallTime", wallTime))) for name, wallTime in self.stages ])
+            , ("summary", self.summary())
+            ))
+        if path is None:
+            return json.dumps(content, indent=indent)
+        with open(path, "w") as jsonFile:
+            json.dump(content, jsonFile, indent=indent)
+
+## active recorder (None if switched off)
+_recorder = None
+
+def activeRecorder():
+    """ the recorder that is currently active (None if recording is switched off) """
+    return _recorder
+
+def enable(recorder=None):
+    """ Switch on recording (globally), with the given or a new recorder, which is returned """
+    global _recorder
+    _recorder = recorder if recorder is not None else Recorder()
+    return _recorder
+
+def disable():
+    """ Switch off recording, and return the recorder that was active """
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+@contextmanager
+def recording(recorder=None):
+    """ Record the draw method calls inside the with-block (with the given or a new recorder) """
+    global _recorder
+    previous = _recorder
+    _recorder = recorder if recorder is not None else Recorder()
+    try:
+        yield _recorder
+    finally:
+        _recorder = previous
+
+def instrumented(method, axesFirst=True):
+    """
+    Decorator for the r* entry points: record calls when recording is switched on
+
+    method is the name under which the calls are recorded. If axesFirst is True, the
+    wrapped function takes the axes and the ROOT object as first two arguments (as the
+    methods added to matplotlib.axes.Axes), otherwise only the object (as the pyplot ones,
+    which draw on the current axes).
+    """
+    def decorate(fun):
+        @functools.wraps(fun)
+        def wrapper(*args, **kwargs):
+            if _recorder is None:
+                return fun(*args, **kwargs)
+            if axesFirst:
+                axes, obj = args[0], args[1]
+            else:
+                import matplotlib.pyplot as plt
+                axes, obj = plt.gca(), args[0]
+            return _recorder.record(method, fun, axes, obj, args, kwargs)
+        return wrapper
+    return decorate
@@ -24,18 +24,26 @@ Available methods:
    - text (TEXT option; full documentation: __text__ methods of TH1 and TH2)
   For two-dimensional histograms:
    - contour, contourf (CONT), and color (COLZ)
+All methods take a rasterize keyword argument, to rasterize what they draw in vector output (see mplbplot.rasterize)
 """
 __all__ = ("hist", "plot", "errorbar", "text", "contour", "contourf", "pcolor")
 
 import matplotlib.pyplot as plt
 from cppyy import gbl
 
-import .draw_th1
-import .draw_th2
-import .draw_tgraph
+from . import draw_th1
+from . import draw_th2
+from . import draw_tgraph
 for imod in (draw_th1, draw_tgraph, draw_th2):
     imod._addDecorations()
 
+from .profiling import instrumented
+from .rasterize import rasterizable
+from .rendercache import fingerprinted
+
+@instrumented("rplot", axesFirst=False)
+@fingerprinted("rplot", axesFirst=False)
+@rasterizable(axesFirst=False)
 def plot(first, *args, **kwargs):
     """
     Wrapper around matplotlib.pyplot.plot that also takes TH1 and TGraph
@@ -48,6 +56,9 @@ def plot(first, *args, **kwargs):
     else:
         return plt.plot(first, *args, **args)
 
+@instrumented("rerrorbar", axesFirst=False)
+@fingerprinted("rerrorbar", axesFirst=False)
+@rasterizable(axesFirst=False)
 def errorbar(first, *args, **kwargs):
     """
     Wrapper around matplotlib.pyplot.errorbar that also takes TH1 and TGraph
@@ -60,6 +71,9 @@ def errorbar(first, *args, **kwargs):
     else:
         return plt.errorbar(first, *args, **args)
 
+@instrumented("rtext", axesFirst=False)
+@fingerprinted("rtext", axesFirst=False)
+@rasterizable(axesFirst=False)
 def text(first, *args, **kwargs):
     """
     Wrapper around matplotlib.pyplot.text that also takes TH1, TH2, and TGraph
@@ -72,6 +86,9 @@ def text(first, *args, **kwargs):
     else:
         return plt.text(first, *args, **args)
 
+@instrumented("rhist", axesFirst=False)
+@fingerprinted("rhist", axesFirst=False)
+@rasterizable(axesFirst=False)
 def hist(first, *args, **kwargs):
     """
     Wrapper around matplotlib.pyplot.hist that also takes TH1
@@ -84,6 +101,9 @@ def hist(first, *args, **kwargs):
     else:
         return plt.hist(first, *args, **args)
 
+@instrumented("rcontour", axesFirst=False)
+@fingerprinted("rcontour", axesFirst=False)
+@rasterizable(axesFirst=False)
 def contour(first, *args, **kwargs):
     """
     Wrapper around matplotlib.pyplot.contour that also takes TH2
@@ -96,6 +116,9 @@ def contour(first, *args, **kwargs):
     else:
         return plt.contour(first, *args, **args)
 
+@instrumented("rcontourf", axesFirst=False)
+@fingerprinted("rcontourf", axesFirst=False)
+@rasterizable(axesFirst=False)
 def contourf(first, *args, **kwargs):
     """
     Wrapper around matplotlib.pyplot.contourf that also takes TH2
@@ -108,6 +131,9 @@ def contourf(first, *args, **kwargs):
     else:
         return plt.contourf(first, *args, **args)
 
+@instrumented("rpcolor", axesFirst=False)
+@fingerprinted("rpcolor", axesFirst=False)
+@rasterizable(axesFirst=False)
 def pcolor(first, *args, **kwargs):
     """
     Wrapper around matplotlib.pyplot.pcolor that also takes TH2
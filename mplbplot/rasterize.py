@@ -0,0 +1,176 @@
+"""
+Rasterize heavy artists in vector output (pdf, svg, eps), and keep everything else as vectors
+
+A pcolormesh with 10^6 cells, or 10^5 error boxes, make vector files that are
+very large and slow to write and to open. RasterizationPolicy decides, when saving,
+which artists are embedded as an image instead: those with more than threshold
+elements (mesh cells, vertices of the paths of collections and patches, and points of lines),
+rendered at the dpi of the policy, which should also be passed to savefig:
+
+>>> policy = RasterizationPolicy(threshold=20000, dpi=300)
+>>> with policy.applied(fig):
+>>>     fig.savefig("map.pdf", dpi=policy.dpi)
+
+Axes, ticks, labels and text are never rasterized. Patches (e.g. from errorbar with kind="box")
+are counted together per axes and zorder, and rasterized in one image if they are heavy together.
+The r* methods (with mplbplot.decorateAxes or decoratePyplot) also take a rasterize keyword argument,
+to make the choice for the artists they make (see rasterizable). The flags set by the policy are
+reset when leaving the with-block, so the figure can be drawn again (or saved in a raster format) as before.
+"""
+__all__ = ("RasterizationPolicy", "elementCount", "rasterizable")
+
+import functools
+import weakref
+from contextlib import contextmanager
+
+import numpy as np
+
+import matplotlib.artist
+import matplotlib.collections
+import matplotlib.lines
+import matplotlib.patches
+
+## choice made with the rasterize keyword argument of the r* methods, for the patches (which are rasterized by the policy, as a group) and for keeping artists as vectors
+_choices = weakref.WeakKeyDictionary()
+
+def elementCount(artist):
+    """ Number of elements (mesh cells, path vertices or points) that an artist draws, as a measure of its size in vector output """
+    if isinstance(artist, matplotlib.collections.QuadMesh):
+        arr = artist.get_array()
+        return 4*( np.size(arr) if arr is not None else artist._meshWidth*artist._meshHeight )
+    elif isinstance(artist, matplotlib.collections.Collection):
+        nVertices = sum(len(path.vertices) for path in artist.get_paths())
+        nOffsets = len(artist.get_offsets())
+        return nVertices*nOffsets if len(artist.get_paths()) == 1 and nOffsets > 1 else nVertices
+    elif isinstance(artist, matplotlib.lines.Line2D):
+        nPoints = len(artist.get_xydata())
+        marker = artist._marker.get_path() if artist.get_marker() not in (None, "None", "none", " ", "") else None
+        return nPoints*( 1 + ( len(marker.vertices) if marker is not None else 0 ) )
+    elif isinstance(artist, matplotlib.patches.Patch):
+        return len(artist.get_path().vertices)
+    return 0
+
+def _dataArtists(axes):
+    """ artists on the axes that can be rasterized: collections, lines and patches (not the axes background) """
+    return axes.collections + axes.lines + axes.patches
+
+class _RasterGroup(matplotlib.artist.Artist):
+    """ Draws a list of artists in one rasterized block (instead of one full-figure image per artist) """
+    def __init__(self, artists, zorder):
+        super(_RasterGroup, self).__init__()
+        self._artists = artists
+        self.set_zorder(zorder)
+        self.set_rasterized(True)
+    @matplotlib.artist.allow_rasterization
+    def draw(self, renderer):
+        for artist in self._artists:
+            artist.draw(renderer)
+
+class RasterizationPolicy(object):
+    """
+    Rasterize artists with more than threshold elements (see elementCount) in vector output, at dpi
+
+    The vector formats that the policy is applied to are listed in vectorFormats
+    (the others are rendered with Agg anyway).
+    """
+    vectorFormats = frozenset(("pdf", "svg", "svgz", "eps", "ps"))
+
+    def __init__(self, threshold=20000, dpi=300):
+        self.threshold = threshold
+        self.dpi = dpi
+
+    def __repr__(self):
+        return "RasterizationPolicy(threshold={0!r}, dpi={1!r})".format(self.threshold, self.dpi)
+
+    def appliesTo(self, ext):
+        """ True if the policy should be used when saving in the format with extension ext """
+        return ext.lower() in RasterizationPolicy.vectorFormats
+
+    def heavyArtists(self, fig):
+        """
+        Artists of fig to rasterize, as (artists, patchGroups): the non-patch artists
+        that are heavier than the threshold, and lists of patches (per axes and zorder) that are heavy together
+        """
+        artists, patchGroups = [], []
+        for ax in fig.axes:
+            patchesPerZ = dict()
+            for artist in _dataArtists(ax):
+                if artist.get_rasterized() or not artist.get_visible():
+                    continue
+                choice = _choices.get(artist)
+                if choice is False:
+                    continue
+                if isinstance(artist, matplotlib.patches.Patch):
+                    patchesPerZ.setdefault((artist.zorder, choice), []).append(artist)
+                elif choice is True or elementCount(artist) > self.threshold:
+                    artists.append(artist)
+            for (zorder, choice), patches in patchesPerZ.iteritems():
+                if choice is True or sum(elementCount(p) for p in patches) > self.threshold:
+                    patchGroups.append(patches)
+        return artists, patchGroups
+
+    @contextmanager
+    def applied(self, fig):
+        """ Rasterize the heavy artists of fig inside the with-block (with savefig(..., dpi=self.dpi)) """
+        artists, patchGroups = self.heavyArtists(fig)
+        savedPatches = dict()
+        proxies = []
+        try:
+            for artist in artists:
+                artist.set_rasterized(True)
+            for patches in patchGroups:
+                ax = patches[0].axes
+                if ax not in savedPatches:
+                    savedPatches[ax] = list(ax.patches)
+                inGroup = set(id(p) for p in patches)
+                ax.patches[:] = [ p for p in ax.patches if id(p) not in inGroup ]
+                proxy = _RasterGroup(patches, patches[0].zorder)
+                proxy.set_figure(fig)
+                ax.artists.append(proxy)
+                proxies.append((ax, proxy))
+            yield artists, patchGroups
+        finally:
+            for artist in artists:
+                artist.set_rasterized(False)
+            for ax, proxy in proxies:
+                ax.artists.remove(proxy)
+            for ax, patches in savedPatches.iteritems():
+                ax.patches[:] = patches
+
+def _artistSet(axes):
+    return set(id(a) for a in _dataArtists(axes))
+
+def rasterizable(axesFirst=True):
+    """
+    Decorator for the r* entry points: add a rasterize keyword argument
+
+    rasterize=True rasterizes the collections and lines that are made by the call,
+    and makes the policy (see RasterizationPolicy) rasterize the patches as one group;
+    rasterize=False keeps them as vectors, also if they are heavy; with a number,
+    they are rasterized (as with True) if together they have more elements (see elementCount).
+    By default (None) the choice is left to the policy.
+    The arguments are as for profiling.instrumented.
+    """
+    def decorate(fun):
+        @functools.wraps(fun)
+        def wrapper(*args, **kwargs):
+            rasterize = kwargs.pop("rasterize", None)
+            if rasterize is None:
+                return fun(*args, **kwargs)
+            if axesFirst:
+                axes = args[0]
+            else:
+                import matplotlib.pyplot as plt
+                axes = plt.gca()
+            before = _artistSet(axes)
+            result = fun(*args, **kwargs)
+            new = [ a for a in _dataArtists(axes) if id(a) not in before ]
+            if not isinstance(rasterize, bool):
+                rasterize = ( sum(elementCount(a) for a in new) > rasterize )
+            for artist in new:
+                _choices[artist] = rasterize
+                if rasterize and not isinstance(artist, matplotlib.patches.Patch):
+                    artist.set_rasterized(True)
+            return result
+        return wrapper
+    return decorate
@@ -0,0 +1,422 @@
+"""
+On-disk cache of rendered figures, keyed on a fingerprint of what is drawn
+
+The fingerprint of a figure (see figureFingerprint) combines the rcParams, the
+savefig options, the axes (position, limits, scales, labels, tick locators and
+formatters), and the artists. For the artists made by the r* methods
+(with mplbplot.decorateAxes or decoratePyplot) while fingerprinting is switched on,
+the fingerprint of the call (the arrays of the object that is drawn, e.g. the
+contents, sumw2 and bin edges of a histogram, and the arguments) replaces that
+of their data, which is much cheaper than going over the paths of all artists
+(e.g. one patch per bin). Their data is assumed not to be modified afterwards,
+but their style and transform are taken into account, as for all other artists.
+If something cannot be fingerprinted (e.g. an unknown object as argument),
+the figure is rendered as without cache.
+
+>>> import mplbplot.rendercache
+>>> cache = mplbplot.rendercache.RenderCache("~/.cache/mplbplot-renders")
+>>> with mplbplot.rendercache.fingerprinting():
+>>>     ax.rhist(h, histtype="step")
+>>>     ax.rerrorbar(hData, fmt="ko")
+>>> cache.savefig(fig, "plot.png") ## same bytes as last time if nothing changed
+>>> IPython.display.Image(data=cache.render(fig, format="png"))
+"""
+__all__ = ("RenderCache", "Uncacheable", "figureFingerprint", "fingerprinting", "enable", "disable", "fingerprinted")
+
+import functools
+import hashlib
+import os
+import os.path
+import tempfile
+import types
+import weakref
+from contextlib import contextmanager
+from io import BytesIO
+
+import numpy as np
+
+import matplotlib
+import matplotlib.artist
+import matplotlib.axes
+import matplotlib.axis
+import matplotlib.collections
+import matplotlib.colors
+import matplotlib.image
+import matplotlib.legend
+import matplotlib.lines
+import matplotlib.patches
+import matplotlib.spines
+import matplotlib.text
+import matplotlib.transforms
+
+from . import __version__
+
+class Uncacheable(Exception):
+    """ Raised when something that determines the rendered figure cannot be fingerprinted """
+    pass
+
+## fingerprint of the r* call that made an artist (only while fingerprinting is switched on)
+_callDigests = weakref.WeakKeyDictionary()
+_enabled = False
+
+def enable():
+    """ Switch on fingerprinting of the r* calls (globally) """
+    global _enabled
+    _enabled = True
+
+def disable():
+    """ Switch off fingerprinting of the r* calls """
+    global _enabled
+    _enabled = False
+
+@contextmanager
+def fingerprinting(enabled=True):
+    """ Fingerprint the r* calls inside the with-block (unless enabled is False) """
+    global _enabled
+    previous = _enabled
+    _enabled = enabled or previous
+    try:
+        yield
+    finally:
+        _enabled = previous
+
+_maxDepth = 8
+
+## points to fingerprint a transform by (three that are not on a line determine an affine transform)
+_transformProbes = np.array([ (0., 0.), (1., 0.), (0., 1.), (.37, 2.9), (13., 170.), (-2.5, 4100.) ])
+
+def _updateTransform(hasher, trans, memo=None):
+    """ add the fingerprint of a transform: where it maps a fixed set of points
+    (its repr is not usable: for most transforms it only contains the address)
+
+    memo is a dictionary to reuse those of transforms shared by many artists (for one fingerprint)
+    """
+    mapped = memo.get(id(trans), (None, None))[1] if memo is not None else None
+    if mapped is None:
+        with np.errstate(all="ignore"):
+            mapped = trans.transform(_transformProbes)
+        if memo is not None:
+            memo[id(trans)] = (trans, mapped) ## keeps trans alive, such that the id is not reused
+    _updateArray(hasher, mapped)
+
+def _updateArray(hasher, arr):
+    arr = np.asanyarray(arr)
+    hasher.update("{0}{1!r}".format(arr.dtype.str, arr.shape))
+    if isinstance(arr, np.ma.MaskedArray):
+        hasher.update(np.ascontiguousarray(np.ma.getmaskarray(arr)).data)
+        arr = arr.data
+    if arr.dtype == object:
+        for elm in arr.flat:
+            _update(hasher, elm)
+    else:
+        hasher.update(np.ascontiguousarray(arr).data)
+
+def _updateCode(hasher, code, depth):
+    hasher.update(code.co_code)
+    _update(hasher, code.co_names, depth+1)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _updateCode(hasher, const, depth+1)
+        else:
+            _update(hasher, const, depth+1)
+
+def _axisEdges(axis):
+    from .draw_th2 import _axisEdges as edges
+    return edges(axis)
+
+def _updateData(hasher, obj, depth):
+    """ fingerprint of the data of a ROOT (or mplbplot array) object that is drawn; False if it is not one that is known """
+    from .decorators import cellArrays
+    if hasattr(obj, "GetNcells"):
+        from .draw_th2 import _isTH2Poly, polyContents, polyGeometry
+        hasher.update(type(obj).__name__)
+        if _isTH2Poly(obj):
+            _updateArray(hasher, polyContents(obj))
+            for verts in polyGeometry(obj).verts:
+                _updateArray(hasher, verts)
+            return True
+        for arr in cellArrays(obj, copy=False):
+            _updateArray(hasher, arr)
+        dim = obj.GetDimension() if hasattr(obj, "GetDimension") else 1
+        for getAxis in ("GetXaxis", "GetYaxis", "GetZaxis")[:dim]:
+            _updateArray(hasher, _axisEdges(getattr(obj, getAxis)()))
+        if hasattr(obj, "GetBinEntries"): ## TProfile
+            from .draw_tprofile import _binEntries
+            _updateArray(hasher, _binEntries(obj, obj.GetNcells()))
+            hasher.update(obj.GetErrorOption())
+        return True
+    elif hasattr(obj, "GetPassedHistogram"): ## TEfficiency
+        _updateData(hasher, obj.GetPassedHistogram(), depth+1)
+        _updateData(hasher, obj.GetTotalHistogram(), depth+1)
+        _update(hasher, (obj.GetStatisticOption(), obj.GetConfidenceLevel(), obj.GetBetaAlpha(), obj.GetBetaBeta(),
+            obj.UsesWeights(), obj.UsesPosteriorMode(), obj.UsesShortestInterval()), depth+1)
+        return True
+    elif hasattr(obj, "GetN") and hasattr(obj, "GetX"): ## TGraph
+        from .decorators import points
+        hasher.update(type(obj).__name__)
+        _updateArray(hasher, np.array([ (p.x, p.y, p.xLowError, p.xHighError, p.yLowError, p.yHighError) for p in points(obj) ]))
+        return True
+    return False
+
+def _update(hasher, value, depth=0):
+    """ add the fingerprint of value (numbers, strings, containers, arrays, functions, ROOT objects, and objects with those as attributes) """
+    if depth > _maxDepth:
+        raise Uncacheable("Too deeply nested value")
+    if value is None or isinstance(value, (bool, int, long, float, complex, str, unicode)):
+        hasher.update(repr(value))
+    elif isinstance(value, np.generic):
+        hasher.update(repr(value.item()))
+    elif isinstance(value, np.ndarray):
+        _updateArray(hasher, value)
+    elif isinstance(value, (list, tuple)):
+        hasher.update("{0}{1:d}".format(type(value).__name__, len(value)))
+        for elm in value:
+            _update(hasher, elm, depth+1)
+    elif isinstance(value, dict):
+        hasher.update("dict{0:d}".format(len(value)))
+        for ky, val in sorted(value.iteritems()):
+            _update(hasher, ky, depth+1)
+            _update(hasher, val, depth+1)
+    elif isinstance(value, (set, frozenset)):
+        _update(hasher, sorted(value), depth+1)
+    elif isinstance(value, types.FunctionType):
+        _updateCode(hasher, value.__code__, depth)
+        _update(hasher, value.__defaults__, depth+1)
+        _update(hasher, tuple(cell.cell_contents for cell in value.__closure__) if value.__closure__ else None, depth+1)
+    elif isinstance(value, types.BuiltinFunctionType):
+        hasher.update(value.__name__)
+        _update(hasher, getattr(value, "__self__", None), depth+1)
+    elif isinstance(value, types.MethodType):
+        _update(hasher, value.__func__, depth+1)
+        _update(hasher, value.__self__, depth+1)
+    elif isinstance(value, matplotlib.transforms.Transform):
+        _updateTransform(hasher, value)
+    elif isinstance(value, matplotlib.transforms.TransformNode):
+        hasher.update(repr(value))
+    elif isinstance(value, matplotlib.artist.Artist):
+        _updateArtist(hasher, value)
+    elif _updateData(hasher, value, depth):
+        pass
+    else:
+        attrs = getattr(value, "__dict__", None)
+        if attrs is None and hasattr(value, "__slots__"):
+            attrs = dict((nm, getattr(value, nm)) for nm in value.__slots__ if hasattr(value, nm))
+        if attrs is None:
+            raise Uncacheable("Cannot fingerprint {0!r}".format(value))
+        hasher.update(".".join((type(value).__module__, type(value).__name__)))
+        _update(hasher, dict((ky, val) for ky, val in attrs.iteritems() if ky != "callbacksSM"), depth+1)
+
+def _updateArtist(hasher, artist, withData=True, withLayout=True, transforms=None):
+    """ add the fingerprint of an artist: visibility, zorder etc., its style (colors, line widths, text...),
+    its data (paths and points) if withData is True (not for those made by a call with a fingerprint),
+    and its transform and position if withLayout is True (not for the artists whose layout is only set when drawing;
+    transforms is passed as memo to _updateTransform)
+
+    Only the artist classes below are known; for any other (visible) artist Uncacheable is raised.
+    """
+    _update(hasher, (type(artist).__name__, artist.get_visible(), artist.get_zorder(), artist.get_alpha(),
+        artist.get_rasterized(), artist.get_label(), artist.get_clip_on()))
+    if not artist.get_visible():
+        return
+    if withLayout: ## for patches without the patch transform, which is part of their data
+        _updateTransform(hasher, ( artist.get_data_transform() if isinstance(artist, matplotlib.patches.Patch) else artist.get_transform() ), memo=transforms)
+    if isinstance(artist, matplotlib.text.Text):
+        _update(hasher, (artist.get_text(), artist.get_size(), artist.get_color(), artist.get_ha(), artist.get_va(),
+            artist.get_rotation(), str(artist.get_fontproperties())))
+        if withLayout:
+            _update(hasher, artist.get_position())
+            if isinstance(artist, matplotlib.text.Annotation): ## the position above is that of the text
+                _update(hasher, (artist.xy, artist.xycoords, artist.anncoords, artist.arrowprops))
+    elif isinstance(artist, matplotlib.lines.Line2D):
+        _update(hasher, (artist.get_color(), artist.get_linewidth(), artist.get_linestyle(), artist.get_drawstyle(),
+            artist.get_marker(), artist.get_markersize(), artist.get_markerfacecolor(), artist.get_markeredgecolor()))
+        if withData:
+            _update(hasher, artist.get_xydata())
+    elif isinstance(artist, matplotlib.patches.Patch):
+        _update(hasher, (artist.get_facecolor(), artist.get_edgecolor(), artist.get_linewidth(), artist.get_linestyle(),
+            artist.get_fill(), artist.get_hatch()))
+        if isinstance(artist, matplotlib.spines.Spine):
+            _update(hasher, artist._position)
+        elif withData:
+            path = artist.get_path()
+            _update(hasher, (path.vertices, path.codes, artist.get_patch_transform().get_matrix()))
+    elif isinstance(artist, matplotlib.collections.Collection):
+        _update(hasher, (artist.get_linewidth(), artist.get_linestyle(), artist.get_hatch(), artist.get_array()))
+        if artist.get_array() is not None: ## the colors are set from the array when drawing
+            _update(hasher, (artist._original_facecolor, artist._original_edgecolor, artist.get_cmap().name, artist.get_clim()))
+        else:
+            _update(hasher, (artist.get_facecolor(), artist.get_edgecolor()))
+        if withData:
+            if isinstance(artist, matplotlib.collections.QuadMesh):
+                _update(hasher, artist._coordinates)
+            else:
+                _update(hasher, [ (path.vertices, path.codes) for path in artist.get_paths() ])
+            _update(hasher, artist.get_offsets())
+    elif isinstance(artist, matplotlib.image.AxesImage):
+        _update(hasher, (artist.get_array(), artist.get_extent(), artist.get_cmap().name, artist.get_clim(), artist.get_interpolation()))
+    elif isinstance(artist, matplotlib.legend.Legend):
+        _update(hasher, (artist._loc, artist._ncol, artist.get_frame_on(), artist.get_bbox_to_anchor().bounds))
+        for child in [ artist.get_title() ]+list(artist.get_texts())+list(artist.legendHandles):
+            _updateArtist(hasher, child, withData=False, withLayout=False)
+        return
+    else:
+        raise Uncacheable("Cannot fingerprint artists of type {0}".format(type(artist).__name__))
+    for child in artist.get_children():
+        _updateArtist(hasher, child, withData=withData, withLayout=withLayout, transforms=transforms)
+
+## attributes of tick locators and formatters that are set when drawing
+_tickerDrawState = frozenset(("axis", "locs", "format", "offset", "orderOfMagnitude", "_sublabels"))
+
+def _updateAxis(hasher, axis):
+    _update(hasher, (type(axis).__name__, axis.get_visible(), axis.get_scale(), axis.get_label_text(), axis.get_label_position(), axis.get_ticks_position(),
+        axis._major_tick_kw, axis._minor_tick_kw))
+    for ticker in (axis.get_major_locator(), axis.get_major_formatter(), axis.get_minor_locator(), axis.get_minor_formatter()):
+        hasher.update(type(ticker).__name__)
+        _update(hasher, dict((ky, val) for ky, val in vars(ticker).iteritems() if ky not in _tickerDrawState), 1)
+    _updateArtist(hasher, axis.label, withData=False, withLayout=False)
+
+def _updateAxes(hasher, ax):
+    _update(hasher, (type(ax).__name__, ax.get_position().bounds, ax.get_xlim(), ax.get_ylim(), ax.axison, ax.get_facecolor(),
+        ax.get_aspect(), ax.get_title("left"), ax.get_title("center"), ax.get_title("right")))
+    for axis in (ax.xaxis, ax.yaxis):
+        _updateAxis(hasher, axis)
+    seenCalls = set()
+    transforms = dict()
+    for child in ax.get_children():
+        if isinstance(child, matplotlib.axis.Axis):
+            continue
+        callDigest = _callDigests.get(child)
+        if callDigest is not None:
+            if callDigest not in seenCalls:
+                seenCalls.add(callDigest)
+                hasher.update(callDigest)
+            _updateArtist(hasher, child, withData=False, transforms=transforms) ## restyling after the call is taken into account
+        else:
+            _updateArtist(hasher, child, transforms=transforms)
+
+def figureFingerprint(fig, **kwargs):
+    """ Fingerprint (hex digest) of fig as rendered with savefig(..., **kwargs); raises Uncacheable if it cannot be made """
+    hasher = hashlib.sha1()
+    _update(hasher, (RenderCache.VERSION, __version__, matplotlib.__version__))
+    _update(hasher, sorted((ky, repr(val)) for ky, val in matplotlib.rcParams.iteritems()))
+    _update(hasher, kwargs)
+    _update(hasher, (fig.get_size_inches(), fig.get_dpi(), fig.get_facecolor(), fig.get_edgecolor()))
+    for ax in fig.axes:
+        _updateAxes(hasher, ax)
+    for child in fig.get_children():
+        if not isinstance(child, matplotlib.axes.Axes) and child is not fig.patch:
+            _updateArtist(hasher, child)
+    return hasher.hexdigest()
+
+def _drawnArtists(axes):
+    return axes.collections + axes.lines + axes.patches + axes.texts + axes.artists + axes.images
+
+def fingerprinted(method, axesFirst=True):
+    """
+    Decorator for the r* entry points: while fingerprinting is switched on, store the fingerprint
+    of the call (method, data of the object, and all other arguments) for the artists it makes
+
+    The arguments are as for profiling.instrumented.
+    """
+    def decorate(fun):
+        @functools.wraps(fun)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fun(*args, **kwargs)
+            if axesFirst:
+                axes, callArgs = args[0], args[1:]
+            else:
+                import matplotlib.pyplot as plt
+                axes, callArgs = plt.gca(), args
+            before = set(id(a) for a in _drawnArtists(axes))
+            result = fun(*args, **kwargs)
+            hasher = hashlib.sha1(method)
+            try:
+                _update(hasher, (callArgs, kwargs))
+            except Uncacheable:
+                return result ## the artists are fingerprinted as all others
+            callDigest = hasher.digest()
+            for artist in _drawnArtists(axes):
+                if id(artist) not in before:
+                    _callDigests[artist] = callDigest
+            return result
+        return wrapper
+    return decorate
+
+class RenderCache(object):
+    """
+    Rendered figures (the bytes written by savefig), stored in cacheDir by their fingerprint (see figureFingerprint)
+
+    Entries are written atomically, so the cache can be shared by concurrent processes;
+    it is never cleaned up automatically (see clear).
+    """
+    VERSION = 1
+    def __init__(self, cacheDir):
+        self.cacheDir = os.path.expanduser(cacheDir)
+        if not os.path.isdir(self.cacheDir):
+            os.makedirs(self.cacheDir)
+
+    def _entryPath(self, key, fmt):
+        return os.path.join(self.cacheDir, key[:2], "{0}.{1}".format(key[2:], fmt))
+
+    def key(self, fig, format="png", **kwargs):
+        """ key for fig rendered in format with savefig(..., **kwargs), or None if it cannot be fingerprinted """
+        try:
+            return figureFingerprint(fig, format=format, **kwargs)
+        except Uncacheable:
+            return None
+
+    def get(self, key, fmt):
+        """ bytes for key and format fmt, or None if not cached """
+        try:
+            with open(self._entryPath(key, fmt), "rb") as entryFile:
+                return entryFile.read()
+        except IOError:
+            return None
+
+    def put(self, key, fmt, data):
+        """ store the bytes for key and format fmt (atomically: concurrent runs may fill the same cache) """
+        path = self._entryPath(key, fmt)
+        dirName = os.path.dirname(path)
+        if not os.path.isdir(dirName):
+            try:
+                os.makedirs(dirName)
+            except OSError: ## created in the meantime
+                pass
+        fd, tmpPath = tempfile.mkstemp(suffix=".tmp", dir=dirName)
+        try:
+            with os.fdopen(fd, "wb") as entryFile:
+                entryFile.write(data)
+            os.rename(tmpPath, path)
+        except Exception:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+            raise
+
+    def render(self, fig, format="png", **kwargs):
+        """ bytes of fig saved in format with savefig(..., **kwargs): from the cache if the fingerprint matches, otherwise rendered (and stored) """
+        key = self.key(fig, format=format, **kwargs)
+        data = self.get(key, format) if key is not None else None
+        if data is None:
+            buf = BytesIO()
+            fig.savefig(buf, format=format, **kwargs)
+            data = buf.getvalue()
+            if key is not None:
+                self.put(key, format, data)
+        return data
+
+    def savefig(self, fig, fname, format=None, **kwargs):
+        """ As fig.savefig(fname, ...), but with the bytes from render (the format is taken from the extension of fname if not given) """
+        if format is None:
+            format = os.path.splitext(fname)[1][1:].lower() or matplotlib.rcParams["savefig.format"]
+        data = self.render(fig, format=format, **kwargs)
+        with open(fname, "wb") as outFile:
+            outFile.write(data)
+
+    def clear(self):
+        """ Remove all entries """
+        import shutil
+        for name in os.listdir(self.cacheDir):
+            path = os.path.join(self.cacheDir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
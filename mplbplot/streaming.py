@@ -0,0 +1,91 @@
+"""
+One-dimensional histograms filled from chunks of values (numpy arrays), without ROOT objects
+
+StreamingHist1D accumulates the (weighted) contents and sum of weights squared
+with one np.searchsorted and two np.bincount calls per chunk. Its snapshot
+method returns a copy (an mplbplot.arrayhist.ArrayHist1D) that can be drawn while filling
+continues, e.g. on another thread. Both have the accessors of TH1 that the draw methods use,
+so they can be passed to rhist, rplot, rerrorbar and rtext (with mplbplot.decorateAxes),
+and to the mplbplot.live methods:
+
+>>> h = StreamingHist1D(50, 0., 100.)
+>>> for chunk in chunks:
+>>>     h.fill(chunk["met"], weights=chunk["weight"])
+>>> ax.rhist(h.snapshot(), histtype="step")
+"""
+__all__ = ("StreamingHist1D",)
+
+import threading
+
+import numpy as np
+
+from .arrayhist import ArrayAxis, ArrayHist1D
+
+class StreamingHist1D(ArrayHist1D):
+    """
+    Histogram that is filled with chunks of values (and weights)
+
+    The binning is given as StreamingHist1D(nBins, xMin, xMax) or StreamingHist1D(edges).
+    As in ROOT, cell 0 is the underflow and N+1 the overflow, bins include
+    their lower edge, and values that are NaN end up in the overflow.
+    fill and snapshot can be called from different threads.
+    """
+    __slots__ = ("_lock",)
+    def __init__(self, *binning, **kwargs):
+        self.name = kwargs.pop("name", "h")
+        self.title = kwargs.pop("title", "")
+        if kwargs:
+            raise TypeError("Unknown keyword arguments: {0}".format(", ".join(kwargs)))
+        if len(binning) == 3:
+            self.edges = np.linspace(float(binning[1]), float(binning[2]), int(binning[0])+1)
+        elif len(binning) == 1:
+            self.edges = np.array(binning[0], dtype=np.float64)
+        else:
+            raise TypeError("Binning should be given as (nBins, xMin, xMax) or (edges)")
+        if len(self.edges) < 2 or np.any(np.diff(self.edges) <= 0.):
+            raise ValueError("Bin edges should be increasing")
+        self._axis = ArrayAxis(self.edges)
+        self._contents = np.zeros((len(self.edges)+1,))
+        self._sumw2 = np.zeros((len(self.edges)+1,))
+        self._entries = 0
+        self._lock = threading.Lock()
+
+    def fill(self, values, weights=None):
+        """ Add a chunk of values (with weights, if given: an array of the same length, or a number) """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        iCell = np.searchsorted(self.edges, values, side="right")
+        nCells = len(self._contents)
+        if weights is None:
+            contents = np.bincount(iCell, minlength=nCells).astype(np.float64)
+            sumw2 = contents
+        else:
+            weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), values.shape)
+            contents = np.bincount(iCell, weights=weights, minlength=nCells)
+            sumw2 = np.bincount(iCell, weights=weights**2, minlength=nCells)
+        with self._lock:
+            self._contents += contents
+            self._sumw2 += sumw2
+            self._entries += len(values)
+
+    def reset(self):
+        """ Set all contents to zero """
+        with self._lock:
+            self._contents[:] = 0.
+            self._sumw2[:] = 0.
+            self._entries = 0
+
+    def snapshot(self):
+        """ ArrayHist1D with a copy of the current contents (which does not change when filling continues) """
+        with self._lock:
+            return ArrayHist1D(self.edges, self._contents.copy(), self._sumw2.copy(), name=self.name, title=self.title, entries=self._entries)
+
+    def toTH1(self):
+        """ TH1D with the current contents (needs ROOT) """
+        from cppyy import gbl
+        snap = self.snapshot()
+        hist = gbl.TH1D(self.name, self.title, len(self.edges)-1, np.ascontiguousarray(self.edges))
+        hist.Sumw2()
+        hist.SetContent(snap.contents())
+        hist.SetError(np.sqrt(snap.sumw2()))
+        hist.SetEntries(snap.GetEntries())
+        return hist
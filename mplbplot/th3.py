@@ -0,0 +1,85 @@
+"""
+Projections and slices of TH3, without ROOT projection objects
+
+rproject and rslice sum the contents (and sumw2) grid of a TH3 (see decorators.HistoBins3D)
+over one or two axes with numpy, and return an mplbplot.arrayhist.ArrayHist1D or ArrayHist2D,
+which can be drawn with the TH1 and TH2 methods:
+
+>>> ax.rhist(rproject(h3, "x", ranges={ "z" : (0., 2.5) }), histtype="step")
+>>> ax.rpcolor(rslice(h3, z=1.2))
+>>> ax.rcontour(rproject(h3, "zx"))
+"""
+__all__ = ("rproject", "rslice")
+
+import numpy as np
+
+from .decorators import bins
+from .arrayhist import ArrayHist1D, ArrayHist2D
+
+## index in the [k,j,i] arrays of HistoBins3D
+_gridAxis = { "x" : 2, "y" : 1, "z" : 0 }
+
+def _cellRange(edges, lo, hi):
+    """ cells of the bins that contain lo up to hi (as TAxis.SetRangeUser: if hi is the lower edge of a bin, that bin is not included) """
+    return int(np.searchsorted(edges, lo, side="right")), int(np.searchsorted(edges, hi, side="left"))+1
+
+def _project(histo, keep, cellRanges, name):
+    """ sum the grid over the axes not in keep, in the cell ranges given for those (all cells otherwise) """
+    if not 1 <= len(keep) <= 2 or any(ax not in _gridAxis for ax in keep) or len(set(keep)) != len(keep):
+        raise ValueError("The axes to keep should be one or two (different) of 'x', 'y' and 'z', not '{0}'".format(keep))
+    hBins = bins(histo)
+    contents, sumw2 = hBins.contents(), hBins.sumw2()
+    selection = [ slice(None) ]*3
+    for ax, (first, last) in cellRanges.iteritems():
+        selection[_gridAxis[ax]] = slice(first, last)
+    summed = tuple(_gridAxis[ax] for ax in "xyz" if ax not in keep)
+    contents = np.sum(contents[tuple(selection)], axis=summed)
+    sumw2 = np.sum(sumw2[tuple(selection)], axis=summed)
+    ## remaining grid axes are in the order z, y, x; the result is indexed as [Y,X]
+    remaining = sorted(_gridAxis[ax] for ax in keep)
+    order = [ remaining.index(_gridAxis[ax]) for ax in reversed(keep) ]
+    contents, sumw2 = np.transpose(contents, order), np.transpose(sumw2, order)
+    if len(keep) == 1:
+        return ArrayHist1D(hBins.edges(keep), contents, sumw2, name=name, title=histo.GetTitle())
+    else:
+        return ArrayHist2D(hBins.edges(keep[0]), hBins.edges(keep[1]), np.ascontiguousarray(contents), np.ascontiguousarray(sumw2), name=name, title=histo.GetTitle())
+
+def rproject(histo, axes="x", ranges=None, name=None):
+    """
+    Projection of a TH3 on one or two axes
+
+    axes are the axes that are kept: "x", "y" or "z" for a one-dimensional projection
+    (ArrayHist1D), or two of them for a two-dimensional one (ArrayHist2D, e.g. "zx" for
+    z on the horizontal and x on the vertical axis). The contents are summed over the other axes,
+    including underflow and overflow (as TH3.Project3D), unless a range of values
+    is given for them in ranges, e.g. { "y" : (-1., 1.) } (then the bins that contain
+    the lower edge up to the upper edge are used, as with TAxis.SetRangeUser).
+    The underflow and overflow cells of the axes that are kept are included in the result.
+    """
+    ranges = ranges if ranges is not None else dict()
+    if any(ax in axes for ax in ranges):
+        raise ValueError("Ranges can only be given for the axes that are summed over, not for {0}".format(", ".join(ax for ax in ranges if ax in axes)))
+    hBins = bins(histo)
+    cellRanges = dict((ax, _cellRange(hBins.edges(ax), lo, hi)) for ax, (lo, hi) in ranges.iteritems())
+    return _project(histo, axes, cellRanges, name if name is not None else "{0}_p{1}".format(histo.GetName(), axes))
+
+def rslice(histo, axes=None, name=None, **at):
+    """
+    Slice of a TH3: the contents of the bins that contain a value (or values) along one (or two) axes,
+    e.g. rslice(h3, z=1.2) for an ArrayHist2D with the x and y axes, or rslice(h3, x=0., y=3.)
+    for an ArrayHist1D with the z axis.
+
+    The order of the other axes can be changed by passing axes (e.g. axes="yx").
+    """
+    if not 1 <= len(at) <= 2 or any(ax not in _gridAxis for ax in at):
+        raise ValueError("Slices should be taken at values of one or two of 'x', 'y' and 'z', not {0}".format(", ".join(at)))
+    if axes is None:
+        axes = "".join(ax for ax in "xyz" if ax not in at)
+    elif set(axes) & set(at):
+        raise ValueError("Cannot keep an axis that is sliced ({0})".format(", ".join(set(axes) & set(at))))
+    hBins = bins(histo)
+    cellRanges = dict()
+    for ax, val in at.iteritems():
+        iCell = int(np.searchsorted(hBins.edges(ax), val, side="right"))
+        cellRanges[ax] = (iCell, iCell+1)
+    return _project(histo, axes, cellRanges, name if name is not None else "{0}_s{1}".format(histo.GetName(), "".join("{0}{1:d}".format(ax, cellRanges[ax][0]) for ax in sorted(at))))
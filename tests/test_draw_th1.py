@@ -0,0 +1,71 @@
+"""
+Tests for the step outlines of mplbplot.draw_th1.hist (simplify=True)
+
+Run with python -m unittest discover tests (needs ROOT)
+"""
+import unittest
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+try:
+    from cppyy import gbl
+    from mplbplot import draw_th1
+except ImportError:
+    gbl = None
+
+def _histo(name, contents):
+    h = gbl.TH1D(name, name, len(contents), 0., float(len(contents)))
+    for i, c in enumerate(contents):
+        h.SetBinContent(i+1, c)
+    return h
+
+def _onOutline(pt, verts):
+    """ True if pt is on one of the segments of the closed polyline verts """
+    for a, b in zip(verts, np.roll(verts, -1, axis=0)):
+        lo, hi = np.minimum(a, b), np.maximum(a, b)
+        if np.all(lo <= pt) and np.all(pt <= hi) and ( a[0] == b[0] or a[1] == b[1] ):
+            return True
+    return False
+
+@unittest.skipIf(gbl is None, "ROOT (cppyy) is not available")
+class TestStepOutline(unittest.TestCase):
+    def setUp(self):
+        self.fig = matplotlib.figure.Figure()
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot(111)
+
+    def _checkOutlines(self, histos, **kwargs):
+        """ every vertex of the polygons made by axes.hist is on the simplified outline """
+        n, edges, full = draw_th1.hist(histos, axes=self.ax, **kwargs)
+        n, edges, simplified = draw_th1.hist(histos, axes=self.ax, simplify=True, **kwargs)
+        if not isinstance(histos, list):
+            full, simplified = [ full ], [ simplified ]
+        for polys, steps in zip(full, simplified):
+            for poly, step in zip(polys, steps):
+                self.assertIsInstance(step, draw_th1.StepPolygon)
+                verts = step.get_xy()
+                self.assertLessEqual(len(verts), len(poly.get_xy()))
+                for pt in poly.get_xy():
+                    self.assertTrue(_onOutline(pt, verts), "{0} not on the outline {1}".format(pt, verts))
+
+    def test_trailingEmptyBins(self):
+        h = _histo("hTrailing", [ 3., 2., 0., 0. ])
+        self._checkOutlines(h, histtype="stepfilled", bottom=1.)
+        self._checkOutlines(h, histtype="step")
+        n, edges, steps = draw_th1.hist(h, axes=self.ax, histtype="stepfilled", bottom=1., simplify=True)
+        self.assertEqual(np.max(steps[0].get_xy()[:,0]), 4.)
+
+    def test_leadingAndTrailingEmptyBins(self):
+        self._checkOutlines(_histo("hEmptyEnds", [ 0., 1., 1., 2., 0., 0. ]), histtype="stepfilled")
+
+    def test_stacked(self):
+        histos = [ _histo("hStack1", [ 3., 2., 2., 0., 0. ]), _histo("hStack2", [ 1., 1., 0., 0., 0. ]) ]
+        self._checkOutlines(histos, histtype="stepfilled", stacked=True)
+        self._checkOutlines(histos, histtype="step", stacked=True)
+
+if __name__ == "__main__":
+    unittest.main()
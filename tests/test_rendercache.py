@@ -0,0 +1,89 @@
+"""
+Tests for mplbplot.rendercache: the fingerprint changes with everything that changes the rendered figure
+
+Run with python -m unittest discover tests (the tests with histograms need ROOT)
+"""
+import unittest
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from mplbplot import rendercache
+from mplbplot.rendercache import figureFingerprint, Uncacheable
+
+try:
+    from cppyy import gbl
+except ImportError:
+    gbl = None
+
+def _figure():
+    fig = matplotlib.figure.Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    ax.plot([ 0., 1., 2. ], [ 1., 3., 2. ], label="a line")
+    return fig, ax
+
+class TestFingerprint(unittest.TestCase):
+    def test_stable(self):
+        fig, ax = _figure()
+        ax.legend(title="Legend")
+        before = figureFingerprint(fig, format="png")
+        fig.canvas.draw()
+        self.assertEqual(before, figureFingerprint(fig, format="png"))
+        figA, axA = _figure()
+        axA.legend(title="Legend")
+        self.assertEqual(before, figureFingerprint(figA, format="png"))
+
+    def test_legendTitle(self):
+        fig, ax = _figure()
+        ax.legend()
+        before = figureFingerprint(fig, format="png")
+        ax.get_legend().set_title("Title")
+        self.assertNotEqual(before, figureFingerprint(fig, format="png"))
+
+    def test_legendBboxToAnchor(self):
+        fig, ax = _figure()
+        ax.legend(loc="upper left")
+        before = figureFingerprint(fig, format="png")
+        ax.get_legend().set_bbox_to_anchor((1.05, 1.))
+        self.assertNotEqual(before, figureFingerprint(fig, format="png"))
+
+    def test_textTransform(self):
+        fig, ax = _figure()
+        ax.text(.5, .5, "text")
+        figA, axA = _figure()
+        axA.text(.5, .5, "text", transform=axA.transAxes)
+        self.assertNotEqual(figureFingerprint(fig, format="png"), figureFingerprint(figA, format="png"))
+
+    def test_annotation(self):
+        fig, ax = _figure()
+        ax.annotate("peak", xy=(1., 3.), xytext=(1.5, 2.5), arrowprops=dict(arrowstyle="->"))
+        figA, axA = _figure()
+        axA.annotate("peak", xy=(0., 1.), xytext=(1.5, 2.5), arrowprops=dict(arrowstyle="->"))
+        self.assertNotEqual(figureFingerprint(fig, format="png"), figureFingerprint(figA, format="png"))
+
+    def test_unknownArtist(self):
+        fig, ax = _figure()
+        ax.table(cellText=[ [ "1", "2" ] ])
+        self.assertRaises(Uncacheable, figureFingerprint, fig, format="png")
+
+    @unittest.skipIf(gbl is None, "ROOT (cppyy) is not available")
+    def test_restyledAfterCall(self):
+        import mplbplot.decorateAxes
+        h = gbl.TH1D("hRestyled", "", 5, 0., 5.)
+        for i in xrange(1, 6):
+            h.SetBinContent(i, float(i))
+        for restyle in (lambda p : p.set_edgecolor("r"), lambda p : p.set_linewidth(3.)):
+            fig = matplotlib.figure.Figure()
+            FigureCanvasAgg(fig)
+            ax = fig.add_subplot(111)
+            with rendercache.fingerprinting():
+                n, edges, patches = ax.rhist(h, histtype="bar")
+            before = figureFingerprint(fig, format="png")
+            restyle(patches[0])
+            self.assertNotEqual(before, figureFingerprint(fig, format="png"))
+
+if __name__ == "__main__":
+    unittest.main()